@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for the Lambda hot paths
+
+Run with python -m benchmarks.<name>; see each module for options.
+"""
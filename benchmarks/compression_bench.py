@@ -0,0 +1,234 @@
+"""
+Storage benchmark for message content compression
+
+Builds message items the way ConversationManager writes them, with and
+without encryption and with each available codec, and reports stored
+bytes and DynamoDB write units (1 WCU per started KB; the transactional
+turn writes cost twice that) plus encode and decode time per message.
+
+Transcripts are synthetic chat sessions (short questions, markdown replies
+with lists and code) unless --input names a JSONL file of real messages,
+one {"role": ..., "content": ...} object per line.
+
+Usage:
+    python -m benchmarks.compression_bench --output compression-bench.json
+    python -m benchmarks.compression_bench --input transcripts.jsonl --min-bytes 512
+"""
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import platform
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from benchmarks.fakes import FakeKMS
+from benchmarks.handler_bench import percentiles
+from src.shared.aws_clients import set_client, reset_clients
+from src.shared.compression import ContentCodec, decode_content
+from src.shared.encryption import EncryptionManager
+from src.shared.constants import COMPRESSION_MIN_BYTES
+
+WORDS = (
+    "the of and to a in is that for it as with be on this are by you can or an if not your from "
+    "which will data function value request response table key model user message context token "
+    "cache query index error retry latency memory service lambda python return list string number "
+    "example option default configuration performance should would could because however also each "
+    "when then there their these those into more most only other such than first use using used "
+    "make sure note step result results time first second large small simple better approach"
+).split()
+CODE_TEMPLATES = (
+    "def {name}(items):\n    result = []\n    for item in items:\n        if item.{attr} is not None:\n"
+    "            result.append(item.{attr})\n    return result\n",
+    "const {name} = async ({attr}) => {{\n  const response = await fetch(`/api/${{{attr}}}`);\n"
+    "  return response.json();\n}};\n",
+    "SELECT {attr}, COUNT(*) AS total\nFROM {name}\nGROUP BY {attr}\nORDER BY total DESC;\n",
+)
+
+
+def _sentence(rng: random.Random) -> str:
+    # Zipf-like word choice: common words dominate, as in real prose
+    words = [WORDS[min(int(rng.paretovariate(1.1)) - 1, len(WORDS) - 1)] if rng.random() < 0.6
+             else rng.choice(WORDS) for _ in range(rng.randint(6, 22))]
+    return ' '.join(words).capitalize() + rng.choice('..?!.')
+
+
+def _paragraph(rng: random.Random) -> str:
+    return ' '.join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def synthetic_reply(rng: random.Random, target_chars: int) -> str:
+    """Markdown assistant reply of roughly the given length"""
+    parts = []
+    while sum(len(p) for p in parts) < target_chars:
+        kind = rng.random()
+        if kind < 0.55:
+            parts.append(_paragraph(rng))
+        elif kind < 0.8:
+            parts.append('\n'.join(f"- {_sentence(rng)}" for _ in range(rng.randint(3, 6))))
+        else:
+            code = rng.choice(CODE_TEMPLATES).format(name=rng.choice(WORDS) + '_' + rng.choice(WORDS),
+                                                     attr=rng.choice(WORDS))
+            parts.append(f"```\n{code}```")
+    return '\n\n'.join(parts)[:target_chars]
+
+
+def synthetic_transcripts(count: int, turns: int, seed: int = 0) -> List[Dict[str, str]]:
+    """
+    Chat messages: short user questions and replies of 200 to ~12000 characters
+
+    Args:
+        count: Number of conversations
+        turns: User/assistant turns per conversation
+        seed: Random seed
+
+    Returns:
+        Messages in conversation order
+    """
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        for _ in range(turns):
+            messages.append({'role': 'user', 'content': ' '.join(_sentence(rng) for _ in range(rng.randint(1, 3)))})
+            # Log-normal reply length, median ~1500 chars, capped near MAX_TOKENS worth of text
+            length = int(min(12000, max(200, rng.lognormvariate(math.log(1500), 0.9))))
+            messages.append({'role': 'assistant', 'content': synthetic_reply(rng, length)})
+    return messages
+
+
+def load_transcripts(path: str) -> List[Dict[str, str]]:
+    """Read messages from a JSONL file"""
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def item_size(item: Dict[str, Any]) -> int:
+    """DynamoDB item size: attribute names plus values (numbers approximated by digit count)"""
+    size = 0
+    for name, value in item.items():
+        size += len(name.encode('utf-8'))
+        if isinstance(value, (bytes, bytearray)):
+            size += len(value)
+        elif isinstance(value, str):
+            size += len(value.encode('utf-8'))
+        else:
+            size += (len(str(value)) + 1) // 2 + 1
+    return size
+
+
+def measure(name: str, messages: List[Dict[str, str]], encode, decode) -> Dict[str, Any]:
+    """Store every message through encode and read it back through decode"""
+    sizes, encode_us, decode_us = [], [], []
+    for seq, message in enumerate(messages, start=1):
+        began = time.perf_counter()
+        content = encode(message['content'])
+        encode_us.append((time.perf_counter() - began) * 1e6)
+
+        sizes.append(item_size({
+            'conversation_id': '6f1c2a52-4d1e-4f0e-9a55-0b7f3f0c9d11',
+            'seq': seq,
+            'role': message['role'],
+            'content': content,
+            'timestamp': '2024-01-01T00:00:00.000000',
+            'ttl': 1735689600,
+        }))
+
+        began = time.perf_counter()
+        if decode(content) != message['content']:
+            raise AssertionError(f"{name}: round trip mismatch at message {seq}")
+        decode_us.append((time.perf_counter() - began) * 1e6)
+
+    wcu = sum(math.ceil(size / 1024) for size in sizes)
+    return {
+        'name': name,
+        'bytes': sum(sizes),
+        'wcu': wcu,
+        'transactional_wcu': 2 * wcu,
+        'items_over_1kb': sum(1 for size in sizes if size > 1024),
+        'encode_us': percentiles(encode_us),
+        'decode_us': percentiles(decode_us),
+    }
+
+
+def available_codecs() -> List[str]:
+    """Codecs usable in this environment"""
+    codecs = ['zlib']
+    try:
+        ContentCodec('zstd')
+        codecs.append('zstd')
+    except RuntimeError:
+        pass
+    return codecs
+
+
+def run_benchmark(messages: List[Dict[str, str]], min_bytes: int = COMPRESSION_MIN_BYTES) -> Dict[str, Any]:
+    """
+    Compare stored size and write units of each storage configuration
+
+    Args:
+        messages: Messages to store
+        min_bytes: Codec size threshold
+
+    Returns:
+        Report dictionary; savings are relative to the same mode without compression
+    """
+    set_client('kms', FakeKMS())
+    try:
+        results = [measure('plaintext', messages, lambda text: text, lambda value: value)]
+        for codec_name in available_codecs():
+            codec = ContentCodec(codec_name, min_bytes=min_bytes)
+            results.append(measure(f'plaintext+{codec_name}', messages, codec.encode, decode_content))
+
+        envelope = EncryptionManager('bench-key')
+        results.append(measure('envelope', messages, envelope.encrypt, envelope.decrypt))
+        for codec_name in available_codecs():
+            manager = EncryptionManager('bench-key', codec=ContentCodec(codec_name, min_bytes=min_bytes))
+            results.append(measure(f'envelope+{codec_name}', messages, manager.encrypt, manager.decrypt))
+    finally:
+        reset_clients()
+
+    baselines = {r['name']: r for r in results if '+' not in r['name']}
+    for result in results:
+        baseline = baselines[result['name'].split('+')[0]]
+        result['bytes_saved_pct'] = round(100 * (1 - result['bytes'] / baseline['bytes']), 1)
+        result['wcu_saved_pct'] = round(100 * (1 - result['wcu'] / baseline['wcu']), 1)
+
+    contents = [m['content'].encode('utf-8') for m in messages]
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'messages': len(messages),
+            'plaintext_bytes': sum(len(c) for c in contents),
+            'median_message_bytes': sorted(len(c) for c in contents)[len(contents) // 2],
+            'min_bytes': min_bytes,
+        },
+        'results': results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--output', help='Write the JSON report to this file (default: stdout)')
+    parser.add_argument('--input', help='JSONL file of messages to store instead of synthetic transcripts')
+    parser.add_argument('--conversations', type=int, default=50)
+    parser.add_argument('--turns', type=int, default=10)
+    parser.add_argument('--min-bytes', type=int, default=COMPRESSION_MIN_BYTES, help='Codec size threshold')
+    args = parser.parse_args(argv)
+
+    messages = load_transcripts(args.input) if args.input else synthetic_transcripts(args.conversations, args.turns)
+    report = run_benchmark(messages, min_bytes=args.min_bytes)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+In-process AWS stand-ins with injected latency and call counting
+
+DynamoDB is served by moto; KMS, Bedrock and Secrets Manager are small
+fakes. Every client is wrapped in a LatencyProxy that sleeps before each
+API call and counts it, then installed with set_client so the handlers
+pick it up through their usual lazy factories.
+"""
+import os
+import json
+import time
+import random
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional
+
+# Milliseconds added to every API call, per service
+DEFAULT_LATENCY_MS = {
+    'dynamodb': 5.0,
+    'kms': 8.0,
+    'bedrock-runtime': 50.0,
+    'secretsmanager': 20.0,
+}
+
+
+class CallCounter:
+    """Thread-safe count of API calls by service and operation"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, service: str, operation: str) -> None:
+        with self._lock:
+            self._counts[(service, operation)] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+    def as_dict(self) -> Dict[str, Dict[str, int]]:
+        """Counts nested as {service: {operation: count}}"""
+        with self._lock:
+            counts = dict(self._counts)
+        result: Dict[str, Dict[str, int]] = {}
+        for (service, operation), count in sorted(counts.items()):
+            result.setdefault(service, {})[operation] = count
+        return result
+
+
+class LatencyProxy:
+    """
+    Wraps a client so each method call sleeps for the configured latency and is counted
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        service: str,
+        latency_ms: float,
+        counter: CallCounter,
+        jitter: float = 0.1,
+        lock: Optional[threading.Lock] = None
+    ):
+        """
+        Initialize proxy
+
+        Args:
+            client: Real or fake client
+            service: Service name used in call counts
+            latency_ms: Mean latency added to every call
+            counter: Shared call counter
+            jitter: Relative uniform jitter applied to the latency
+            lock: Optional lock held around the wrapped call (not the latency) for backends that are not thread-safe
+        """
+        self._client = client
+        self._service = service
+        self._latency_ms = latency_ms
+        self._counter = counter
+        self._jitter = jitter
+        self._lock = lock
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._client, name)
+        if not callable(attribute) or name.startswith('_'):
+            return attribute
+
+        def call(*args, **kwargs):
+            self._counter.add(self._service, name)
+            if self._latency_ms:
+                spread = 1 + random.uniform(-self._jitter, self._jitter)
+                time.sleep(self._latency_ms * spread / 1000)
+            if self._lock is None:
+                return attribute(*args, **kwargs)
+            with self._lock:
+                return attribute(*args, **kwargs)
+
+        return call
+
+
+class FakeKMS:
+    """KMS stand-in with reversible 'encryption'"""
+
+    def encrypt(self, KeyId, Plaintext):
+        return {'CiphertextBlob': b'kms:' + Plaintext}
+
+    def decrypt(self, CiphertextBlob, KeyId=None):
+        return {'Plaintext': CiphertextBlob[len(b'kms:'):]}
+
+    def generate_data_key(self, KeyId, KeySpec):
+        key = os.urandom(32)
+        return {'Plaintext': key, 'CiphertextBlob': b'kms:' + key}
+
+
+class FakeStreamingBody:
+    """Minimal botocore StreamingBody stand-in"""
+
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def read(self) -> bytes:
+        return self._data
+
+
+class FakeBedrockRuntime:
+    """bedrock-runtime stand-in answering every request with a fixed-size Claude reply"""
+
+    def __init__(self, reply_chars: int = 400):
+        self.reply = ("The quick brown fox jumps over the lazy dog. " * (reply_chars // 45 + 1))[:reply_chars]
+
+    def invoke_model(self, modelId, body, **kwargs):
+        request = json.loads(body)
+        input_chars = sum(len(m['content']) for m in request.get('messages', []) if isinstance(m['content'], str))
+        payload = {
+            'content': [{'type': 'text', 'text': self.reply}],
+            'stop_reason': 'end_turn',
+            'usage': {'input_tokens': input_chars // 4, 'output_tokens': len(self.reply) // 4}
+        }
+        return {'body': FakeStreamingBody(json.dumps(payload).encode('utf-8'))}
+
+
+class FakeSecretsManager:
+    """Secrets Manager stand-in holding one API key secret"""
+
+    def __init__(self, api_key: str):
+        self.secret = json.dumps({'api_key': api_key})
+
+    def get_secret_value(self, SecretId):
+        return {'SecretString': self.secret}
+
+
+def create_tables(dynamodb_resource: Any, conversations_table: str, messages_table: str) -> None:
+    """
+    Create the conversations and messages tables (inside an active moto mock)
+
+    Args:
+        dynamodb_resource: boto3 DynamoDB resource
+        conversations_table: Conversations table name
+        messages_table: Messages table name
+    """
+    dynamodb_resource.create_table(
+        TableName=conversations_table,
+        BillingMode='PAY_PER_REQUEST',
+        AttributeDefinitions=[
+            {'AttributeName': 'conversation_id', 'AttributeType': 'S'},
+            {'AttributeName': 'user_id', 'AttributeType': 'S'},
+            {'AttributeName': 'updated_at', 'AttributeType': 'S'}
+        ],
+        KeySchema=[{'AttributeName': 'conversation_id', 'KeyType': 'HASH'}],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'UserIdUpdatedIndex',
+            'KeySchema': [
+                {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'updated_at', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'INCLUDE', 'NonKeyAttributes': ['created_at', 'message_count', 'title']}
+        }]
+    )
+    dynamodb_resource.create_table(
+        TableName=messages_table,
+        BillingMode='PAY_PER_REQUEST',
+        AttributeDefinitions=[
+            {'AttributeName': 'conversation_id', 'AttributeType': 'S'},
+            {'AttributeName': 'seq', 'AttributeType': 'N'}
+        ],
+        KeySchema=[
+            {'AttributeName': 'conversation_id', 'KeyType': 'HASH'},
+            {'AttributeName': 'seq', 'KeyType': 'RANGE'}
+        ]
+    )
+
+
+def install_clients(
+    counter: CallCounter,
+    latency_ms: Optional[Dict[str, float]] = None,
+    api_key: str = 'bench-api-key',
+    reply_chars: int = 400
+) -> None:
+    """
+    Install latency-injecting clients for every service the handlers use
+
+    Must run inside an active moto mock, which serves DynamoDB.
+
+    Args:
+        counter: Shared call counter
+        latency_ms: Per-service latency overrides
+        api_key: API key held by the fake Secrets Manager
+        reply_chars: Length of the fake Bedrock reply
+    """
+    import boto3
+    from src.shared.aws_clients import reset_clients, set_client
+    from src.shared.constants import BEDROCK_REGION
+
+    latency = {**DEFAULT_LATENCY_MS, **(latency_ms or {})}
+
+    def proxy(client, service, lock=None):
+        return LatencyProxy(client, service, latency.get(service, 0.0), counter, lock=lock)
+
+    reset_clients()
+    # moto's backend is not thread-safe; the injected latency still overlaps across threads
+    set_client('dynamodb', proxy(boto3.client('dynamodb'), 'dynamodb', lock=threading.Lock()))
+    set_client('kms', proxy(FakeKMS(), 'kms'))
+    set_client('bedrock-runtime', proxy(FakeBedrockRuntime(reply_chars), 'bedrock-runtime'), region_name=BEDROCK_REGION)
+    set_client('secretsmanager', proxy(FakeSecretsManager(api_key), 'secretsmanager'))
@@ -0,0 +1,420 @@
+"""
+Hot-path benchmark for the chatbot and authorizer Lambda handlers
+
+Drives both lambda_handlers in-process against moto DynamoDB and fake
+KMS/Bedrock/Secrets Manager clients with injected latency, sweeping
+history length, message size, encryption and concurrency. Reports
+p50/p95/p99 per stage (from the chat response's metadata.timings_ms plus
+the measured invocation time) and API call counts per request.
+
+Usage:
+    python -m benchmarks.handler_bench --output bench.json
+    python -m benchmarks.handler_bench --quick --compare bench.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+import platform
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+from benchmarks.fakes import CallCounter, DEFAULT_LATENCY_MS, create_tables, install_clients  # noqa: E402
+
+SAMPLE_TEXT = "Could you explain how envelope encryption works and why it is cheaper than calling KMS? "
+METHOD_ARN = 'arn:aws:execute-api:us-east-1:123456789012:abcdef/prod/POST/chat'
+
+DEFAULT_SWEEP = {
+    'history_length': [0, 10, 50],
+    'message_size': [200, 4000],
+    'encryption': ['off', 'envelope'],
+    'concurrency': [1, 8],
+}
+QUICK_SWEEP = {
+    'history_length': [10],
+    'message_size': [200],
+    'encryption': ['envelope'],
+    'concurrency': [1, 4],
+}
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """
+    Summarize samples with nearest-rank percentiles
+
+    Args:
+        values: Samples in milliseconds
+
+    Returns:
+        Dictionary with count, mean, p50, p95, p99 and max
+    """
+    if not values:
+        return {'count': 0}
+
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered), 2),
+        'p50': round(rank(50), 2),
+        'p95': round(rank(95), 2),
+        'p99': round(rank(99), 2),
+        'max': round(ordered[-1], 2),
+    }
+
+
+def make_text(size: int) -> str:
+    return (SAMPLE_TEXT * (size // len(SAMPLE_TEXT) + 1))[:size]
+
+
+def configure_chat_handler(encryption: str) -> None:
+    """
+    Rebuild the chat handler's module-level collaborators with empty caches, as in a cold container
+
+    Args:
+        encryption: 'off', or an EncryptionManager mode ('envelope' or 'kms')
+    """
+    from src.chatbot import handler
+    from src.chatbot.context_builder import ContextBuilder
+    from src.chatbot.conversation_manager import ConversationManager
+    from src.shared.encryption import EncryptionManager
+
+    handler.encryption_manager = EncryptionManager('bench-key', mode=encryption) if encryption != 'off' else None
+    handler.conversation_manager = ConversationManager(
+        handler.CONVERSATIONS_TABLE, handler.encryption_manager, handler.MESSAGES_TABLE
+    )
+    handler.context_builder = ContextBuilder(handler.conversation_manager, token_budget=handler.CONTEXT_TOKEN_BUDGET)
+
+
+def seed_conversation(history_length: int, message_size: int) -> Optional[str]:
+    """
+    Store a conversation with history_length alternating messages
+
+    Returns:
+        Conversation id, or None when history_length is 0 (each request starts a new conversation)
+    """
+    import uuid
+    from src.chatbot import handler
+
+    if not history_length:
+        return None
+
+    manager = handler.conversation_manager
+    conversation_id = str(uuid.uuid4())
+    timestamp = datetime.utcnow().isoformat()
+    count = None
+    # TransactWriteItems takes at most 100 operations including the header
+    for start in range(0, history_length, 50):
+        items = [
+            manager._build_message_item(
+                conversation_id, seq, {'role': 'user' if seq % 2 else 'assistant', 'content': make_text(message_size)},
+                timestamp, 0
+            )
+            for seq in range(start + 1, min(history_length, start + 50) + 1)
+        ]
+        manager._transact_messages(conversation_id, count, items, timestamp, 'bench-user')
+        count = (count or 0) + len(items)
+    return conversation_id
+
+
+def run_parallel(concurrency: int, tasks: List[Any], invoke) -> List[Dict[str, Any]]:
+    """Run invoke(task) for every task with the given concurrency, returning results in order"""
+    if concurrency <= 1:
+        return [invoke(task) for task in tasks]
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bench') as pool:
+        return list(pool.map(invoke, tasks))
+
+
+def run_chat_scenario(
+    counter: CallCounter,
+    history_length: int,
+    message_size: int,
+    encryption: str,
+    concurrency: int,
+    requests: int
+) -> Dict[str, Any]:
+    """
+    Benchmark POST /chat for one point of the sweep
+
+    Every request goes to its own pre-seeded conversation so concurrent
+    requests never contend on the same message_count.
+    """
+    from src.chatbot import handler
+
+    configure_chat_handler(encryption)
+    conversation_ids = [seed_conversation(history_length, message_size) for _ in range(requests)]
+    # Seeding warmed the history and data key caches; start the measured requests cold
+    configure_chat_handler(encryption)
+    counter.reset()
+
+    def invoke(conversation_id):
+        body = {'message': make_text(message_size), 'user_id': 'bench-user'}
+        if conversation_id:
+            body['conversation_id'] = conversation_id
+        start = time.perf_counter()
+        response = handler.lambda_handler({'httpMethod': 'POST', 'path': '/chat', 'body': json.dumps(body)}, None)
+        elapsed = (time.perf_counter() - start) * 1000
+        return {'status': response['statusCode'], 'body': json.loads(response['body']), 'elapsed': elapsed}
+
+    wall_start = time.perf_counter()
+    results = run_parallel(concurrency, conversation_ids, invoke)
+    wall = time.perf_counter() - wall_start
+
+    stages: Dict[str, List[float]] = {'invocation': []}
+    errors = 0
+    for result in results:
+        stages['invocation'].append(result['elapsed'])
+        if result['status'] != 200:
+            errors += 1
+            continue
+        for stage, ms in result['body'].get('metadata', {}).get('timings_ms', {}).items():
+            stages.setdefault(stage, []).append(ms)
+
+    return summarize('chat', {
+        'history_length': history_length,
+        'message_size': message_size,
+        'encryption': encryption,
+        'concurrency': concurrency,
+    }, requests, errors, wall, stages, counter)
+
+
+def run_authorizer_scenario(counter: CallCounter, concurrency: int, requests: int, api_key: str) -> Dict[str, Any]:
+    """
+    Benchmark the authorizer for one concurrency level
+
+    Starts with empty secret and decision caches, so the first calls pay
+    the Secrets Manager fetch; warm calls are also reported in microseconds.
+    """
+    from src.authorizer import handler
+
+    handler.api_keys.invalidate()
+    handler.decision_cache.clear()
+    counter.reset()
+
+    def invoke(_):
+        start = time.perf_counter()
+        policy = handler.lambda_handler({'authorizationToken': f'Bearer {api_key}', 'methodArn': METHOD_ARN}, None)
+        elapsed = (time.perf_counter() - start) * 1000
+        allowed = policy.get('policyDocument', {}).get('Statement', [{}])[0].get('Effect') == 'Allow'
+        return {'allowed': allowed, 'elapsed': elapsed}
+
+    wall_start = time.perf_counter()
+    results = run_parallel(concurrency, list(range(requests)), invoke)
+    wall = time.perf_counter() - wall_start
+
+    errors = sum(1 for r in results if not r['allowed'])
+    report = summarize('authorizer', {'concurrency': concurrency}, requests, errors, wall,
+                       {'invocation': [r['elapsed'] for r in results]}, counter)
+    # Sub-millisecond calls round to 0.0 ms; the first call of each worker fetched the secret
+    warm = sorted(r['elapsed'] for r in results)[:max(requests - concurrency, 1)]
+    report['warm_invocation_us'] = percentiles([ms * 1000 for ms in warm])
+    return report
+
+
+def summarize(
+    handler_name: str,
+    params: Dict[str, Any],
+    requests: int,
+    errors: int,
+    wall_seconds: float,
+    stages: Dict[str, List[float]],
+    counter: CallCounter
+) -> Dict[str, Any]:
+    calls = counter.as_dict()
+    return {
+        'handler': handler_name,
+        'params': params,
+        'requests': requests,
+        'errors': errors,
+        'throughput_rps': round(requests / wall_seconds, 2) if wall_seconds else None,
+        'stages_ms': {stage: percentiles(values) for stage, values in sorted(stages.items())},
+        'calls': calls,
+        'calls_per_request': {
+            service: round(sum(ops.values()) / requests, 2) for service, ops in calls.items()
+        },
+    }
+
+
+def run_sweep(
+    sweep: Dict[str, List[Any]],
+    requests: int,
+    latency_ms: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    Run every chat scenario of the sweep plus the authorizer at each concurrency
+
+    Args:
+        sweep: Values for history_length, message_size, encryption and concurrency
+        requests: Requests per scenario
+        latency_ms: Per-service latency overrides
+
+    Returns:
+        Report dictionary (see module docstring)
+    """
+    from moto import mock_aws
+    from src.chatbot import handler
+    from src.shared import metrics
+    from src.shared.aws_clients import reset_clients
+
+    latency = {**DEFAULT_LATENCY_MS, **(latency_ms or {})}
+    api_key = 'bench-api-key'
+    counter = CallCounter()
+    scenarios = []
+    saved = {name: getattr(handler, name)
+             for name in ('encryption_manager', 'conversation_manager', 'context_builder')}
+
+    # Stage timings are read from the responses; EMF records would only clutter stdout
+    metrics.set_sink(lambda record: None)
+    try:
+        with mock_aws():
+            import boto3
+
+            create_tables(boto3.resource('dynamodb'), handler.CONVERSATIONS_TABLE, handler.MESSAGES_TABLE)
+            install_clients(counter, latency, api_key=api_key)
+
+            for history_length in sweep['history_length']:
+                for message_size in sweep['message_size']:
+                    for encryption in sweep['encryption']:
+                        for concurrency in sweep['concurrency']:
+                            scenarios.append(run_chat_scenario(
+                                counter, history_length, message_size, encryption, concurrency, requests
+                            ))
+
+            for concurrency in sweep['concurrency']:
+                scenarios.append(run_authorizer_scenario(counter, concurrency, requests, api_key))
+    finally:
+        for name, value in saved.items():
+            setattr(handler, name, value)
+        reset_clients()
+        metrics.set_sink(None)
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'requests_per_scenario': requests,
+            'latency_ms': latency,
+        },
+        'scenarios': scenarios,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def scenario_key(scenario: Dict[str, Any]) -> str:
+    return scenario['handler'] + ' ' + ' '.join(f"{k}={v}" for k, v in sorted(scenario['params'].items()))
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10) -> List[str]:
+    """
+    Compare p95 per stage and calls per request against a baseline report
+
+    Args:
+        baseline: Earlier report
+        current: New report
+        threshold: Relative p95 increase flagged as a regression
+
+    Returns:
+        Human-readable lines; regressions are prefixed with '!'
+    """
+    previous = {scenario_key(s): s for s in baseline.get('scenarios', [])}
+    lines = []
+    for scenario in current['scenarios']:
+        key = scenario_key(scenario)
+        before = previous.get(key)
+        if before is None:
+            continue
+        for stage, stats in scenario['stages_ms'].items():
+            old = before['stages_ms'].get(stage, {}).get('p95')
+            new = stats.get('p95')
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            marker = '!' if change > threshold else ' '
+            lines.append(f"{marker} {key} {stage} p95 {old:.1f} -> {new:.1f} ms ({change:+.0%})")
+        for service, per_request in scenario['calls_per_request'].items():
+            old = before['calls_per_request'].get(service)
+            if old is not None and per_request > old:
+                lines.append(f"! {key} {service} calls/request {old} -> {per_request}")
+    return lines
+
+
+def parse_latency(values: List[str]) -> Dict[str, float]:
+    latency = {}
+    for value in values:
+        service, _, ms = value.partition('=')
+        latency[service] = float(ms)
+    return latency
+
+
+def parse_list(value: str, convert) -> List[Any]:
+    return [convert(v) for v in value.split(',') if v]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--output', help='Write the JSON report to this file (default: stdout)')
+    parser.add_argument('--compare', help='Baseline JSON report to compare against')
+    parser.add_argument('--requests', type=int, default=20, help='Requests per scenario')
+    parser.add_argument('--quick', action='store_true', help='Run a small sweep')
+    parser.add_argument('--history', help='Comma-separated history lengths')
+    parser.add_argument('--message-size', help='Comma-separated message sizes in characters')
+    parser.add_argument('--encryption', help="Comma-separated encryption settings: off, envelope (on), kms")
+    parser.add_argument('--concurrency', help='Comma-separated concurrency levels')
+    parser.add_argument('--latency', nargs='*', default=[], metavar='SERVICE=MS',
+                        help='Per-service latency, e.g. dynamodb=5 kms=8 bedrock-runtime=300')
+    args = parser.parse_args(argv)
+
+    sweep = dict(QUICK_SWEEP if args.quick else DEFAULT_SWEEP)
+    if args.history:
+        sweep['history_length'] = parse_list(args.history, int)
+    if args.message_size:
+        sweep['message_size'] = parse_list(args.message_size, int)
+    if args.encryption:
+        sweep['encryption'] = parse_list(args.encryption, lambda v: 'envelope' if v == 'on' else v)
+    if args.concurrency:
+        sweep['concurrency'] = parse_list(args.concurrency, int)
+
+    # The handlers log every request at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+
+    report = run_sweep(sweep, args.requests, parse_latency(args.latency))
+    report['meta']['sweep'] = sweep
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            lines = compare(json.load(f), report)
+        print('\n'.join(lines), file=sys.stderr)
+        return 1 if any(line.startswith('!') for line in lines) else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Recall and latency benchmark for the quantized vector index
+
+Builds an int8 index over synthetic clustered embeddings and compares its
+top-k results and query latency with exact float32 search.
+BLAS is pinned to one thread (unless already configured) so the numbers
+match a single Lambda vCPU.
+
+Usage:
+    python -m benchmarks.vector_index_bench --output vector-bench.json
+    python -m benchmarks.vector_index_bench --count 20000 --dimensions 256 --quick
+    python -m benchmarks.vector_index_bench --block-rows 128 --block-rows 512
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+for _variable in ('OPENBLAS_NUM_THREADS', 'OMP_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(_variable, '1')
+
+import numpy as np  # noqa: E402
+from benchmarks.handler_bench import percentiles  # noqa: E402
+from src.shared.vector_index import VectorIndex, build_index  # noqa: E402
+
+TARGET_MS = 10.0
+
+
+def synthetic_embeddings(count: int, dimensions: int, seed: int = 0) -> np.ndarray:
+    """
+    Unit vectors grouped around random topics, roughly like document embeddings
+
+    Args:
+        count: Number of vectors
+        dimensions: Vector dimensions
+        seed: Random seed
+
+    Returns:
+        count x dimensions float32 array
+    """
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((max(1, count // 100), dimensions), dtype=np.float32)
+    vectors = topics[rng.integers(0, len(topics), count)]
+    vectors += 0.6 * rng.standard_normal((count, dimensions), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Ground-truth top-k rows by float32 cosine similarity"""
+    scores = queries @ vectors.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    """Mean fraction of the true top-k present in the found top-k"""
+    hits = sum(len(set(f.tolist()) & set(t.tolist())) for f, t in zip(found, truth))
+    return round(hits / truth.size, 4)
+
+
+def time_queries(search, queries: np.ndarray, batch: int) -> List[float]:
+    """Per-query latency in milliseconds, searching in batches of the given size"""
+    samples = []
+    search(queries[:batch])  # warm up caches and page in the file
+    for start in range(0, len(queries), batch):
+        began = time.perf_counter()
+        search(queries[start:start + batch])
+        elapsed = (time.perf_counter() - began) * 1000
+        samples.extend([elapsed / len(queries[start:start + batch])] * len(queries[start:start + batch]))
+    return samples
+
+
+def run_benchmark(
+    count: int,
+    dimensions: int,
+    queries: int = 200,
+    k: int = 10,
+    block_rows: Optional[List[int]] = None,
+    batch: int = 16
+) -> Dict[str, Any]:
+    """
+    Benchmark exact float32 search and the int8 index at each block size
+
+    Args:
+        count: Indexed vectors
+        dimensions: Vector dimensions
+        queries: Number of queries
+        k: Results per query
+        block_rows: Search block sizes to test (default: sized by VECTOR_SEARCH_BLOCK_BYTES)
+        batch: Queries per call in the batched measurement
+
+    Returns:
+        Report dictionary
+    """
+    vectors = synthetic_embeddings(count, dimensions)
+    rng = np.random.default_rng(1)
+    # Queries near stored vectors, so the true neighbours are meaningful
+    query_vectors = vectors[rng.integers(0, count, queries)] + 0.3 * rng.standard_normal((queries, dimensions), dtype=np.float32)
+    query_vectors = query_vectors.astype(np.float32)
+    unit_queries = query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    truth = exact_top_k(vectors, unit_queries, k)
+
+    exact_latency = time_queries(lambda q: exact_top_k(vectors, q, k), unit_queries, 1)
+    results = [{
+        'name': 'exact-float32',
+        'bytes': int(vectors.nbytes),
+        'recall': 1.0,
+        'latency_ms': percentiles(exact_latency),
+    }]
+
+    ids = [f"doc-{row // 10}.md#{row % 10}" for row in range(count)]
+    with tempfile.TemporaryDirectory(prefix='pai-vector-bench-') as workdir:
+        path = os.path.join(workdir, 'int8.pvi')
+        began = time.perf_counter()
+        build_index(path, vectors, ids, 'int8')
+        build_ms = (time.perf_counter() - began) * 1000
+
+        for rows in block_rows or [None]:
+            began = time.perf_counter()
+            index = VectorIndex(path, block_rows=rows)
+            open_ms = (time.perf_counter() - began) * 1000
+            try:
+                found, _ = index.search(query_vectors, k)
+                single = time_queries(lambda q: index.search(q, k), query_vectors, 1)
+                batched = time_queries(lambda q: index.search(q, k), query_vectors, batch)
+            finally:
+                index.close()
+
+            latency = percentiles(single)
+            results.append({
+                'name': 'int8',
+                'block_rows': index.block_rows,
+                'bytes': os.path.getsize(path),
+                'build_ms': round(build_ms, 1),
+                'open_ms': round(open_ms, 3),
+                'recall': recall(found, truth),
+                'latency_ms': latency,
+                f'batch{batch}_latency_ms': percentiles(batched),
+                'meets_target': latency['p50'] < TARGET_MS,
+            })
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'count': count,
+            'dimensions': dimensions,
+            'queries': queries,
+            'k': k,
+            'target_ms': TARGET_MS,
+        },
+        'results': results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--output', help='Write the JSON report to this file (default: stdout)')
+    parser.add_argument('--count', type=int, default=100_000, help='Indexed vectors')
+    parser.add_argument('--dimensions', type=int, default=512)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--block-rows', type=int, action='append', help='Search block size (repeatable)')
+    parser.add_argument('--quick', action='store_true', help='Fewer queries')
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        args.count,
+        args.dimensions,
+        queries=50 if args.quick else args.queries,
+        k=args.k,
+        block_rows=args.block_rows
+    )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
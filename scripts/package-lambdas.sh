@@ -41,6 +41,8 @@ mkdir -p "$CHATBOT_DIR"
 
 # Copy source code
 cp -r "$PROJECT_ROOT/src" "$CHATBOT_DIR/"
+# Startup command of the chat stream function (same package)
+chmod +x "$CHATBOT_DIR/src/chatbot/run_stream_server.sh"
 
 # Create chatbot zip
 cd "$CHATBOT_DIR"
@@ -1,39 +1,135 @@
 """
 Lambda authorizer for API key validation
+
+The API key secret is cached across warm invocations (see CachedSecret)
+and may hold either a single key:
+
+    {"api_key": "<key>"}
+
+or any number of keys stored as SHA-256 hashes of the key, each mapped to
+the principal it authenticates and optional context for the integration:
+
+    {"api_keys": {"<sha256 hex>": {"principal": "team-a", "context": {"tier": "pro"}}}}
+
+A bearer token is hashed once and looked up in O(1). Only digests are ever
+compared, so comparison timing reveals nothing about a valid key (the old
+'token == api_key' leaked a matching prefix). Decisions are cached
+in process by token hash, and allowed policies cover the whole stage
+(arn:.../<api>/<stage>/*) so API Gateway's authorizer cache can reuse one
+decision for every route.
+
+With RATE_LIMIT enabled, each principal's request bucket is also checked
+here so an over-limit client is stopped before the chatbot function is
+invoked. An authorizer can only allow or deny, so that denial carries
+'retryAfter' in its context for the ACCESS_DENIED gateway response to
+turn into a Retry-After header. Rate-limit denials are not cached in
+process, but API Gateway caches every authorizer result for its TTL, so
+only enable this when that cache is off; the chatbot handler enforces the
+same limits with 429 either way.
 """
 import os
-import json
-import boto3
+import hashlib
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from src.shared.cache import LRUCache
+from src.shared.rate_limiter import RateLimiter
+from src.shared.secrets import CachedSecret
+from src.shared.constants import (
+    ERROR_RATE_LIMIT,
+    RATE_LIMIT_TABLE_NAME,
+    RATE_LIMIT_REQUESTS_PER_MINUTE,
+    AUTH_DECISION_CACHE_SIZE,
+    AUTH_DECISION_TTL_SECONDS,
+)
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-secrets_client = boto3.client('secretsmanager')
-
 # Environment variables
 API_KEY_SECRET_ARN = os.environ.get('API_KEY_SECRET_ARN')
+RATE_LIMIT = os.environ.get('RATE_LIMIT', 'false').lower() == 'true'
+RATE_LIMIT_TABLE = os.environ.get('RATE_LIMIT_TABLE', RATE_LIMIT_TABLE_NAME)
+RATE_LIMIT_REQUESTS_PER_MINUTE = float(os.environ.get('RATE_LIMIT_REQUESTS_PER_MINUTE', RATE_LIMIT_REQUESTS_PER_MINUTE))
 
+DENIED_PRINCIPAL = 'anonymous'
 
-def get_api_key_from_secrets() -> str:
+
+def hash_token(token: str) -> str:
+    """Hex SHA-256 of an API key, as stored in the 'api_keys' map"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def parse_api_keys(secret: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
     """
-    Retrieve API key from AWS Secrets Manager
+    Build the key-hash -> principal map from the secret
+
+    Args:
+        secret: Decoded secret with 'api_keys' and/or the legacy 'api_key'
 
     Returns:
-        API key string
+        Dictionary of key hash to {'principal', 'context'}
     """
-    try:
-        response = secrets_client.get_secret_value(SecretId=API_KEY_SECRET_ARN)
-        secret = json.loads(response['SecretString'])
-        return secret.get('api_key', '')
-    except Exception as e:
-        logger.error(f"Error retrieving API key: {str(e)}")
-        raise
+    keys = {}
+    for key_hash, entry in (secret.get('api_keys') or {}).items():
+        if isinstance(entry, str):
+            entry = {'principal': entry}
+        keys[key_hash.lower()] = {
+            'principal': entry.get('principal') or f"key-{key_hash[:12]}",
+            'context': {k: str(v) for k, v in (entry.get('context') or {}).items()},
+        }
+
+    if secret.get('api_key'):
+        key_hash = hash_token(secret['api_key'])
+        keys.setdefault(key_hash, {'principal': f"key-{key_hash[:12]}", 'context': {}})
+
+    return keys
+
+
+api_keys = CachedSecret(API_KEY_SECRET_ARN, parse=parse_api_keys)
+
+# (secret version, token hash, resource) -> policy; rotating the secret invalidates every entry
+decision_cache = LRUCache(max_entries=AUTH_DECISION_CACHE_SIZE, ttl_seconds=AUTH_DECISION_TTL_SECONDS)
+
+# Input tokens are only known to the chatbot function, so only requests are limited here
+rate_limiter = RateLimiter(RATE_LIMIT_REQUESTS_PER_MINUTE, 0, table_name=RATE_LIMIT_TABLE) if RATE_LIMIT else None
+
+
+def lookup_principal(token_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    Find the principal for a token hash
+
+    Args:
+        token_hash: hash_token of the bearer token
+
+    Returns:
+        {'principal', 'context'} or None if the key is unknown
+    """
+    return api_keys.get().get(token_hash)
 
 
-def generate_policy(principal_id: str, effect: str, resource: str) -> Dict[str, Any]:
+def wildcard_resource(method_arn: str) -> str:
+    """
+    Widen a method ARN to every method and path of its stage
+
+    Args:
+        method_arn: e.g. arn:aws:execute-api:region:account:api-id/stage/POST/chat
+
+    Returns:
+        e.g. arn:aws:execute-api:region:account:api-id/stage/*
+    """
+    prefix, _, path = method_arn.partition(':execute-api:')
+    if not path:
+        return method_arn
+    parts = path.split('/')
+    return f"{prefix}:execute-api:{'/'.join(parts[:2])}/*"
+
+
+def generate_policy(
+    principal_id: str,
+    effect: str,
+    resource: str,
+    context: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
     """
     Generate IAM policy for API Gateway
 
@@ -41,6 +137,7 @@ def generate_policy(principal_id: str, effect: str, resource: str) -> Dict[str,
         principal_id: User identifier
         effect: 'Allow' or 'Deny'
         resource: API Gateway resource ARN
+        context: Optional string values passed to the integration and gateway responses
 
     Returns:
         IAM policy document
@@ -62,9 +159,44 @@ def generate_policy(principal_id: str, effect: str, resource: str) -> Dict[str,
         }
         auth_response['policyDocument'] = policy_document
 
+    if context:
+        auth_response['context'] = context
+
     return auth_response
 
 
+def authorize(token: str, method_arn: str) -> Dict[str, Any]:
+    """
+    Decide on a bearer token, using the in-process decision cache
+
+    Args:
+        token: API key without the 'Bearer ' prefix
+        method_arn: ARN of the method being called
+
+    Returns:
+        Allow or Deny policy for the whole stage
+    """
+    resource = wildcard_resource(method_arn)
+    token_hash = hash_token(token) if token else ''
+    # Reading the secret first keeps the version current (and refreshes it when due)
+    api_keys.get()
+    cache_key = (api_keys.version, token_hash, resource)
+
+    policy = decision_cache.get(cache_key)
+    if policy is None:
+        entry = lookup_principal(token_hash) if token else None
+        if entry is None:
+            logger.warning("API key validation failed")
+            policy = generate_policy(DENIED_PRINCIPAL, 'Deny', resource)
+        else:
+            logger.info(f"API key validation successful: {entry['principal']}")
+            policy = generate_policy(entry['principal'], 'Allow', resource,
+                                     {'principal': entry['principal'], **entry['context']})
+        decision_cache.put(cache_key, policy)
+
+    return policy
+
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda authorizer handler
@@ -84,18 +216,19 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if token.startswith('Bearer '):
             token = token[7:]
 
-        # Get valid API key from Secrets Manager
-        valid_api_key = get_api_key_from_secrets()
+        policy = authorize(token, event['methodArn'])
 
-        # Validate API key
-        if token and token == valid_api_key:
-            logger.info("API key validation successful")
-            return generate_policy('user', 'Allow', event['methodArn'])
-        else:
-            logger.warning("API key validation failed")
-            return generate_policy('user', 'Deny', event['methodArn'])
+        if rate_limiter is not None and policy['policyDocument']['Statement'][0]['Effect'] == 'Allow':
+            decision = rate_limiter.acquire(policy['principalId'])
+            if not decision.allowed:
+                return generate_policy(policy['principalId'], 'Deny', event['methodArn'], {
+                    'message': ERROR_RATE_LIMIT,
+                    'retryAfter': decision.retry_after_header
+                })
+
+        return policy
 
     except Exception as e:
         logger.error(f"Authorization error: {str(e)}")
         # Deny access on error
-        return generate_policy('user', 'Deny', event['methodArn'])
+        return generate_policy(DENIED_PRINCIPAL, 'Deny', event['methodArn'])
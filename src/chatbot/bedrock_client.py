@@ -2,14 +2,103 @@
 Amazon Bedrock client for LLM interactions
 """
 import os
-import json
-import boto3
+import time
 import logging
-from typing import List, Dict, Any
-from src.shared.constants import BEDROCK_MODEL_ID, BEDROCK_REGION, MAX_TOKENS, TEMPERATURE
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Optional
+from src.chatbot.embedding_cache import EmbeddingCache, text_digest
+from src.chatbot.providers import get_adapter, prompt_cache_min_tokens
+from src.chatbot.response_cache import ResponseCache, make_cache_key
+from src.shared import metrics
+from src.shared.aws_clients import get_client
+from src.shared.concurrency import get_executor
+from src.shared.utils import json_dumps, json_loads
+from src.shared.constants import (
+    BEDROCK_MODEL_ID,
+    BEDROCK_REGION,
+    MAX_TOKENS,
+    TEMPERATURE,
+    BEDROCK_MAX_POOL_CONNECTIONS,
+    BEDROCK_CONNECT_TIMEOUT,
+    BEDROCK_READ_TIMEOUT,
+    BEDROCK_MAX_ATTEMPTS,
+    EMBEDDING_MODEL_ID,
+    EMBEDDING_DIMENSIONS,
+    EMBED_MAX_WORKERS,
+    PROMPT_CACHING,
+)
 
 logger = logging.getLogger()
-bedrock_runtime = boto3.client('bedrock-runtime', region_name=BEDROCK_REGION)
+
+# Cohere embedding models take up to 96 texts of up to 2048 characters per request
+COHERE_MAX_TEXTS = 96
+COHERE_MAX_CHARS = 2048
+# Output sizes of embedding models without a dimensions setting
+FIXED_EMBEDDING_DIMENSIONS = {
+    'amazon.titan-embed-text-v1': 1536,
+    'amazon.titan-embed-g1-text-02': 1536,
+    'cohere.': 1024,
+}
+
+
+@lru_cache(maxsize=1)
+def _bedrock_config():
+    """
+    Client configuration for bedrock-runtime
+
+    Connections are reused across warm invocations; adaptive retries back
+    off client-side on throttling.
+    """
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=BEDROCK_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        connect_timeout=BEDROCK_CONNECT_TIMEOUT,
+        read_timeout=BEDROCK_READ_TIMEOUT,
+        retries={'mode': 'adaptive', 'max_attempts': BEDROCK_MAX_ATTEMPTS}
+    )
+
+
+def get_bedrock_runtime():
+    """Return the shared bedrock-runtime client, created on first use"""
+    return get_client('bedrock-runtime', region_name=BEDROCK_REGION, config=_bedrock_config())
+
+
+def embedding_dimensions(model_id: str, requested: int) -> int:
+    """
+    Output dimensions of an embedding model
+
+    Args:
+        model_id: Bedrock embedding model identifier
+        requested: Dimensions asked for (honoured by models that support it, e.g. Titan v2)
+
+    Returns:
+        Dimensions the model returns
+    """
+    for prefix, dimensions in FIXED_EMBEDDING_DIMENSIONS.items():
+        if model_id.startswith(prefix):
+            return dimensions
+    return requested
+
+
+def record_usage_metrics(usage: Dict[str, Any], seconds: float) -> None:
+    """
+    Record token counts and output throughput of a model call in the request metrics
+
+    Args:
+        usage: Normalized usage dictionary
+        seconds: Wall-clock duration of the call
+    """
+    output_tokens = usage.get('output_tokens', 0)
+    metrics.count('InputTokens', usage.get('input_tokens', 0))
+    metrics.count('OutputTokens', output_tokens)
+    if 'cache_read_input_tokens' in usage:
+        metrics.count('CacheReadInputTokens', usage['cache_read_input_tokens'])
+        metrics.count('CacheWriteInputTokens', usage.get('cache_write_input_tokens', 0))
+    request_metrics = metrics.current()
+    if request_metrics is not None and seconds > 0:
+        request_metrics.set_metric('TokensPerSecond', round(output_tokens / seconds, 1), 'Count/Second')
 
 
 class BedrockClient:
@@ -17,28 +106,96 @@ class BedrockClient:
     Client for interacting with Amazon Bedrock
     """
 
-    def __init__(self, model_id: str = None):
+    def __init__(
+        self,
+        model_id: str = None,
+        response_cache: Optional[ResponseCache] = None,
+        embedding_model_id: str = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        prompt_caching: bool = PROMPT_CACHING
+    ):
         """
         Initialize Bedrock client
 
         Args:
             model_id: Bedrock model identifier (optional, defaults to env var or constant)
+            response_cache: Optional exact-match cache for generate_response
+            embedding_model_id: Embedding model for embed (optional, defaults to env var or constant)
+            embedding_cache: Cache for embed; defaults to an in-memory LRU
+            prompt_caching: Mark long system prompts and history prefixes for Bedrock
+                            prompt caching (only for models whose adapter supports it)
         """
         # Allow environment variable to override default model
         if model_id is None:
             model_id = os.environ.get('BEDROCK_MODEL_ID', BEDROCK_MODEL_ID)
+        if embedding_model_id is None:
+            embedding_model_id = os.environ.get('EMBEDDING_MODEL_ID', EMBEDDING_MODEL_ID)
         self.model_id = model_id
+        self.adapter = get_adapter(model_id)
+        self.cache_min_tokens = (
+            prompt_cache_min_tokens(model_id) if prompt_caching and self.adapter.supports_prompt_caching else None
+        )
+        self.response_cache = response_cache
+        self.embedding_model_id = embedding_model_id
+        self.embedding_cache = embedding_cache if embedding_cache is not None else EmbeddingCache()
 
     def generate_response(
         self,
         messages: List[Dict[str, str]],
         system_prompt: str = None,
         max_tokens: int = MAX_TOKENS,
-        temperature: float = TEMPERATURE
+        temperature: float = TEMPERATURE,
+        force_cache: bool = False
     ) -> Dict[str, Any]:
         """
         Generate a response from Bedrock
 
+        With a response cache configured, deterministic requests (temperature 0)
+        are served from the cache; force_cache also caches sampled requests.
+
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            system_prompt: Optional system prompt
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            force_cache: Use the response cache even when temperature > 0
+
+        Returns:
+            Dictionary containing response and metadata
+        """
+        if self.response_cache is None or (temperature > 0 and not force_cache):
+            return self._invoke(messages, system_prompt, max_tokens, temperature)
+
+        key = make_cache_key(self.model_id, system_prompt, messages, max_tokens, temperature)
+        cached, tier = self.response_cache.get(key)
+        metrics.count('ResponseCacheHits' if cached is not None else 'ResponseCacheMisses')
+
+        if cached is None:
+            response = self._invoke(messages, system_prompt, max_tokens, temperature)
+            self.response_cache.put(key, response)
+        else:
+            response = cached
+
+        # Copy so per-call cache details never leak into the cached entry
+        response = {**response, "usage": {**response["usage"]}}
+        response["usage"]["response_cache"] = {
+            "hit": cached is not None,
+            "tier": tier,
+            "hits": self.response_cache.stats['hits'],
+            "misses": self.response_cache.stats['misses']
+        }
+        return response
+
+    def _invoke(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: str,
+        max_tokens: int,
+        temperature: float
+    ) -> Dict[str, Any]:
+        """
+        Invoke the Bedrock model and normalize its response
+
         Args:
             messages: List of message dictionaries with 'role' and 'content'
             system_prompt: Optional system prompt
@@ -49,97 +206,206 @@ class BedrockClient:
             Dictionary containing response and metadata
         """
         try:
-            # Determine model provider
-            is_anthropic = 'anthropic' in self.model_id.lower()
-            is_amazon = 'amazon' in self.model_id.lower()
-
-            # Prepare request body based on model provider
-            if is_anthropic:
-                # Claude models format
-                request_body = {
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": max_tokens,
-                    "temperature": temperature,
-                    "messages": messages
-                }
-                if system_prompt:
-                    request_body["system"] = system_prompt
-
-            elif is_amazon:
-                # Amazon Nova/Titan models format - content must be array
-                formatted_messages = []
-                for msg in messages:
-                    formatted_msg = {"role": msg["role"]}
-                    # Convert content to array format if it's a string
-                    if isinstance(msg.get("content"), str):
-                        formatted_msg["content"] = [{"text": msg["content"]}]
-                    else:
-                        formatted_msg["content"] = msg["content"]
-                    formatted_messages.append(formatted_msg)
-
-                request_body = {
-                    "messages": formatted_messages,
-                    "inferenceConfig": {
-                        "maxTokens": max_tokens,
-                        "temperature": temperature
-                    }
-                }
-                if system_prompt:
-                    request_body["system"] = [{"text": system_prompt}]
-            else:
-                # Default to Claude format
-                request_body = {
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": max_tokens,
-                    "temperature": temperature,
-                    "messages": messages
-                }
-                if system_prompt:
-                    request_body["system"] = system_prompt
+            request_body = self.adapter.build_request(
+                messages, system_prompt, max_tokens, temperature, self.cache_min_tokens
+            )
 
             # Invoke Bedrock model
-            response = bedrock_runtime.invoke_model(
+            start = time.perf_counter()
+            with metrics.span('bedrock'):
+                response = get_bedrock_runtime().invoke_model(
+                    modelId=self.model_id,
+                    body=json_dumps(request_body),
+                    contentType='application/json',
+                    accept='application/json'
+                )
+
+                # Parse response
+                response_body = json_loads(response['body'].read())
+            assistant_message, stop_reason, usage = self.adapter.parse_response(response_body)
+
+            if not usage:
+                # Providers without usage in the body report token counts in response headers
+                headers = response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+                usage = {
+                    "input_tokens": int(headers.get('x-amzn-bedrock-input-token-count', 0)),
+                    "output_tokens": int(headers.get('x-amzn-bedrock-output-token-count', 0))
+                }
+
+            record_usage_metrics(usage, time.perf_counter() - start)
+            return {
+                "message": assistant_message,
+                "stop_reason": stop_reason,
+                "usage": usage,
+                "model": self.model_id
+            }
+
+        except Exception as e:
+            logger.error(f"Bedrock invocation error: {str(e)}")
+            raise
+
+    def stream_response(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: str = None,
+        max_tokens: int = MAX_TOKENS,
+        temperature: float = TEMPERATURE
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a response from Bedrock as it is generated
+
+        Yields normalized events:
+            {'type': 'delta', 'text': str} for each piece of generated text
+            {'type': 'done', 'message': str, 'stop_reason': str, 'usage': dict, 'model': str} once at the end
+
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            system_prompt: Optional system prompt
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+
+        Returns:
+            Iterator of normalized stream events
+        """
+        try:
+            request_body = self.adapter.build_request(
+                messages, system_prompt, max_tokens, temperature, self.cache_min_tokens
+            )
+
+            start = time.perf_counter()
+            response = get_bedrock_runtime().invoke_model_with_response_stream(
                 modelId=self.model_id,
-                body=json.dumps(request_body),
+                body=json_dumps(request_body),
                 contentType='application/json',
                 accept='application/json'
             )
 
-            # Parse response
-            response_body = json.loads(response['body'].read())
+            parts = []
+            stop_reason = None
+            usage = {"input_tokens": 0, "output_tokens": 0}
 
-            # Log response structure for debugging
-            logger.info(f"Bedrock response keys: {list(response_body.keys())}")
+            for event in response['body']:
+                chunk = event.get('chunk')
+                if not chunk:
+                    continue
 
-            # Extract message content (works for both Claude and Amazon models)
-            if 'content' in response_body and isinstance(response_body['content'], list):
-                assistant_message = response_body['content'][0].get('text', '')
-            elif 'output' in response_body:
-                # Some Amazon models use 'output'
-                assistant_message = response_body['output'].get('message', {}).get('content', [{}])[0].get('text', '')
-            else:
-                assistant_message = str(response_body)
+                text, event_stop_reason, event_usage = self.adapter.parse_stream_chunk(json_loads(chunk['bytes']))
 
-            # Extract usage information (different formats for different models)
-            usage_raw = response_body.get('usage', {})
-
-            # Normalize to snake_case for consistency
-            usage = {
-                "input_tokens": usage_raw.get('input_tokens') or usage_raw.get('inputTokens', 0),
-                "output_tokens": usage_raw.get('output_tokens') or usage_raw.get('outputTokens', 0)
-            }
+                if text:
+                    parts.append(text)
+                    yield {"type": "delta", "text": text}
+                if event_stop_reason:
+                    stop_reason = event_stop_reason
+                for key, value in event_usage.items():
+                    if value:
+                        usage[key] = value
 
-            return {
-                "message": assistant_message,
-                "stop_reason": response_body.get('stop_reason') or response_body.get('stopReason'),
+            elapsed = time.perf_counter() - start
+            metrics.record('bedrock', elapsed * 1000)
+            record_usage_metrics(usage, elapsed)
+            yield {
+                "type": "done",
+                "message": ''.join(parts),
+                "stop_reason": stop_reason,
                 "usage": usage,
                 "model": self.model_id
             }
 
         except Exception as e:
-            logger.error(f"Bedrock invocation error: {str(e)}")
+            logger.error(f"Bedrock streaming error: {str(e)}")
             raise
 
+    def embed(
+        self,
+        texts: List[str],
+        model_id: str = None,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+        input_type: str = 'search_document'
+    ):
+        """
+        Embed texts, calling Bedrock only for texts not already cached
+
+        Identical texts are embedded once per call. Titan takes one text per
+        request, so misses fan out over a shared thread pool; Cohere takes up
+        to COHERE_MAX_TEXTS texts per request.
+
+        Args:
+            texts: Texts to embed
+            model_id: Embedding model (defaults to the client's embedding model)
+            dimensions: Output dimensions for models that support a setting
+            input_type: Cohere input type, 'search_document' or 'search_query'
+
+        Returns:
+            C-contiguous float32 NumPy array of shape (len(texts), dimensions)
+        """
+        import numpy as np
+
+        model_id = model_id or self.embedding_model_id
+        dimensions = embedding_dimensions(model_id, dimensions)
+        model_key = f"{model_id}:{dimensions}"
+        if model_id.startswith('cohere.'):
+            model_key += f":{input_type}"
+
+        digests = {text: text_digest(text) for text in texts}
+        vectors = self.embedding_cache.get_many(model_key, set(digests.values()))
+        missing = [text for text, digest in digests.items() if digest not in vectors]
+        metrics.count('EmbeddingCacheHits', len(digests) - len(missing))
+        metrics.count('EmbeddingCacheMisses', len(missing))
+
+        if missing:
+            try:
+                with metrics.span('embedding'):
+                    fresh = self._embed_uncached(missing, model_id, dimensions, input_type)
+            except Exception as e:
+                logger.error(f"Bedrock embedding error: {str(e)}")
+                raise
+            if fresh.shape[1] != dimensions:
+                raise ValueError(f"{model_id} returned {fresh.shape[1]} dimensions, expected {dimensions}")
+            new_vectors = {digests[text]: row for text, row in zip(missing, fresh)}
+            self.embedding_cache.put_many(model_key, new_vectors)
+            vectors.update(new_vectors)
+
+        result = np.empty((len(texts), dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            result[row] = vectors[digests[text]]
+        return result
+
+    def _embed_uncached(self, texts: List[str], model_id: str, dimensions: int, input_type: str):
+        """Call the embedding model for texts, returning a float32 matrix in input order"""
+        import numpy as np
+
+        executor = get_executor('embeddings', EMBED_MAX_WORKERS)
+        if model_id.startswith('cohere.'):
+            batches = [texts[start:start + COHERE_MAX_TEXTS] for start in range(0, len(texts), COHERE_MAX_TEXTS)]
+            results = executor.map(lambda batch: self._invoke_cohere_embed(batch, model_id, input_type), batches)
+            rows = [row for batch in results for row in batch]
+        else:
+            rows = list(executor.map(lambda text: self._invoke_titan_embed(text, model_id, dimensions), texts))
+        metrics.count('EmbeddedTexts', len(texts))
+        return np.array(rows, dtype=np.float32)
+
+    def _invoke_embedding_model(self, model_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        response = get_bedrock_runtime().invoke_model(
+            modelId=model_id,
+            body=json_dumps(body),
+            contentType='application/json',
+            accept='application/json'
+        )
+        return json_loads(response['body'].read())
+
+    def _invoke_titan_embed(self, text: str, model_id: str, dimensions: int) -> List[float]:
+        body = {'inputText': text}
+        if model_id.startswith('amazon.titan-embed-text-v2'):
+            body.update(dimensions=dimensions, normalize=True)
+        response = self._invoke_embedding_model(model_id, body)
+        metrics.count('EmbeddingInputTokens', response.get('inputTextTokenCount', 0))
+        return response['embedding']
+
+    def _invoke_cohere_embed(self, texts: List[str], model_id: str, input_type: str) -> List[List[float]]:
+        # Cohere rejects longer inputs unless truncation is requested
+        body = {'texts': [text[:COHERE_MAX_CHARS] for text in texts], 'input_type': input_type, 'truncate': 'END'}
+        return self._invoke_embedding_model(model_id, body)['embeddings']
+
     def format_conversation(self, conversation_history: List[Dict[str, str]]) -> List[Dict[str, str]]:
         """
         Format conversation history for Bedrock API
@@ -0,0 +1,337 @@
+"""
+Token-budget-aware context window for chat turns
+
+Instead of a fixed number of history messages, the newest messages that
+fit an estimated input-token budget are sent to the model. Older turns can
+optionally be folded into a rolling summary stored on the conversation.
+The summary is read alongside the history. Every message before the kept
+window is folded in, including messages older than the fetched history
+(summary_seq on the header records how far the summary reaches). Folding
+runs in the background; a turn waits for it only up to a time budget and
+otherwise uses the stored summary while the update completes. An update
+cut short when Lambda freezes the container is safe: summary_seq only
+advances when a summary is saved, so the next turn folds the same messages.
+"""
+import logging
+from concurrent.futures import Future, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.chatbot.conversation_manager import ConversationManager
+from src.shared import metrics
+from src.shared.concurrency import get_executor
+from src.shared.timing import StageTimer, optional_stage
+from src.shared.constants import (
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_MAX_MESSAGES,
+    CONTEXT_READ_MAX_WORKERS,
+    SUMMARY_MIN_MESSAGES,
+    SUMMARY_MAX_TOKENS,
+    SUMMARY_FOLD_MAX_MESSAGES,
+    SUMMARY_TIMEOUT_SECONDS,
+    SUMMARY_MAX_WORKERS,
+)
+
+logger = logging.getLogger()
+
+# Roughly four characters per token for English text; cheap and close enough for budgeting
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a concise running summary of a conversation between a user and an assistant. "
+    "Keep facts, decisions, names and open questions. Reply with the updated summary only."
+)
+
+# (previous summary or None, messages to fold in) -> updated summary
+Summarizer = Callable[[Optional[str], List[Dict[str, Any]]], str]
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Estimate the token count of a text
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated number of tokens
+    """
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    """
+    Estimate the token count of a chat message including role overhead
+
+    Args:
+        message: Message dictionary with 'content'
+
+    Returns:
+        Estimated number of tokens
+    """
+    return estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+
+
+def normalize_alternation(messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Make a message list valid for the Messages API
+
+    Leading assistant messages are dropped and consecutive messages from the
+    same role (e.g. a user message whose reply was never stored) are merged.
+
+    Args:
+        messages: Messages oldest first
+
+    Returns:
+        New list of {'role', 'content'} dictionaries starting with a user message
+    """
+    normalized = []
+    for message in messages:
+        if message['role'] not in ('user', 'assistant'):
+            continue
+        if not normalized and message['role'] != 'user':
+            continue
+
+        if normalized and normalized[-1]['role'] == message['role']:
+            normalized[-1]['content'] += "\n\n" + message['content']
+        else:
+            normalized.append({'role': message['role'], 'content': message['content']})
+
+    return normalized
+
+
+def bedrock_summarizer(bedrock_client: Any, max_tokens: int = SUMMARY_MAX_TOKENS) -> Summarizer:
+    """
+    Build a summarizer that asks the Bedrock model to fold messages into the summary
+
+    Args:
+        bedrock_client: BedrockClient instance
+        max_tokens: Maximum summary length in tokens
+
+    Returns:
+        Summarizer callable
+    """
+    def summarize(previous_summary: Optional[str], messages: List[Dict[str, Any]]) -> str:
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        prompt = f"Current summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"
+
+        response = bedrock_client.generate_response(
+            messages=[{'role': 'user', 'content': prompt}],
+            system_prompt=SUMMARY_SYSTEM_PROMPT,
+            max_tokens=max_tokens,
+            temperature=0.0
+        )
+        return response['message']
+
+    return summarize
+
+
+class ContextBuilder:
+    """
+    Selects conversation history to fit an input-token budget
+    """
+
+    def __init__(
+        self,
+        conversation_manager: ConversationManager,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        max_messages: int = CONTEXT_MAX_MESSAGES,
+        summarizer: Optional[Summarizer] = None,
+        summary_min_messages: int = SUMMARY_MIN_MESSAGES,
+        summary_fold_max_messages: int = SUMMARY_FOLD_MAX_MESSAGES,
+        summary_timeout: float = SUMMARY_TIMEOUT_SECONDS
+    ):
+        """
+        Initialize context builder
+
+        Args:
+            conversation_manager: Source of conversation history and summaries
+            token_budget: Estimated input tokens allowed for system prompt, history and new message
+            max_messages: Most history messages considered per turn
+            summarizer: Optional summarizer; when set, dropped turns are folded into a rolling summary
+            summary_min_messages: Unsummarized messages to accumulate before updating the summary
+            summary_fold_max_messages: Most messages folded into the summary per turn
+            summary_timeout: Seconds a turn waits for the summary update before using the stored one
+        """
+        self.conversation_manager = conversation_manager
+        self.token_budget = token_budget
+        self.max_messages = max_messages
+        self.summarizer = summarizer
+        self.summary_min_messages = summary_min_messages
+        self.summary_fold_max_messages = summary_fold_max_messages
+        self.summary_timeout = summary_timeout
+
+    def build(
+        self,
+        conversation_id: Optional[str],
+        user_message: str,
+        system_prompt: Optional[str] = None,
+        timer: Optional[StageTimer] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the model input for a chat turn
+
+        Args:
+            conversation_id: Existing conversation, or None for a new one
+            user_message: New user message
+            system_prompt: Optional system prompt from the request
+            timer: Optional StageTimer for the 'history' and 'summary' stages
+
+        Returns:
+            Dictionary with messages, system_prompt, input_tokens_estimate,
+            history_messages (number of stored messages included), summary_used and
+            summary_write (Future of a background summary update, or None; give it a
+            bounded wait before the invocation returns, since Lambda freezes background
+            threads and an unfinished update is redone by a later turn)
+
+        Raises:
+            ConversationNotFound: If conversation_id does not exist
+        """
+        new_message = {'role': 'user', 'content': user_message}
+        fixed_tokens = estimate_tokens(system_prompt) + estimate_message_tokens(new_message)
+
+        # The summary does not depend on the history, so both reads are in flight together
+        summary_future = None
+        if self.summarizer and conversation_id:
+            summary_future = get_executor('context-reads', CONTEXT_READ_MAX_WORKERS).submit(
+                self.conversation_manager.get_summary, conversation_id
+            )
+
+        history = []
+        if conversation_id:
+            with optional_stage(timer, 'history'):
+                history = self.conversation_manager.get_conversation_history(conversation_id, limit=self.max_messages)
+
+        selected = self._select(history, self.token_budget - fixed_tokens)
+        dropped = history[:len(history) - len(selected)]
+
+        summary = None
+        summary_write = None
+        older_messages_exist = bool(dropped) or (history and history[0].get('seq', 1) > 1)
+        if summary_future is not None and older_messages_exist:
+            with optional_stage(timer, 'summary'):
+                summary, summary_write = self._update_summary(
+                    conversation_id, summary_future.result(), dropped, history[0].get('seq', 1)
+                )
+
+        if summary:
+            summary_block = f"Summary of the earlier conversation:\n{summary}"
+            system_prompt = f"{system_prompt}\n\n{summary_block}" if system_prompt else summary_block
+            fixed_tokens = estimate_tokens(system_prompt) + estimate_message_tokens(new_message)
+            selected = self._select(selected, self.token_budget - fixed_tokens)
+
+        messages = normalize_alternation(selected + [new_message])
+
+        return {
+            'messages': messages,
+            'system_prompt': system_prompt,
+            'input_tokens_estimate': estimate_tokens(system_prompt) + sum(estimate_message_tokens(m) for m in messages),
+            'history_messages': len(selected),
+            'summary_used': bool(summary),
+            'summary_write': summary_write
+        }
+
+    def _select(self, history: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+        """
+        Take the newest contiguous messages that fit the budget, starting on a user message
+
+        Args:
+            history: Messages oldest first
+            budget: Tokens available for history
+
+        Returns:
+            Selected suffix of history
+        """
+        used = 0
+        start = len(history)
+        for index in range(len(history) - 1, -1, -1):
+            used += estimate_message_tokens(history[index])
+            if used > budget:
+                break
+            start = index
+
+        # The window has to open with a user message to keep alternation valid
+        while start < len(history) and history[start]['role'] != 'user':
+            start += 1
+
+        return history[start:]
+
+    def _update_summary(
+        self,
+        conversation_id: str,
+        stored: Tuple[Optional[str], int],
+        dropped: List[Dict[str, Any]],
+        window_start_seq: int
+    ) -> Tuple[Optional[str], Optional[Future]]:
+        """
+        Fold messages before the kept window into the rolling summary once enough have accumulated
+
+        Args:
+            conversation_id: Conversation identifier
+            stored: (summary, summary_seq) as returned by ConversationManager.get_summary
+            dropped: Fetched history messages that did not fit the budget, oldest first
+            window_start_seq: Sequence number of the oldest fetched history message
+
+        Returns:
+            Tuple of (summary to use this turn or None, Future of the summary update or None)
+        """
+        summary, summary_seq = stored
+        # Messages between the summary and the fetched history were never seen by this turn
+        unfetched = max(0, window_start_seq - 1 - summary_seq)
+        unfolded = [m for m in dropped if m.get('seq', 0) > summary_seq]
+        if unfetched + len(unfolded) < self.summary_min_messages:
+            return summary, None
+
+        summary_write = get_executor('summaries', SUMMARY_MAX_WORKERS).submit(
+            self._fold_summary, conversation_id, summary, summary_seq, unfetched, unfolded
+        )
+        done, _ = wait([summary_write], timeout=self.summary_timeout)
+        if done and summary_write.result():
+            summary = summary_write.result()
+        else:
+            metrics.count('SummaryDeferred')
+        return summary, summary_write
+
+    def _fold_summary(
+        self,
+        conversation_id: str,
+        summary: Optional[str],
+        summary_seq: int,
+        unfetched: int,
+        unfolded: List[Dict[str, Any]]
+    ) -> Optional[str]:
+        """
+        Summarize the oldest unsummarized messages and store the result
+
+        Args:
+            conversation_id: Conversation identifier
+            summary: Stored summary
+            summary_seq: Sequence number of the last message the stored summary covers
+            unfetched: Number of unsummarized messages older than the fetched history
+            unfolded: Unsummarized fetched messages outside the kept window
+
+        Returns:
+            Updated summary, or None if the update failed
+        """
+        try:
+            messages = []
+            if unfetched:
+                messages = self.conversation_manager.get_messages(
+                    conversation_id, since_seq=summary_seq,
+                    limit=min(unfetched, self.summary_fold_max_messages)
+                )
+            # The fold stays contiguous: fetched messages only follow a fully caught-up gap
+            if len(messages) >= unfetched:
+                messages += unfolded
+            messages = messages[:self.summary_fold_max_messages]
+            if not messages:
+                return None
+
+            summary = self.summarizer(summary, messages)
+            self.conversation_manager.save_summary(conversation_id, summary, messages[-1]['seq'])
+            return summary
+        except Exception as e:
+            # A stale summary is better than failing the turn
+            logger.error(f"Error updating summary: {str(e)}")
+            return None
@@ -1,17 +1,185 @@
 """
 Conversation history manager with DynamoDB
+
+Storage layout:
+    Conversations table: one small header item per conversation
+        (conversation_id, user_id, created_at, updated_at, message_count, ttl,
+         and optionally summary/summary_seq for the rolling summary of older turns);
+        the UserIdUpdatedIndex GSI (user_id + updated_at) projects only listing metadata
+    Messages table: one item per message keyed by conversation_id + seq
+        (seq starts at 1 and matches the header's message_count)
+
+Conversations written before this layout keep their messages in a list on
+the header item; they are moved to the messages table the first time they
+are read or appended to.
+
+Without encryption, content may be compressed by a ContentCodec and stored
+as a binary attribute (string content is plaintext). With encryption the
+EncryptionManager's codec compresses before encrypting.
+
+Encrypted message content is decrypted lazily: messages returned by the
+manager hold ciphertext until their content is read or serialized, and
+decrypt_messages decrypts a batch through the shared thread pool.
+
+Recent decrypted history is kept in a per-container LRU cache. Entries are
+versioned by the header's message_count: a hit only costs a strongly
+consistent read of that one attribute, and this manager's own writes update
+the cache in place.
 """
+import json
 import uuid
-import boto3
+import base64
 import logging
+import threading
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from src.shared.constants import CONVERSATIONS_TABLE_NAME, CONVERSATION_TTL_DAYS
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from botocore.exceptions import ClientError
+from src.shared.constants import (
+    CONVERSATIONS_TABLE_NAME,
+    MESSAGES_TABLE_NAME,
+    CONVERSATION_TTL_DAYS,
+    USER_ID_INDEX_NAME,
+    CONVERSATION_HEADER_FIELDS,
+    CONVERSATION_LIST_DEFAULT_LIMIT,
+    TURN_WRITE_ATTEMPTS,
+    WRITE_MAX_WORKERS,
+    HISTORY_CACHE_MAX_ENTRIES,
+    HISTORY_CACHE_MAX_BYTES,
+    HISTORY_CACHE_MESSAGES,
+)
+from src.shared import metrics
+from src.shared.cache import LRUCache
+from src.shared.dynamodb import DynamoDBTable, transact_write_items
+from src.shared.concurrency import get_executor
+from src.shared.timing import StageTimer, optional_stage
 from src.shared.utils import get_ttl_timestamp
 from src.shared.encryption import EncryptionManager
+from src.shared.compression import ContentCodec, decode_content
 
 logger = logging.getLogger()
-dynamodb = boto3.resource('dynamodb')
+
+
+class ConversationNotFound(Exception):
+    """Raised when a conversation id does not exist"""
+
+
+# Message attributes a client may select with get_messages(fields=...), in response order
+MESSAGE_FIELDS = ('seq', 'role', 'content', 'timestamp')
+
+
+class DecryptStats:
+    """
+    Counts how many fetched messages were actually decrypted
+    """
+
+    def __init__(self, fetched: int = 0):
+        self.fetched = fetched
+        self.decrypted = 0
+        self._lock = threading.Lock()
+
+    def record_decrypted(self, count: int = 1) -> None:
+        with self._lock:
+            self.decrypted += count
+
+    @property
+    def skipped(self) -> int:
+        return self.fetched - self.decrypted
+
+    def as_dict(self) -> Dict[str, int]:
+        return {'fetched': self.fetched, 'decrypted': self.decrypted, 'skipped': self.skipped}
+
+
+class LazyMessage(dict):
+    """
+    Message dictionary whose 'content' stays encrypted until it is accessed
+
+    Reads through [], get(), items(), values(), dict() and json.dumps all
+    trigger decryption of the content on first use.
+    """
+
+    def __init__(self, item: Dict[str, Any], encryption_manager: EncryptionManager, stats: DecryptStats):
+        super().__init__(item)
+        self._encryption_manager = encryption_manager
+        self._stats = stats
+        self._decrypted = False
+
+    @property
+    def is_decrypted(self) -> bool:
+        return self._decrypted
+
+    @property
+    def ciphertext(self) -> Optional[str]:
+        return None if self._decrypted else dict.get(self, 'content')
+
+    def set_plaintext(self, plaintext: str) -> None:
+        """Store already-decrypted content (used by batch decryption)"""
+        if not self._decrypted:
+            dict.__setitem__(self, 'content', plaintext)
+            self._decrypted = True
+            self._stats.record_decrypted()
+
+    def _ensure_decrypted(self) -> None:
+        if not self._decrypted and dict.__contains__(self, 'content'):
+            self.set_plaintext(self._encryption_manager.decrypt(dict.__getitem__(self, 'content')))
+
+    def __getitem__(self, key):
+        if key == 'content':
+            self._ensure_decrypted()
+        return dict.__getitem__(self, key)
+
+    def __setitem__(self, key, value):
+        if key == 'content':
+            self._decrypted = True
+        dict.__setitem__(self, key, value)
+
+    def __iter__(self):
+        # Overriding __iter__ makes dict(msg) and {**msg} go through __getitem__
+        return dict.__iter__(self)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        self._ensure_decrypted()
+        return dict.items(self)
+
+    def values(self):
+        self._ensure_decrypted()
+        return dict.values(self)
+
+    def copy(self):
+        return dict(self.items())
+
+
+def _history_entry_size(entry: Dict[str, Any]) -> int:
+    """Approximate in-memory size of a cached history entry"""
+    return sum(len(m['content']) + 64 for m in entry['messages']) + 64
+
+
+def _encode_cursor(last_key: Dict[str, Any]) -> str:
+    """Opaque page cursor for a wire-format LastEvaluatedKey"""
+    return base64.urlsafe_b64encode(json.dumps(last_key, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str, user_id: str) -> Dict[str, Any]:
+    """
+    Turn a page cursor back into an ExclusiveStartKey
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another user
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if (
+        not isinstance(key, dict)
+        or set(key) != {'user_id', 'updated_at', 'conversation_id'}
+        or not all(isinstance(value, dict) and set(value) == {'S'} for value in key.values())
+        or key['user_id']['S'] != user_id
+    ):
+        raise ValueError("Invalid cursor")
+    return key
 
 
 class ConversationManager:
@@ -19,16 +187,36 @@ class ConversationManager:
     Manages conversation history in DynamoDB
     """
 
-    def __init__(self, table_name: str = CONVERSATIONS_TABLE_NAME, encryption_manager: Optional[EncryptionManager] = None):
+    def __init__(
+        self,
+        table_name: str = CONVERSATIONS_TABLE_NAME,
+        encryption_manager: Optional[EncryptionManager] = None,
+        messages_table_name: str = MESSAGES_TABLE_NAME,
+        codec: Optional[ContentCodec] = None
+    ):
         """
         Initialize conversation manager
 
         Args:
-            table_name: DynamoDB table name
+            table_name: DynamoDB table name for conversation headers
             encryption_manager: Optional encryption manager for E2E encryption
+            messages_table_name: DynamoDB table name for individual messages
+            codec: Optional codec compressing unencrypted content (encrypted content
+                uses the encryption manager's codec)
         """
-        self.table = dynamodb.Table(table_name)
+        self.table = DynamoDBTable(table_name)
+        self.messages_table = DynamoDBTable(messages_table_name)
         self.encryption_manager = encryption_manager
+        self.codec = codec
+        self.last_decrypt_stats = DecryptStats()
+
+        # conversation_id -> {'version': int, 'first_seq': int, 'messages': [plaintext messages]}
+        self.history_cache = LRUCache(
+            max_entries=HISTORY_CACHE_MAX_ENTRIES,
+            max_bytes=HISTORY_CACHE_MAX_BYTES,
+            sizeof=_history_entry_size
+        )
+        self.history_cache_stats = {'hits': 0, 'misses': 0}
 
     def create_conversation(self, user_id: str, initial_message: Dict[str, str]) -> str:
         """
@@ -44,25 +232,21 @@ class ConversationManager:
         conversation_id = str(uuid.uuid4())
         timestamp = datetime.utcnow().isoformat()
 
-        messages = [initial_message]
-
-        # Encrypt if encryption manager is available
-        if self.encryption_manager:
-            for msg in messages:
-                msg['content'] = self.encryption_manager.encrypt(msg['content'])
-
         try:
-            self.table.put_item(
-                Item={
-                    'conversation_id': conversation_id,
-                    'user_id': user_id,
-                    'created_at': timestamp,
-                    'updated_at': timestamp,
-                    'messages': messages,
-                    'ttl': get_ttl_timestamp(CONVERSATION_TTL_DAYS)
-                }
+            self._transact_messages(
+                conversation_id,
+                expected_count=None,
+                items=[self._build_message_item(conversation_id, 1, initial_message, timestamp, 0)],
+                timestamp=timestamp,
+                user_id=user_id
             )
 
+            self.history_cache.put(conversation_id, {
+                'version': 1,
+                'first_seq': 1,
+                'messages': [{**initial_message, 'timestamp': timestamp, 'seq': 1}]
+            })
+
             logger.info(f"Created conversation: {conversation_id}")
             return conversation_id
 
@@ -86,11 +270,14 @@ class ConversationManager:
             )
 
             conversation = response.get('Item')
+            if not conversation:
+                return None
+
+            if 'messages' in conversation:
+                self._migrate_legacy_conversation(conversation)
 
-            # Decrypt if encryption manager is available
-            if conversation and self.encryption_manager:
-                for msg in conversation.get('messages', []):
-                    msg['content'] = self.encryption_manager.decrypt(msg['content'])
+            items = self._query_messages(conversation_id)
+            conversation['messages'] = self._to_messages(items)
 
             return conversation
 
@@ -98,6 +285,162 @@ class ConversationManager:
             logger.error(f"Error retrieving conversation: {str(e)}")
             return None
 
+    def get_conversation_header(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read only the conversation metadata needed to validate a cached copy
+
+        Legacy conversations are migrated so message_count is always set.
+
+        Args:
+            conversation_id: Conversation identifier
+
+        Returns:
+            Dictionary with conversation_id, created_at, updated_at and message_count, or None
+        """
+        names = {f'#{field}': field for field in CONVERSATION_HEADER_FIELDS}
+        response = self.table.get_item(
+            Key={'conversation_id': conversation_id},
+            ProjectionExpression=', '.join(names),
+            ExpressionAttributeNames=names
+        )
+        header = response.get('Item')
+        if not header:
+            return None
+
+        if header.get('message_count') is None:
+            header['message_count'] = self._current_message_count(conversation_id)
+        header['message_count'] = int(header['message_count'])
+        return header
+
+    def get_messages(
+        self,
+        conversation_id: str,
+        since_seq: Optional[int] = None,
+        since_timestamp: Optional[str] = None,
+        limit: Optional[int] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Read a window of a conversation's messages
+
+        With a 'since' bound the oldest messages after it are returned (so
+        clients can page forward); without one, limit selects the newest
+        messages. Sequence bounds are part of the key condition; timestamp
+        bounds are a filter, so they save decryption and transfer but not
+        read capacity. Only the requested attributes are read.
+
+        Args:
+            conversation_id: Conversation identifier
+            since_seq: Only messages with a greater sequence number
+            since_timestamp: Only messages with a later ISO-8601 timestamp
+            limit: Maximum number of messages
+            fields: Message attributes to return (a subset of MESSAGE_FIELDS); 'seq' is always included
+
+        Returns:
+            Messages in ascending sequence order; content is decrypted lazily
+        """
+        fields = [f for f in MESSAGE_FIELDS if f == 'seq' or fields is None or f in fields]
+        names = {f'#{field}': field for field in fields}
+        query_kwargs = {
+            'KeyConditionExpression': 'conversation_id = :cid',
+            'ExpressionAttributeValues': {':cid': conversation_id},
+            'ProjectionExpression': ', '.join(names),
+        }
+        if since_seq is not None:
+            query_kwargs['KeyConditionExpression'] += ' AND seq > :since'
+            query_kwargs['ExpressionAttributeValues'][':since'] = since_seq
+        if since_timestamp is not None:
+            names['#since_ts'] = 'timestamp'
+            query_kwargs['FilterExpression'] = '#since_ts > :since_ts'
+            query_kwargs['ExpressionAttributeValues'][':since_ts'] = since_timestamp
+        query_kwargs['ExpressionAttributeNames'] = names
+
+        forward = since_seq is not None or since_timestamp is not None
+        if limit is not None:
+            query_kwargs['Limit'] = limit
+        if not forward:
+            query_kwargs['ScanIndexForward'] = False
+
+        items = []
+        while True:
+            response = self.messages_table.query(**query_kwargs)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response or (limit is not None and len(items) >= limit):
+                break
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        if limit is not None:
+            items = items[:limit]
+        if not forward:
+            items.reverse()
+        return self._to_messages(items, fields)
+
+    def list_conversations(
+        self,
+        user_id: str,
+        limit: int = CONVERSATION_LIST_DEFAULT_LIMIT,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        List a user's conversations, most recently updated first
+
+        Reads only the metadata projected into the user index, so the cost
+        does not depend on conversation length.
+
+        Args:
+            user_id: User identifier
+            limit: Maximum conversations per page
+            cursor: Opaque cursor from a previous page
+
+        Returns:
+            Dictionary with 'conversations' (conversation_id, created_at, updated_at,
+            message_count and title when set) and 'next_cursor' (None on the last page)
+
+        Raises:
+            ValueError: If the cursor is malformed or belongs to another user
+        """
+        query_kwargs = {
+            'IndexName': USER_ID_INDEX_NAME,
+            'KeyConditionExpression': 'user_id = :uid',
+            'ExpressionAttributeValues': {':uid': user_id},
+            'ProjectionExpression': '#id, #created, #updated, #count, #title',
+            'ExpressionAttributeNames': {
+                '#id': 'conversation_id',
+                '#created': 'created_at',
+                '#updated': 'updated_at',
+                '#count': 'message_count',
+                '#title': 'title',
+            },
+            'ScanIndexForward': False,
+            'Limit': limit,
+        }
+        if cursor:
+            query_kwargs['ExclusiveStartKey'] = _decode_cursor(cursor, user_id)
+
+        try:
+            response = self.table.query(**query_kwargs)
+        except Exception as e:
+            logger.error(f"Error listing conversations: {str(e)}")
+            raise
+
+        conversations = []
+        for item in response.get('Items', []):
+            conversation = {
+                'conversation_id': item['conversation_id'],
+                'created_at': item.get('created_at'),
+                'updated_at': item.get('updated_at'),
+                'message_count': int(item.get('message_count', 0)),
+            }
+            if item.get('title'):
+                conversation['title'] = item['title']
+            conversations.append(conversation)
+
+        last_key = response.get('LastEvaluatedKey')
+        return {
+            'conversations': conversations,
+            'next_cursor': _encode_cursor(last_key) if last_key else None
+        }
+
     def add_message(self, conversation_id: str, message: Dict[str, str]) -> bool:
         """
         Add a message to an existing conversation
@@ -110,23 +453,15 @@ class ConversationManager:
             Success boolean
         """
         try:
-            # Encrypt if encryption manager is available
-            encrypted_content = message['content']
-            if self.encryption_manager:
-                encrypted_content = self.encryption_manager.encrypt(message['content'])
+            timestamp = datetime.utcnow().isoformat()
+            seq = self._reserve_sequence(conversation_id, timestamp)
 
-            self.table.update_item(
-                Key={'conversation_id': conversation_id},
-                UpdateExpression='SET messages = list_append(messages, :msg), updated_at = :timestamp',
-                ExpressionAttributeValues={
-                    ':msg': [{
-                        'role': message['role'],
-                        'content': encrypted_content,
-                        'timestamp': datetime.utcnow().isoformat()
-                    }],
-                    ':timestamp': datetime.utcnow().isoformat()
-                }
+            self.messages_table.put_item(
+                Item=self._build_message_item(
+                    conversation_id, seq, message, timestamp, get_ttl_timestamp(CONVERSATION_TTL_DAYS)
+                )
             )
+            self._cache_append(conversation_id, seq, [{**message, 'timestamp': timestamp, 'seq': seq}])
 
             logger.info(f"Added message to conversation: {conversation_id}")
             return True
@@ -135,6 +470,57 @@ class ConversationManager:
             logger.error(f"Error adding message: {str(e)}")
             return False
 
+    def begin_turn(
+        self,
+        conversation_id: Optional[str],
+        user_message: Dict[str, str],
+        user_id: str = 'default_user',
+        eager_write: bool = False,
+        timer: Optional[StageTimer] = None
+    ) -> 'PendingTurn':
+        """
+        Start persisting a chat turn in the background while the reply is generated
+
+        By default nothing is written until commit, which stores the user
+        message and the reply in one transaction; the background work only
+        encrypts the user message and resolves the expected message_count.
+        With eager_write the user message is stored in the background
+        instead, so it survives a failed model call, and commit appends
+        the reply on its own.
+
+        Args:
+            conversation_id: Existing conversation, or None to start a new one
+            user_message: User message dictionary
+            user_id: Owner of a new conversation
+            eager_write: Write the user message before the reply is known
+            timer: Optional StageTimer for the 'prepare_turn', 'prepare_wait' and 'commit' stages
+
+        Returns:
+            PendingTurn to commit with the assistant message
+        """
+        return PendingTurn(self, conversation_id, user_message, user_id, eager_write, timer=timer)
+
+    def append_turn(
+        self,
+        conversation_id: Optional[str],
+        user_message: Dict[str, str],
+        assistant_message: Dict[str, str],
+        user_id: str = 'default_user'
+    ) -> Dict[str, Any]:
+        """
+        Store a user message and the assistant reply in a single transaction
+
+        Args:
+            conversation_id: Existing conversation, or None to start a new one
+            user_message: User message dictionary
+            assistant_message: Assistant message dictionary
+            user_id: Owner of a new conversation
+
+        Returns:
+            Dictionary with conversation_id and write_units consumed
+        """
+        return PendingTurn(self, conversation_id, user_message, user_id, background=False).commit(assistant_message)
+
     def get_conversation_history(self, conversation_id: str, limit: int = 10) -> List[Dict[str, str]]:
         """
         Get conversation history (last N messages)
@@ -144,14 +530,586 @@ class ConversationManager:
             limit: Maximum number of messages to return
 
         Returns:
-            List of messages
+            List of messages, oldest first
+
+        Raises:
+            ConversationNotFound: If the conversation does not exist, so a chat
+                turn can be refused before the model is called
         """
-        conversation = self.get_conversation(conversation_id)
+        try:
+            cached = self._get_cached_history(conversation_id, limit)
+            if cached is not None:
+                return cached
+
+            items = self._query_messages(conversation_id, limit=limit)
 
-        if not conversation:
+            if not items:
+                # Nothing in the messages table yet: the conversation may still use the legacy layout
+                response = self.table.get_item(Key={'conversation_id': conversation_id})
+                conversation = response.get('Item')
+                if not conversation:
+                    raise ConversationNotFound(f"Conversation not found: {conversation_id}")
+                if 'messages' not in conversation:
+                    return []
+                self._migrate_legacy_conversation(conversation)
+                items = self._query_messages(conversation_id, limit=limit)
+
+            # The whole tail goes to the model, so decrypt it as one batch
+            messages = self.decrypt_messages(self._to_messages(items))
+
+            self.history_cache.put(conversation_id, {
+                'version': int(items[-1]['seq']),
+                'first_seq': int(items[0]['seq']),
+                'messages': [dict(m) for m in messages]
+            })
+            return messages
+
+        except ConversationNotFound:
+            raise
+        except Exception as e:
+            logger.error(f"Error retrieving conversation history: {str(e)}")
             return []
 
-        messages = conversation.get('messages', [])
+    def get_summary(self, conversation_id: str) -> Tuple[Optional[str], int]:
+        """
+        Get the rolling summary of older turns
+
+        Args:
+            conversation_id: Conversation identifier
+
+        Returns:
+            Tuple of (summary or None, sequence number of the last message it covers)
+        """
+        try:
+            response = self.table.get_item(
+                Key={'conversation_id': conversation_id},
+                ProjectionExpression='summary, summary_seq'
+            )
+            item = response.get('Item', {})
+
+            summary = item.get('summary')
+            if summary and self.encryption_manager:
+                summary = self.encryption_manager.decrypt(summary)
+
+            return summary, int(item.get('summary_seq', 0))
+
+        except Exception as e:
+            logger.error(f"Error retrieving summary: {str(e)}")
+            return None, 0
+
+    def save_summary(self, conversation_id: str, summary: str, through_seq: int) -> bool:
+        """
+        Store the rolling summary unless a newer one is already stored
+
+        Args:
+            conversation_id: Conversation identifier
+            summary: Summary text
+            through_seq: Sequence number of the last message the summary covers
+
+        Returns:
+            Success boolean
+        """
+        try:
+            if self.encryption_manager:
+                summary = self.encryption_manager.encrypt(summary)
+
+            self.table.update_item(
+                Key={'conversation_id': conversation_id},
+                UpdateExpression='SET summary = :summary, summary_seq = :seq',
+                ConditionExpression='attribute_exists(conversation_id) AND '
+                                    '(attribute_not_exists(summary_seq) OR summary_seq < :seq)',
+                ExpressionAttributeValues={':summary': summary, ':seq': through_seq}
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Error saving summary: {str(e)}")
+            return False
+
+    def decrypt_messages(self, messages: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Decrypt every still-encrypted message in a batch using the shared thread pool
+
+        Args:
+            messages: Messages as returned by this manager
+
+        Returns:
+            The same messages, as a list, with plaintext content
+        """
+        messages = list(messages)
+        pending = [m for m in messages if isinstance(m, LazyMessage) and m.ciphertext is not None]
+
+        if pending:
+            plaintexts = self.encryption_manager.decrypt_many([m.ciphertext for m in pending])
+            for message, plaintext in zip(pending, plaintexts):
+                message.set_plaintext(plaintext)
+
+        return messages
+
+    def _get_cached_history(self, conversation_id: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the cached history tail if it is current and long enough
+
+        Args:
+            conversation_id: Conversation identifier
+            limit: Number of messages requested
+
+        Returns:
+            Copies of the newest messages, or None on a miss
+        """
+        entry = self.history_cache.get(conversation_id)
+        covers_request = entry is not None and (len(entry['messages']) >= limit or entry['first_seq'] == 1)
+
+        if covers_request:
+            response = self.table.get_item(
+                Key={'conversation_id': conversation_id},
+                ProjectionExpression='message_count',
+                ConsistentRead=True
+            )
+            version = response.get('Item', {}).get('message_count')
+
+            if version is not None and int(version) == entry['version']:
+                self.history_cache_stats['hits'] += 1
+                metrics.count('HistoryCacheHits')
+                self.last_decrypt_stats = DecryptStats()
+                return [dict(m) for m in entry['messages'][-limit:]]
+
+            self.history_cache.pop(conversation_id)
+
+        self.history_cache_stats['misses'] += 1
+        metrics.count('HistoryCacheMisses')
+        return None
+
+    def _cache_append(self, conversation_id: str, seq: int, messages: List[Dict[str, Any]]) -> None:
+        """
+        Write newly stored messages through to the history cache
+
+        The entry is only extended if it is exactly one version behind the
+        first new message; otherwise another writer got in between and the
+        entry is dropped.
+
+        Args:
+            conversation_id: Conversation identifier
+            seq: Sequence number of the first new message
+            messages: Plaintext messages stored starting at seq
+        """
+        entry = self.history_cache.get(conversation_id)
+        if entry is None:
+            return
+
+        if entry['version'] != seq - 1:
+            self.history_cache.pop(conversation_id)
+            return
+
+        cached_messages = entry['messages'] + messages
+        first_seq = entry['first_seq']
+        if len(cached_messages) > HISTORY_CACHE_MESSAGES:
+            first_seq += len(cached_messages) - HISTORY_CACHE_MESSAGES
+            cached_messages = cached_messages[-HISTORY_CACHE_MESSAGES:]
+
+        self.history_cache.put(conversation_id, {
+            'version': seq + len(messages) - 1,
+            'first_seq': first_seq,
+            'messages': cached_messages
+        })
+
+    def _write_turn(
+        self,
+        conversation_id: str,
+        expected_count: Optional[int],
+        messages: List[Dict[str, Any]],
+        items: List[Dict[str, Any]],
+        timestamp: str,
+        user_id: str
+    ) -> float:
+        """
+        Append prebuilt message items at expected_count + 1, retrying on concurrent appends
+
+        Args:
+            conversation_id: Conversation identifier
+            expected_count: Current message_count, or None for a new conversation
+            messages: Plaintext messages matching items, for the history cache
+            items: Message items from _build_message_item (seq is assigned here)
+            timestamp: New updated_at value
+            user_id: Owner of a new conversation
+
+        Returns:
+            Write capacity units consumed
+        """
+        for attempt in range(TURN_WRITE_ATTEMPTS):
+            first_seq = 1 if expected_count is None else expected_count + 1
+            for offset, (message, item) in enumerate(zip(messages, items)):
+                message['seq'] = item['seq'] = first_seq + offset
+
+            try:
+                write_units = self._transact_messages(conversation_id, expected_count, items, timestamp, user_id)
+                metrics.count('WriteCapacityUnits', write_units)
+                break
+
+            except ClientError as e:
+                retryable = e.response['Error']['Code'] == 'TransactionCanceledException' and expected_count is not None
+                if not retryable or attempt == TURN_WRITE_ATTEMPTS - 1:
+                    raise
+
+                # Another writer appended first; pick up the new count and retry
+                metrics.count('TurnWriteConflicts')
+                self.history_cache.pop(conversation_id)
+                expected_count = self._current_message_count(conversation_id)
+
+        if expected_count is None:
+            self.history_cache.put(conversation_id, {'version': len(messages), 'first_seq': 1, 'messages': messages})
+        else:
+            self._cache_append(conversation_id, expected_count + 1, messages)
+
+        return write_units
+
+    def _transact_messages(
+        self,
+        conversation_id: str,
+        expected_count: Optional[int],
+        items: List[Dict[str, Any]],
+        timestamp: str,
+        user_id: str
+    ) -> float:
+        """
+        Write message items and the header update as one DynamoDB transaction
+
+        Args:
+            conversation_id: Conversation identifier
+            expected_count: message_count the header must still have, or None to create the header
+            items: Message items with seq already assigned
+            timestamp: New updated_at value
+            user_id: Owner of a new conversation
+
+        Returns:
+            Write capacity units consumed
+        """
+        ttl = get_ttl_timestamp(CONVERSATION_TTL_DAYS)
+        new_count = (expected_count or 0) + len(items)
+
+        if expected_count is None:
+            header_op = {
+                'Put': {
+                    'TableName': self.table.name,
+                    'Item': {
+                        'conversation_id': conversation_id,
+                        'user_id': user_id,
+                        'created_at': timestamp,
+                        'updated_at': timestamp,
+                        'message_count': new_count,
+                        'ttl': ttl
+                    },
+                    'ConditionExpression': 'attribute_not_exists(conversation_id)'
+                }
+            }
+        else:
+            header_op = {
+                'Update': {
+                    'TableName': self.table.name,
+                    'Key': {'conversation_id': conversation_id},
+                    'UpdateExpression': 'SET message_count = :count, updated_at = :timestamp',
+                    'ConditionExpression': 'message_count = :expected AND attribute_not_exists(messages)',
+                    'ExpressionAttributeValues': {
+                        ':count': new_count,
+                        ':expected': expected_count,
+                        ':timestamp': timestamp
+                    }
+                }
+            }
+
+        message_ops = []
+        for item in items:
+            item['ttl'] = ttl
+            message_ops.append({'Put': {'TableName': self.messages_table.name, 'Item': item}})
+
+        response = transact_write_items(
+            [header_op] + message_ops,
+            ReturnConsumedCapacity='TOTAL'
+        )
+        return sum(c.get('CapacityUnits', 0) for c in response.get('ConsumedCapacity', []))
+
+    def _current_message_count(self, conversation_id: str) -> int:
+        """
+        Read the header's message_count, migrating legacy conversations
+
+        Args:
+            conversation_id: Conversation identifier
+
+        Returns:
+            Current message count
+
+        Raises:
+            ConversationNotFound: If the conversation does not exist
+        """
+        response = self.table.get_item(
+            Key={'conversation_id': conversation_id},
+            ProjectionExpression='message_count',
+            ConsistentRead=True
+        )
+        if 'Item' not in response:
+            raise ConversationNotFound(f"Conversation not found: {conversation_id}")
+
+        count = response['Item'].get('message_count')
+        if count is None:
+            conversation = self.table.get_item(Key={'conversation_id': conversation_id}, ConsistentRead=True)['Item']
+            if 'messages' in conversation:
+                self._migrate_legacy_conversation(conversation)
+            count = conversation.get('message_count', 0)
+
+        return int(count)
+
+    def _reserve_sequence(self, conversation_id: str, timestamp: str) -> int:
+        """
+        Atomically allocate the next message sequence number on the header item
+
+        Args:
+            conversation_id: Conversation identifier
+            timestamp: New updated_at value
+
+        Returns:
+            Allocated sequence number
+        """
+        for _ in range(2):
+            try:
+                response = self.table.update_item(
+                    Key={'conversation_id': conversation_id},
+                    UpdateExpression='SET updated_at = :timestamp ADD message_count :one',
+                    ConditionExpression='attribute_exists(conversation_id) AND attribute_not_exists(messages)',
+                    ExpressionAttributeValues={':timestamp': timestamp, ':one': 1},
+                    ReturnValues='UPDATED_NEW'
+                )
+                return int(response['Attributes']['message_count'])
+
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+
+                # Either missing or still in the legacy layout; migrate and retry once
+                conversation = self.table.get_item(Key={'conversation_id': conversation_id}).get('Item')
+                if not conversation or 'messages' not in conversation:
+                    raise
+                self._migrate_legacy_conversation(conversation)
+
+        raise RuntimeError(f"Could not allocate message sequence for conversation: {conversation_id}")
+
+    def _query_messages(self, conversation_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Query message items for a conversation
+
+        Args:
+            conversation_id: Conversation identifier
+            limit: If set, only the newest N messages are read
+
+        Returns:
+            Message items in ascending sequence order
+        """
+        query_kwargs = {
+            'KeyConditionExpression': 'conversation_id = :cid',
+            'ExpressionAttributeValues': {':cid': conversation_id}
+        }
+
+        if limit is not None:
+            response = self.messages_table.query(ScanIndexForward=False, Limit=limit, **query_kwargs)
+            return list(reversed(response.get('Items', [])))
+
+        items = []
+        while True:
+            response = self.messages_table.query(**query_kwargs)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return items
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def _migrate_legacy_conversation(self, conversation: Dict[str, Any]) -> None:
+        """
+        Move a legacy single-item conversation into the per-message layout
+
+        Message content is copied as stored (still encrypted). The header is
+        only rewritten after all message items exist, and only if it still
+        holds the legacy list, so concurrent migrations are harmless.
+
+        Args:
+            conversation: Header item containing a 'messages' list; updated in place
+        """
+        conversation_id = conversation['conversation_id']
+        legacy_messages = conversation.pop('messages')
+        ttl = conversation.get('ttl') or get_ttl_timestamp(CONVERSATION_TTL_DAYS)
+
+        self.messages_table.batch_put([
+            {
+                'conversation_id': conversation_id,
+                'seq': seq,
+                'role': message['role'],
+                'content': message['content'],
+                'timestamp': message.get('timestamp', conversation.get('created_at')),
+                'ttl': ttl
+            }
+            for seq, message in enumerate(legacy_messages, start=1)
+        ])
+
+        try:
+            self.table.update_item(
+                Key={'conversation_id': conversation_id},
+                UpdateExpression='SET message_count = :count REMOVE messages',
+                ConditionExpression='attribute_exists(messages)',
+                ExpressionAttributeValues={':count': len(legacy_messages)}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+        conversation['message_count'] = len(legacy_messages)
+        logger.info(f"Migrated legacy conversation: {conversation_id} ({len(legacy_messages)} messages)")
+
+    def _build_message_item(
+        self,
+        conversation_id: str,
+        seq: int,
+        message: Dict[str, str],
+        timestamp: str,
+        ttl: int
+    ) -> Dict[str, Any]:
+        """
+        Build a message item, encrypting content if an encryption manager is available
+        and otherwise compressing it if a codec is configured
+        """
+        content = message['content']
+        if self.encryption_manager:
+            content = self.encryption_manager.encrypt(content)
+        elif self.codec is not None:
+            content = self.codec.encode(content)
+
+        return {
+            'conversation_id': conversation_id,
+            'seq': seq,
+            'role': message['role'],
+            'content': content,
+            'timestamp': timestamp,
+            'ttl': ttl
+        }
+
+    def _to_messages(self, items: List[Dict[str, Any]], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Convert message items to message dictionaries
+
+        With encryption enabled the messages are LazyMessage instances sharing
+        a fresh DecryptStats, which becomes last_decrypt_stats. If fields is
+        given, only those attributes (as read by a projection) are included.
+        """
+        self.last_decrypt_stats = DecryptStats(fetched=len(items))
+
+        messages = []
+        for item in items:
+            if fields is None:
+                message = {
+                    'role': item['role'],
+                    'content': item['content'],
+                    'timestamp': item.get('timestamp'),
+                    'seq': int(item['seq'])
+                }
+            else:
+                message = {field: item[field] for field in fields if field in item}
+                message['seq'] = int(item['seq'])
+            if isinstance(message.get('content'), (bytes, bytearray)):
+                message['content'] = decode_content(message['content'])
+            if self.encryption_manager:
+                message = LazyMessage(message, self.encryption_manager, self.last_decrypt_stats)
+            messages.append(message)
+
+        return messages
+
+
+class PendingTurn:
+    """
+    A chat turn whose user message is being prepared (or written) in the background
+    """
+
+    def __init__(
+        self,
+        manager: ConversationManager,
+        conversation_id: Optional[str],
+        user_message: Dict[str, str],
+        user_id: str,
+        eager_write: bool = False,
+        background: bool = True,
+        timer: Optional[StageTimer] = None
+    ):
+        self.manager = manager
+        self.is_new = conversation_id is None
+        self.conversation_id = conversation_id or str(uuid.uuid4())
+        self.user_message = user_message
+        self.user_id = user_id
+        self.eager_write = eager_write
+        self.timer = timer
+        self.write_units = 0.0
+
+        if background:
+            self._prepared = get_executor('conversation-writes', WRITE_MAX_WORKERS).submit(self._prepare)
+        else:
+            self._prepared = None
+            self._prepared_result = self._prepare()
+
+    def _prepare(self) -> Dict[str, Any]:
+        """
+        Encrypt the user message and resolve the expected message count,
+        or write the user message outright in eager mode
+        """
+        with optional_stage(self.timer, 'prepare_turn'):
+            return self._prepare_user_message()
+
+    def _prepare_user_message(self) -> Dict[str, Any]:
+        timestamp = datetime.utcnow().isoformat()
+        message = {**self.user_message, 'timestamp': timestamp}
+        item = self.manager._build_message_item(self.conversation_id, 0, self.user_message, timestamp, 0)
+
+        expected_count = None
+        if not self.is_new:
+            # A cached version is only a guess; a stale one fails the transaction condition and is re-read
+            entry = self.manager.history_cache.get(self.conversation_id)
+            if entry is not None:
+                expected_count = entry['version']
+            else:
+                expected_count = self.manager._current_message_count(self.conversation_id)
+
+        if not self.eager_write:
+            return {'expected_count': expected_count, 'messages': [message], 'items': [item]}
+
+        self.write_units += self.manager._write_turn(
+            self.conversation_id, expected_count, [message], [item], timestamp, self.user_id
+        )
+        return {'expected_count': item['seq'], 'messages': [], 'items': []}
+
+    def wait_user_message(self) -> None:
+        """Block until background preparation finishes, re-raising its error"""
+        if self._prepared is not None:
+            # Time spent here is the part of the preparation that did not overlap other work
+            with optional_stage(self.timer, 'prepare_wait'):
+                self._prepared_result = self._prepared.result()
+            self._prepared = None
+
+    def commit(self, assistant_message: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Store the assistant reply, together with the user message unless it was written eagerly
+
+        Args:
+            assistant_message: Assistant message dictionary
+
+        Returns:
+            Dictionary with conversation_id and write_units consumed by the whole turn
+        """
+        self.wait_user_message()
+        prepared = self._prepared_result
+
+        timestamp = datetime.utcnow().isoformat()
+        messages = prepared['messages'] + [{**assistant_message, 'timestamp': timestamp}]
+        items = prepared['items'] + [
+            self.manager._build_message_item(self.conversation_id, 0, assistant_message, timestamp, 0)
+        ]
+
+        with optional_stage(self.timer, 'commit'):
+            self.write_units += self.manager._write_turn(
+                self.conversation_id, prepared['expected_count'], messages, items, timestamp, self.user_id
+            )
 
-        # Return last N messages
-        return messages[-limit:] if len(messages) > limit else messages
+        logger.info(f"Stored turn in conversation: {self.conversation_id}")
+        return {'conversation_id': self.conversation_id, 'write_units': self.write_units}
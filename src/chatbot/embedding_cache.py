@@ -0,0 +1,125 @@
+"""
+Content-addressed cache for text embeddings
+
+Vectors are keyed by the embedding model (with its output settings) and
+the SHA-256 of the text, so repeated queries and re-ingested text are
+never embedded twice. An in-memory LRU tier serves warm invocations; an
+optional DynamoDB tier (looked up with BatchGetItem) is shared by all
+containers and by ingestion runs.
+"""
+import time
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, List
+from src.shared.cache import LRUCache
+from src.shared.dynamodb import DynamoDBTable
+from src.shared.constants import EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_CACHE_TTL_SECONDS
+
+logger = logging.getLogger()
+
+
+def text_digest(text: str) -> str:
+    """Hex SHA-256 of a text, the content part of an embedding cache key"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: in-process LRU plus optional DynamoDB table with TTL
+
+    Cached vectors are read-only float32 NumPy rows.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = EMBEDDING_CACHE_TTL_SECONDS,
+        table_name: str = None
+    ):
+        """
+        Initialize embedding cache
+
+        Args:
+            max_entries: Maximum vectors kept in memory
+            ttl_seconds: Lifetime of a vector in the DynamoDB tier
+            table_name: Optional DynamoDB table (hash key 'cache_key', TTL attribute 'ttl') for the shared tier
+        """
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(max_entries=max_entries)
+        self.table = DynamoDBTable(table_name) if table_name else None
+        self.stats = {'hits': 0, 'misses': 0, 'memory_hits': 0, 'dynamodb_hits': 0}
+
+    def get_many(self, model_key: str, digests: Iterable[str]) -> Dict[str, Any]:
+        """
+        Look up vectors
+
+        Args:
+            model_key: Model identity, e.g. 'amazon.titan-embed-text-v2:0:512'
+            digests: Text digests from text_digest
+
+        Returns:
+            Vectors found, by digest
+        """
+        found = {}
+        remaining = []
+        for digest in digests:
+            vector = self.memory.get((model_key, digest))
+            if vector is None:
+                remaining.append(digest)
+            else:
+                found[digest] = vector
+        self.stats['memory_hits'] += len(found)
+
+        if remaining and self.table is not None:
+            shared = self._get_shared(model_key, remaining)
+            for digest, vector in shared.items():
+                self.memory.put((model_key, digest), vector)
+            found.update(shared)
+            self.stats['dynamodb_hits'] += len(shared)
+
+        self.stats['hits'] = self.stats['memory_hits'] + self.stats['dynamodb_hits']
+        self.stats['misses'] += sum(1 for digest in remaining if digest not in found)
+        return found
+
+    def put_many(self, model_key: str, vectors: Dict[str, Any]) -> None:
+        """
+        Store vectors in both tiers
+
+        Args:
+            model_key: Model identity
+            vectors: float32 vectors by text digest
+        """
+        for digest, vector in vectors.items():
+            vector.flags.writeable = False
+            self.memory.put((model_key, digest), vector)
+
+        if self.table is not None and vectors:
+            expires = int(time.time()) + self.ttl_seconds
+            try:
+                self.table.batch_put([
+                    {'cache_key': f"{model_key}#{digest}", 'vector': vector.astype('<f4').tobytes(), 'ttl': expires}
+                    for digest, vector in vectors.items()
+                ])
+            except Exception as e:
+                logger.error(f"Error writing embedding cache: {str(e)}")
+
+    def _get_shared(self, model_key: str, digests: List[str]) -> Dict[str, Any]:
+        """Read vectors from the DynamoDB tier, ignoring expired items not yet removed by TTL"""
+        import numpy as np
+
+        try:
+            items = self.table.batch_get([{'cache_key': f"{model_key}#{digest}"} for digest in digests])
+        except Exception as e:
+            logger.error(f"Error reading embedding cache: {str(e)}")
+            return {}
+
+        now = time.time()
+        prefix = len(model_key) + 1
+        found = {}
+        for item in items:
+            if int(item.get('ttl', 0)) <= now:
+                continue
+            vector = np.frombuffer(item['vector'], dtype='<f4').astype(np.float32)
+            vector.flags.writeable = False
+            found[item['cache_key'][prefix:]] = vector
+        return found
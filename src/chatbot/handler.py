@@ -3,25 +3,113 @@ Main chatbot Lambda handler
 """
 import os
 import json
+import time
+import hashlib
+import random
 import logging
-from typing import Dict, Any
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from botocore.exceptions import ClientError
 from src.chatbot.bedrock_client import BedrockClient
-from src.chatbot.conversation_manager import ConversationManager
+from src.chatbot.context_builder import ContextBuilder, bedrock_summarizer, estimate_tokens
+from src.chatbot.embedding_cache import EmbeddingCache
+from src.chatbot.response_cache import ResponseCache
+from src.chatbot.conversation_manager import ConversationManager, ConversationNotFound, PendingTurn, MESSAGE_FIELDS
 from src.shared.encryption import EncryptionManager
-from src.shared.utils import create_response, create_error_response, validate_required_fields
-from src.shared.constants import ERROR_INVALID_REQUEST, ERROR_INTERNAL
+from src.shared.compression import make_codec
+from src.shared import metrics
+from src.shared.concurrency import AdaptiveLimiter, get_executor
+from src.shared.rate_limiter import RateLimiter
+from src.shared.timing import StageTimer
+from src.shared.utils import (
+    create_response,
+    create_error_response,
+    create_not_modified_response,
+    etag_matches,
+    get_header,
+    format_sse_event,
+    validate_required_fields,
+    json_loads,
+    log_request,
+)
+from src.shared.constants import (
+    ERROR_INVALID_REQUEST,
+    ERROR_INTERNAL,
+    ERROR_RATE_LIMIT,
+    ENCRYPTION_MODE,
+    CONTENT_COMPRESSION,
+    CONVERSATIONS_TABLE_NAME,
+    RATE_LIMIT_TABLE_NAME,
+    RATE_LIMIT_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_INPUT_TOKENS_PER_MINUTE,
+    MESSAGES_TABLE_NAME,
+    CONTEXT_TOKEN_BUDGET,
+    CONVERSATION_LIST_DEFAULT_LIMIT,
+    CONVERSATION_LIST_MAX_LIMIT,
+    CONVERSATION_MESSAGES_MAX_LIMIT,
+    METRICS_SAMPLE_RATE,
+    REQUEST_LOG_SAMPLE_RATE,
+    MAX_TOKENS,
+    TEMPERATURE,
+    BATCH_MAX_ITEMS,
+    BATCH_MAX_CONCURRENCY,
+    BATCH_DEADLINE_SECONDS,
+    BATCH_ITEM_TIMEOUT_SECONDS,
+    BATCH_THROTTLE_RETRIES,
+    SUMMARY_FINISH_TIMEOUT_SECONDS,
+)
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Bedrock error codes that mean "slow down" rather than "this request is bad"
+THROTTLING_ERROR_CODES = frozenset({'ThrottlingException', 'TooManyRequestsException', 'ServiceQuotaExceededException'})
+BATCH_POLL_SECONDS = 0.05
+BATCH_THROTTLE_BACKOFF_SECONDS = 0.5
+
 # Environment variables
 KMS_KEY_ID = os.environ.get('KMS_KEY_ID')
-CONVERSATIONS_TABLE = os.environ.get('CONVERSATIONS_TABLE')
+CONVERSATIONS_TABLE = os.environ.get('CONVERSATIONS_TABLE', CONVERSATIONS_TABLE_NAME)
+MESSAGES_TABLE = os.environ.get('MESSAGES_TABLE', MESSAGES_TABLE_NAME)
+EAGER_USER_WRITE = os.environ.get('EAGER_USER_WRITE', 'false').lower() == 'true'
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('CONTEXT_TOKEN_BUDGET', CONTEXT_TOKEN_BUDGET))
+CONTEXT_SUMMARY = os.environ.get('CONTEXT_SUMMARY', 'false').lower() == 'true'
+RESPONSE_CACHE = os.environ.get('RESPONSE_CACHE', 'false').lower() == 'true'
+RESPONSE_CACHE_TABLE = os.environ.get('RESPONSE_CACHE_TABLE')
+PROMPT_CACHING = os.environ.get('PROMPT_CACHING', 'false').lower() == 'true'
+EMBEDDING_CACHE_TABLE = os.environ.get('EMBEDDING_CACHE_TABLE')
+ENCRYPTION_MODE = os.environ.get('ENCRYPTION_MODE', ENCRYPTION_MODE)
+CONTENT_COMPRESSION = os.environ.get('CONTENT_COMPRESSION', CONTENT_COMPRESSION)
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', METRICS_SAMPLE_RATE))
+REQUEST_LOG_SAMPLE_RATE = float(os.environ.get('REQUEST_LOG_SAMPLE_RATE', REQUEST_LOG_SAMPLE_RATE))
+RATE_LIMIT = os.environ.get('RATE_LIMIT', 'false').lower() == 'true'
+RATE_LIMIT_TABLE = os.environ.get('RATE_LIMIT_TABLE', RATE_LIMIT_TABLE_NAME)
+RATE_LIMIT_REQUESTS_PER_MINUTE = float(os.environ.get('RATE_LIMIT_REQUESTS_PER_MINUTE', RATE_LIMIT_REQUESTS_PER_MINUTE))
+RATE_LIMIT_INPUT_TOKENS_PER_MINUTE = float(
+    os.environ.get('RATE_LIMIT_INPUT_TOKENS_PER_MINUTE', RATE_LIMIT_INPUT_TOKENS_PER_MINUTE))
 
 # Initialize clients
-bedrock_client = BedrockClient()
-encryption_manager = EncryptionManager(KMS_KEY_ID) if KMS_KEY_ID else None
-conversation_manager = ConversationManager(CONVERSATIONS_TABLE, encryption_manager)
+content_codec = make_codec(CONTENT_COMPRESSION)
+encryption_manager = EncryptionManager(KMS_KEY_ID, mode=ENCRYPTION_MODE, codec=content_codec) if KMS_KEY_ID else None
+response_cache = ResponseCache(table_name=RESPONSE_CACHE_TABLE, encryption_manager=encryption_manager) if RESPONSE_CACHE else None
+bedrock_client = BedrockClient(
+    response_cache=response_cache,
+    embedding_cache=EmbeddingCache(table_name=EMBEDDING_CACHE_TABLE),
+    prompt_caching=PROMPT_CACHING
+)
+conversation_manager = ConversationManager(CONVERSATIONS_TABLE, encryption_manager, MESSAGES_TABLE, codec=content_codec)
+rate_limiter = RateLimiter(
+    RATE_LIMIT_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_INPUT_TOKENS_PER_MINUTE,
+    table_name=RATE_LIMIT_TABLE
+) if RATE_LIMIT else None
+context_builder = ContextBuilder(
+    conversation_manager,
+    token_budget=CONTEXT_TOKEN_BUDGET,
+    summarizer=bedrock_summarizer(bedrock_client) if CONTEXT_SUMMARY else None
+)
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -32,13 +120,38 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         event: API Gateway event
         context: Lambda context
 
+    Returns:
+        API Gateway response
+    """
+    # The resource template keeps the Route dimension low-cardinality (no conversation ids)
+    request_metrics = metrics.start_request(event.get('resource') or event.get('path', ''), METRICS_SAMPLE_RATE)
+    request_id = getattr(context, 'aws_request_id', None)
+    if request_id:
+        request_metrics.set_property('RequestId', request_id)
+
+    try:
+        response = route_request(event, request_id)
+        request_metrics.set_property('StatusCode', response['statusCode'])
+        return response
+    finally:
+        metrics.finish_request(request_metrics)
+
+
+def route_request(event: Dict[str, Any], request_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Parse the request and dispatch it to the route handler
+
+    Args:
+        event: API Gateway event
+        request_id: Lambda request id, included in the request log
+
     Returns:
         API Gateway response
     """
     try:
         # Parse request body
-        body = json.loads(event.get('body', '{}'))
-        logger.info(f"Received request: {json.dumps(body)}")
+        body = json_loads(event.get('body') or '{}')
+        log_request(event, body, REQUEST_LOG_SAMPLE_RATE, request_id)
 
         # Get HTTP method and path
         http_method = event.get('httpMethod', '')
@@ -46,9 +159,13 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
         # Route to appropriate handler
         if http_method == 'POST' and path.endswith('/chat'):
-            return handle_chat(body)
+            return handle_chat(body, rate_limit_key(event, body))
+        elif http_method == 'POST' and path.endswith('/chat/batch'):
+            return handle_chat_batch(body, rate_limit_key(event, body))
         elif http_method == 'POST' and path.endswith('/conversations'):
             return handle_new_conversation(body)
+        elif http_method == 'GET' and path.endswith('/conversations'):
+            return handle_list_conversations(event)
         elif http_method == 'GET' and '/conversations/' in path:
             return handle_get_conversation(event)
         else:
@@ -62,12 +179,66 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return create_error_response(500, ERROR_INTERNAL)
 
 
-def handle_chat(body: Dict[str, Any]) -> Dict[str, Any]:
+def rate_limit_key(event: Dict[str, Any], body: Dict[str, Any]) -> str:
+    """
+    Identify the caller for rate limiting: the authorizer's principal plus the user id
+
+    Args:
+        event: API Gateway event
+        body: Parsed request body
+
+    Returns:
+        Rate limit key
+    """
+    authorizer = (event.get('requestContext') or {}).get('authorizer') or {}
+    return f"{authorizer.get('principalId', 'anonymous')}/{body.get('user_id', 'default_user')}"
+
+
+def enforce_rate_limit(limit_key: Optional[str], requests: int = 1, input_tokens: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    Consume the caller's request and input-token allowance
+
+    Args:
+        limit_key: Caller identity from rate_limit_key (None skips the check)
+        requests: Requests to consume
+        input_tokens: Input tokens known before the model call
+
+    Returns:
+        A 429 response with Retry-After if the caller is over a limit, otherwise None
+    """
+    if rate_limiter is None or limit_key is None:
+        return None
+
+    decision = rate_limiter.acquire(limit_key, requests=requests, input_tokens=input_tokens)
+    if decision.allowed:
+        return None
+    return create_response(429, {
+        'error': ERROR_RATE_LIMIT,
+        'limit': decision.bucket,
+        'retry_after': int(decision.retry_after_header)
+    }, headers={'Retry-After': decision.retry_after_header})
+
+
+def charge_input_tokens(limit_key: Optional[str], usage: Dict[str, Any], reserved: int) -> None:
+    """
+    Bill the input tokens a model call actually used beyond those reserved up front
+
+    Args:
+        limit_key: Caller identity (None skips billing)
+        usage: Usage reported by the model
+        reserved: Input tokens already consumed by enforce_rate_limit
+    """
+    if rate_limiter is not None and limit_key is not None:
+        rate_limiter.charge(limit_key, (usage or {}).get('input_tokens', reserved) - reserved)
+
+
+def handle_chat(body: Dict[str, Any], limit_key: Optional[str] = None) -> Dict[str, Any]:
     """
     Handle chat message request
 
     Args:
         body: Request body
+        limit_key: Caller identity for rate limiting
 
     Returns:
         API Gateway response
@@ -77,58 +248,478 @@ def handle_chat(body: Dict[str, Any]) -> Dict[str, Any]:
     if not is_valid:
         return create_error_response(400, error_msg)
 
-    user_message = body['message']
-    conversation_id = body.get('conversation_id')
-    user_id = body.get('user_id', 'default_user')
-    system_prompt = body.get('system_prompt')
+    reserved = estimate_tokens(body['message'])
+    limited = enforce_rate_limit(limit_key, input_tokens=reserved)
+    if limited:
+        return limited
 
     try:
-        # Create new conversation if no ID provided
-        if not conversation_id:
-            conversation_id = conversation_manager.create_conversation(
-                user_id=user_id,
-                initial_message={'role': 'user', 'content': user_message}
-            )
-            conversation_history = []
-        else:
-            # Get existing conversation history
-            conversation_history = conversation_manager.get_conversation_history(conversation_id)
+        result = run_chat_turn(body)
+        charge_input_tokens(limit_key, result['usage'], reserved)
+        return create_response(200, result)
+
+    except ConversationNotFound as e:
+        logger.warning(f"Chat for unknown conversation: {str(e)}")
+        return create_error_response(404, "Conversation not found")
+    except Exception as e:
+        logger.error(f"Error in chat handler: {str(e)}")
+        return create_error_response(500, ERROR_INTERNAL)
 
-            # Add new user message
-            conversation_manager.add_message(
-                conversation_id,
-                {'role': 'user', 'content': user_message}
-            )
 
-        # Format messages for Bedrock
-        messages = bedrock_client.format_conversation(conversation_history)
-        messages.append({'role': 'user', 'content': user_message})
+def run_chat_turn(
+    body: Dict[str, Any],
+    timer: Optional[StageTimer] = None,
+    cancelled: Optional[threading.Event] = None
+) -> Dict[str, Any]:
+    """
+    Run one persisted chat turn: build context, call Bedrock, store both messages
 
-        # Generate response from Bedrock
+    Args:
+        body: Validated request body
+        timer: Optional StageTimer; defaults to the current request's metrics
+        cancelled: Optional event; when set before the reply is stored, the turn is abandoned
+
+    Returns:
+        Response body with conversation_id, message, usage, model and metadata
+
+    Raises:
+        ConversationNotFound: If the conversation does not exist
+        TimeoutError: If cancelled before the reply was stored
+    """
+    timer = timer or request_timer()
+    pending_turn, context = begin_chat_turn(body, timer)
+
+    # Generate response from Bedrock
+    with timer.stage('model'):
         bedrock_response = bedrock_client.generate_response(
-            messages=messages,
-            system_prompt=system_prompt
+            messages=context['messages'],
+            system_prompt=context['system_prompt'],
+            temperature=body.get('temperature', TEMPERATURE),
+            force_cache=body.get('force_cache', False)
         )
 
-        assistant_message = bedrock_response['message']
+    if cancelled is not None and cancelled.is_set():
+        raise TimeoutError("Chat turn abandoned before the reply was stored")
+
+    assistant_message = bedrock_response['message']
+
+    # Save both messages of the turn
+    turn = finish_chat_turn(pending_turn, context, assistant_message)
+
+    return {
+        'conversation_id': turn['conversation_id'],
+        'message': assistant_message,
+        'usage': bedrock_response.get('usage', {}),
+        'model': bedrock_response.get('model'),
+        'metadata': {
+            'write_units': turn['write_units'],
+            'context_tokens_estimate': context['input_tokens_estimate'],
+            'history_messages': context['history_messages'],
+            'timings_ms': timer.as_dict()
+        }
+    }
+
+
+def handle_chat_batch(body: Dict[str, Any], limit_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Handle a batch of independent prompts
+
+    Items run concurrently (bounded, and reduced while Bedrock throttles),
+    each with its own timeout, and the whole batch answers within
+    BATCH_DEADLINE_SECONDS of arriving: items still queued or running then
+    are reported as timed out. Results come back in request order with a
+    per-item status, so one failing item never fails the batch. Items are
+    stateless unless they carry a conversation_id or set "stateless": false;
+    stateless items are never persisted.
+
+    Args:
+        body: Request body with 'items' (each like a /chat body) and optional
+              'concurrency' and 'item_timeout_seconds'
+        limit_key: Caller identity for rate limiting; every item counts as a request
+
+    Returns:
+        API Gateway response with 'results' and a 'summary'
+    """
+    is_valid, error_msg = validate_required_fields(body, ['items'])
+    if not is_valid:
+        return create_error_response(400, error_msg)
+
+    items = body['items']
+    if not isinstance(items, list):
+        return create_error_response(400, ERROR_INVALID_REQUEST)
+    deadline = time.monotonic() + BATCH_DEADLINE_SECONDS
+    if len(items) > BATCH_MAX_ITEMS:
+        return create_error_response(400, f"At most {BATCH_MAX_ITEMS} items per batch")
+
+    try:
+        concurrency = max(1, min(int(body.get('concurrency', BATCH_MAX_CONCURRENCY)), BATCH_MAX_CONCURRENCY))
+        item_timeout = min(float(body.get('item_timeout_seconds', BATCH_ITEM_TIMEOUT_SECONDS)),
+                           BATCH_ITEM_TIMEOUT_SECONDS)
+    except (TypeError, ValueError):
+        return create_error_response(400, ERROR_INVALID_REQUEST)
+
+    reserved = sum(estimate_tokens(item.get('message')) for item in items if isinstance(item, dict))
+    limited = enforce_rate_limit(limit_key, requests=len(items), input_tokens=reserved)
+    if limited:
+        return limited
+
+    limiter = AdaptiveLimiter(concurrency)
+    results = run_batch(items, limiter, item_timeout, deadline)
+    charge_input_tokens(limit_key, {
+        'input_tokens': sum(r.get('usage', {}).get('input_tokens', 0) for r in results if r['status'] == 'ok')
+    }, reserved)
+
+    succeeded = sum(1 for result in results if result['status'] == 'ok')
+    metrics.count('BatchItems', len(results))
+    metrics.count('BatchItemErrors', len(results) - succeeded)
+
+    return create_response(200, {
+        'results': results,
+        'summary': {
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'throttles': limiter.throttles,
+            'final_concurrency': limiter.limit
+        }
+    })
+
+
+class BatchSlot:
+    """
+    Limiter slot of one batch item, released once by whichever side lets go first
+
+    run_batch releases the slot of an item it has given up on, so the call
+    it cannot interrupt no longer counts against the batch's concurrency.
+    """
+
+    def __init__(self, limiter: AdaptiveLimiter):
+        self.limiter = limiter
+        self._lock = threading.Lock()
+        self._held = False
+
+    def acquire(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for a slot"""
+        if not self.limiter.acquire(timeout=max(0.0, timeout)):
+            return False
+        with self._lock:
+            self._held = True
+        return True
+
+    def release(self, throttled: bool = False) -> None:
+        """Free the slot if it is still held"""
+        with self._lock:
+            if not self._held:
+                return
+            self._held = False
+        self.limiter.release(throttled=throttled)
+
+
+def run_batch(
+    items: List[Any],
+    limiter: AdaptiveLimiter,
+    item_timeout: float,
+    deadline: float
+) -> List[Dict[str, Any]]:
+    """
+    Run batch items on the shared batch pool and collect results in order
+
+    An item's timeout counts from when it gets a concurrency slot; the
+    batch deadline covers every item, including those still waiting for
+    one. A timed out item is reported immediately and its slot is freed;
+    its call cannot be interrupted, but it is flagged so a persisted turn is
+    not stored afterwards. Items that have not started by the deadline are
+    cancelled.
+
+    Args:
+        items: Batch items
+        limiter: Concurrency limiter shared by the items
+        item_timeout: Seconds each item may run
+        deadline: time.monotonic() value by which every item has a result
+
+    Returns:
+        One result dictionary per item, in item order
+    """
+    # Headroom for calls abandoned by earlier timeouts, which still occupy a thread
+    executor = get_executor('chat-batch', BATCH_MAX_CONCURRENCY * 2)
+    started: Dict[int, float] = {}
+    cancelled = [threading.Event() for _ in items]
+    slots = [BatchSlot(limiter) for _ in items]
+    futures = {
+        executor.submit(run_batch_item, index, item, slots[index], started, cancelled[index], deadline): index
+        for index, item in enumerate(items)
+    }
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=min(BATCH_POLL_SECONDS, max(0.0, deadline - time.monotonic())),
+                             return_when=FIRST_COMPLETED)
+        for future in done:
+            results[futures[future]] = future.result()
+
+        now = time.monotonic()
+        expired = []
+        for future in pending:
+            index = futures[future]
+            if now >= deadline:
+                results[index] = batch_error(index, 'timeout', "Batch deadline reached")
+            elif index in started and now - started[index] >= item_timeout:
+                results[index] = batch_error(index, 'timeout', f"Timed out after {item_timeout:g} seconds")
+            else:
+                continue
+            # Flag every expired item before freeing any slot, so a freed slot cannot start one of them
+            cancelled[index].set()
+            future.cancel()
+            expired.append(future)
+        for future in expired:
+            slots[futures[future]].release()
+            pending.discard(future)
+
+    metrics.count('BatchTimeouts', sum(1 for r in results if r.get('code') == 'timeout'))
+    return results
+
+
+def run_batch_item(
+    index: int,
+    item: Any,
+    slot: BatchSlot,
+    started: Dict[int, float],
+    cancelled: threading.Event,
+    deadline: float
+) -> Dict[str, Any]:
+    """
+    Run one batch item, retrying stateless items that Bedrock throttled
+
+    Args:
+        index: Position of the item in the batch
+        item: Item body
+        slot: The item's slot in the batch's concurrency limiter
+        started: Start times by index, filled in when the item gets a slot
+        cancelled: Set by run_batch when the item timed out
+        deadline: Batch deadline; the item gives up waiting for a slot then
+
+    Returns:
+        Result dictionary with index and status 'ok' or 'error'
+    """
+    if not isinstance(item, dict) or not item.get('message'):
+        return batch_error(index, 'invalid', "Missing required fields: message")
+
+    stateless = item.get('stateless', 'conversation_id' not in item)
+    # A persisted turn is not retried: in eager mode its user message may already be stored
+    attempts = BATCH_THROTTLE_RETRIES + 1 if stateless else 1
+
+    for attempt in range(attempts):
+        if cancelled.is_set() or not slot.acquire(deadline - time.monotonic()):
+            return batch_error(index, 'timeout', "Batch deadline reached")
+        started.setdefault(index, time.monotonic())
+        throttled = False
+        try:
+            if cancelled.is_set():
+                return batch_error(index, 'timeout', "Timed out")
+            if stateless:
+                result = run_stateless_prompt(item)
+            else:
+                result = run_chat_turn(item, timer=StageTimer(), cancelled=cancelled)
+            return {'index': index, 'status': 'ok', **result}
+
+        except ClientError as e:
+            if e.response['Error']['Code'] not in THROTTLING_ERROR_CODES:
+                logger.error(f"Error in batch item {index}: {str(e)}")
+                return batch_error(index, 'internal', ERROR_INTERNAL)
+            throttled = True
+            metrics.count('BatchThrottles')
+        except ConversationNotFound as e:
+            logger.warning(f"Batch item for unknown conversation: {str(e)}")
+            return batch_error(index, 'not_found', "Conversation not found")
+        except TimeoutError:
+            return batch_error(index, 'timeout', "Timed out")
+        except Exception as e:
+            logger.error(f"Error in batch item {index}: {str(e)}")
+            return batch_error(index, 'internal', ERROR_INTERNAL)
+        finally:
+            slot.release(throttled=throttled)
+
+        if attempt < attempts - 1:
+            # Full jitter keeps retried items from throttling in lockstep
+            time.sleep(random.uniform(0, BATCH_THROTTLE_BACKOFF_SECONDS * 2 ** attempt))
+
+    return batch_error(index, 'throttled', ERROR_RATE_LIMIT)
+
+
+def run_stateless_prompt(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Answer a single prompt without reading or storing any conversation
+
+    Args:
+        item: Item with 'message' and optional 'system_prompt', 'max_tokens', 'temperature', 'force_cache'
+
+    Returns:
+        Dictionary with message, usage and model
+    """
+    response = bedrock_client.generate_response(
+        messages=[{'role': 'user', 'content': item['message']}],
+        system_prompt=item.get('system_prompt'),
+        max_tokens=item.get('max_tokens', MAX_TOKENS),
+        temperature=item.get('temperature', TEMPERATURE),
+        force_cache=item.get('force_cache', False)
+    )
+    return {'message': response['message'], 'usage': response.get('usage', {}), 'model': response.get('model')}
+
+
+def batch_error(index: int, code: str, error: str) -> Dict[str, Any]:
+    """Per-item error result"""
+    return {'index': index, 'status': 'error', 'code': code, 'error': error}
+
+
+def start_chat_stream(
+    body: Dict[str, Any],
+    limit_key: Optional[str] = None
+) -> Tuple[Optional[Dict[str, Any]], Optional[Iterator[str]]]:
+    """
+    Validate a streaming chat request and charge its rate limit
+
+    Served by src.chatbot.stream_server, which forwards each event to the
+    client as soon as it is produced.
 
-        # Save assistant response to conversation
-        conversation_manager.add_message(
+    Args:
+        body: Request body
+        limit_key: Caller identity for rate limiting
+
+    Returns:
+        Tuple of (error response, None) if the request is refused, otherwise
+        (None, iterator of formatted SSE events from stream_chat)
+    """
+    is_valid, error_msg = validate_required_fields(body, ['message'])
+    if not is_valid:
+        return create_error_response(400, error_msg), None
+
+    limited = enforce_rate_limit(limit_key, input_tokens=estimate_tokens(body['message']))
+    if limited:
+        return limited, None
+
+    return None, stream_chat(body, limit_key)
+
+
+def stream_chat(body: Dict[str, Any], limit_key: Optional[str] = None) -> Iterator[str]:
+    """
+    Run a chat turn, yielding server-sent events as Bedrock produces text
+
+    Events: 'delta' with each text chunk, then 'done' with conversation_id,
+    usage and metadata once the assembled reply is stored, or 'error'.
+
+    Args:
+        body: Validated request body
+        limit_key: Caller identity billed for the input tokens used
+
+    Returns:
+        Iterator of formatted SSE events
+    """
+    try:
+        timer = request_timer()
+        pending_turn, context = begin_chat_turn(body, timer)
+
+        model_start = time.perf_counter()
+        stream = bedrock_client.stream_response(messages=context['messages'], system_prompt=context['system_prompt'])
+        for event in stream:
+            if event['type'] == 'delta':
+                yield format_sse_event('delta', {'text': event['text']})
+            elif event['type'] == 'done':
+                timer.record('model', (time.perf_counter() - model_start) * 1000)
+                charge_input_tokens(limit_key, event['usage'], estimate_tokens(body['message']))
+                turn = finish_chat_turn(pending_turn, context, event['message'])
+                yield format_sse_event('done', {
+                    'conversation_id': turn['conversation_id'],
+                    'usage': event['usage'],
+                    'model': event['model'],
+                    'metadata': {
+                        'write_units': turn['write_units'],
+                        'context_tokens_estimate': context['input_tokens_estimate'],
+                        'history_messages': context['history_messages'],
+                        'timings_ms': timer.as_dict()
+                    }
+                })
+
+    except ConversationNotFound as e:
+        logger.warning(f"Chat for unknown conversation: {str(e)}")
+        yield format_sse_event('error', {'error': "Conversation not found"})
+    except Exception as e:
+        logger.error(f"Error in streaming chat handler: {str(e)}")
+        yield format_sse_event('error', {'error': ERROR_INTERNAL})
+
+
+def request_timer() -> StageTimer:
+    """Stage timer of the current request: its metrics, or a standalone timer outside lambda_handler"""
+    return metrics.current() or StageTimer()
+
+
+def begin_chat_turn(body: Dict[str, Any], timer: StageTimer) -> Tuple[PendingTurn, Dict[str, Any]]:
+    """
+    Build the model context and start persisting the user message of a chat turn
+
+    The user message is encrypted and the expected message_count resolved
+    on the write pool while the history is read and Bedrock generates the
+    reply; only the context build and the model call are on the critical path.
+
+    Args:
+        body: Validated request body
+        timer: StageTimer for the request
+
+    Returns:
+        Tuple of (pending turn to commit with the reply, context from ContextBuilder.build)
+    """
+    user_message = body['message']
+    conversation_id = body.get('conversation_id')
+
+    def begin_turn():
+        return conversation_manager.begin_turn(
             conversation_id,
-            {'role': 'assistant', 'content': assistant_message}
+            {'role': 'user', 'content': user_message},
+            user_id=body.get('user_id', 'default_user'),
+            eager_write=EAGER_USER_WRITE,
+            timer=timer
         )
 
-        # Return response
-        return create_response(200, {
-            'conversation_id': conversation_id,
-            'message': assistant_message,
-            'usage': bedrock_response.get('usage', {}),
-            'model': bedrock_response.get('model')
-        })
+    def build_context():
+        # Pick the history that fits the token budget (a new conversation has none)
+        with timer.stage('context'):
+            return context_builder.build(conversation_id, user_message, body.get('system_prompt'), timer=timer)
 
-    except Exception as e:
-        logger.error(f"Error in chat handler: {str(e)}")
-        return create_error_response(500, ERROR_INTERNAL)
+    if EAGER_USER_WRITE:
+        # An eager write must land after the history read, or the new message would be sent twice
+        context = build_context()
+        return begin_turn(), context
+
+    pending_turn = begin_turn()
+    return pending_turn, build_context()
+
+
+def finish_chat_turn(pending_turn: PendingTurn, context: Dict[str, Any], reply: str) -> Dict[str, Any]:
+    """
+    Store the reply and give a background summary update a bounded time to finish
+
+    Lambda freezes the container once the response is returned, so a summary
+    update still running then may never be saved. That is safe: summary_seq
+    only advances when a summary is stored, so a later turn folds the same
+    messages again. The response never waits longer than
+    SUMMARY_FINISH_TIMEOUT_SECONDS for it.
+
+    Args:
+        pending_turn: Pending turn from begin_chat_turn
+        context: Context from begin_chat_turn
+        reply: Assistant message text
+
+    Returns:
+        Dictionary with conversation_id and write_units
+    """
+    turn = pending_turn.commit({'role': 'assistant', 'content': reply})
+
+    summary_write = context.get('summary_write')
+    if summary_write is not None:
+        done, _ = wait([summary_write], timeout=SUMMARY_FINISH_TIMEOUT_SECONDS)
+        if not done:
+            metrics.count('SummaryUnfinished')
+
+    return turn
 
 
 def handle_new_conversation(body: Dict[str, Any]) -> Dict[str, Any]:
@@ -160,9 +751,81 @@ def handle_new_conversation(body: Dict[str, Any]) -> Dict[str, Any]:
         return create_error_response(500, ERROR_INTERNAL)
 
 
+def handle_list_conversations(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Handle list conversations request (GET /conversations?user_id=&cursor=&limit=)
+
+    Args:
+        event: API Gateway event
+
+    Returns:
+        API Gateway response with one page of conversation metadata and next_cursor
+    """
+    params = event.get('queryStringParameters') or {}
+    user_id = params.get('user_id')
+    if not user_id:
+        return create_error_response(400, "Missing user_id")
+
+    try:
+        limit = int(params.get('limit', CONVERSATION_LIST_DEFAULT_LIMIT))
+    except ValueError:
+        return create_error_response(400, "limit must be an integer")
+    if not 1 <= limit <= CONVERSATION_LIST_MAX_LIMIT:
+        return create_error_response(400, f"limit must be between 1 and {CONVERSATION_LIST_MAX_LIMIT}")
+
+    try:
+        page = conversation_manager.list_conversations(user_id, limit=limit, cursor=params.get('cursor'))
+    except ValueError as e:
+        return create_error_response(400, str(e))
+    except Exception as e:
+        logger.error(f"Error listing conversations: {str(e)}")
+        return create_error_response(500, ERROR_INTERNAL)
+
+    return create_response(200, {'user_id': user_id, **page})
+
+
+def _parse_since(value: str) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Parse the 'since' query parameter
+
+    Args:
+        value: A message sequence number or an ISO-8601 timestamp
+
+    Returns:
+        Tuple of (since_seq, since_timestamp), one of them None
+
+    Raises:
+        ValueError: If the value is neither
+    """
+    if value.isdigit():
+        return int(value), None
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError("since must be a sequence number or an ISO-8601 timestamp")
+    if moment.tzinfo is not None:
+        # Stored timestamps are naive UTC
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return None, moment.isoformat()
+
+
+def _conversation_etag(header: Dict[str, Any], query: Tuple[Any, ...]) -> str:
+    """
+    Entity tag for one view of a conversation
+
+    Messages are immutable once written and every append bumps message_count
+    and updated_at, so the header plus the query identifies the response.
+    """
+    key = json.dumps([header['conversation_id'], header['message_count'], header.get('updated_at'), *query])
+    return '"' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + '"'
+
+
 def handle_get_conversation(event: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Handle get conversation request
+    Handle get conversation request (GET /conversations/{id}?since=&limit=&fields=)
+
+    The header is read first; if the client's If-None-Match still matches,
+    304 is returned without reading or decrypting any message.
 
     Args:
         event: API Gateway event
@@ -171,23 +834,71 @@ def handle_get_conversation(event: Dict[str, Any]) -> Dict[str, Any]:
         API Gateway response
     """
     # Extract conversation_id from path
-    path_parameters = event.get('pathParameters', {})
+    path_parameters = event.get('pathParameters') or {}
     conversation_id = path_parameters.get('conversation_id')
 
     if not conversation_id:
         return create_error_response(400, "Missing conversation_id")
 
+    params = event.get('queryStringParameters') or {}
+    since_seq, since_timestamp, limit, fields = None, None, None, None
     try:
-        conversation = conversation_manager.get_conversation(conversation_id)
+        if params.get('since'):
+            since_seq, since_timestamp = _parse_since(params['since'])
+    except ValueError as e:
+        return create_error_response(400, str(e))
+
+    if params.get('limit'):
+        try:
+            limit = int(params['limit'])
+        except ValueError:
+            return create_error_response(400, "limit must be an integer")
+        if not 1 <= limit <= CONVERSATION_MESSAGES_MAX_LIMIT:
+            return create_error_response(400, f"limit must be between 1 and {CONVERSATION_MESSAGES_MAX_LIMIT}")
+
+    if params.get('fields'):
+        requested = {f.strip() for f in params['fields'].split(',') if f.strip()}
+        unknown = requested - set(MESSAGE_FIELDS)
+        if unknown:
+            return create_error_response(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+        fields = [f for f in MESSAGE_FIELDS if f in requested]
 
-        if not conversation:
+    try:
+        header = conversation_manager.get_conversation_header(conversation_id)
+        if not header:
             return create_error_response(404, "Conversation not found")
 
+        etag = _conversation_etag(header, (since_seq, since_timestamp, limit, fields))
+        if etag_matches(get_header(event, 'If-None-Match'), etag):
+            metrics.count('ConversationNotModified')
+            return create_not_modified_response(etag)
+
+        if since_timestamp is not None and (header.get('updated_at') or '') <= since_timestamp:
+            messages = []
+        else:
+            messages = conversation_manager.get_messages(
+                conversation_id,
+                since_seq=since_seq,
+                since_timestamp=since_timestamp,
+                limit=limit,
+                fields=fields
+            )
+        if encryption_manager and messages and (fields is None or 'content' in fields):
+            messages = conversation_manager.decrypt_messages(messages)
+            logger.info(f"Decrypt stats: {conversation_manager.last_decrypt_stats.as_dict()}")
+
+        last_seq = messages[-1]['seq'] if messages else since_seq
         return create_response(200, {
             'conversation_id': conversation_id,
-            'messages': conversation.get('messages', []),
-            'created_at': conversation.get('created_at'),
-            'updated_at': conversation.get('updated_at')
+            'messages': messages,
+            'created_at': header.get('created_at'),
+            'updated_at': header.get('updated_at'),
+            'message_count': header['message_count'],
+            'has_more': last_seq is not None and last_seq < header['message_count']
+        }, headers={
+            'ETag': etag,
+            'Cache-Control': 'private, no-cache',
+            'Access-Control-Expose-Headers': 'ETag',
         })
 
     except Exception as e:
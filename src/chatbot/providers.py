@@ -0,0 +1,387 @@
+"""
+Provider adapters for Bedrock model families
+
+Each adapter knows how to build the InvokeModel request body for its
+provider and how to normalize full responses and stream chunks into:
+    text, stop_reason, {'input_tokens': int, 'output_tokens': int}
+
+Adapters are resolved once per model_id (see get_adapter); adding a
+provider means subclassing ProviderAdapter and registering it.
+
+Adapters with supports_prompt_caching mark cacheable prompt prefixes when
+build_request is given the model's minimum cacheable length, and report
+cache reads and writes as 'cache_read_input_tokens' and
+'cache_write_input_tokens' in the usage.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from src.chatbot.context_builder import estimate_tokens, MESSAGE_OVERHEAD_TOKENS
+from src.shared.constants import PROMPT_CACHE_MIN_TOKENS, PROMPT_CACHE_MODEL_MIN_TOKENS
+
+# Inference profile prefixes that may precede the provider in a model id (e.g. us.anthropic.claude-...)
+INFERENCE_PROFILE_PREFIXES = frozenset({'us', 'eu', 'apac', 'us-gov', 'global'})
+
+ParsedOutput = Tuple[Optional[str], Optional[str], Dict[str, int]]
+
+
+class ProviderAdapter:
+    """
+    Base adapter; subclasses implement the provider-specific formats
+    """
+
+    supports_prompt_caching = False
+
+    def build_request(
+        self,
+        messages: List[Dict[str, Any]],
+        system_prompt: Optional[str],
+        max_tokens: int,
+        temperature: float,
+        cache_min_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the InvokeModel request body
+
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            system_prompt: Optional system prompt
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            cache_min_tokens: Minimum cacheable prefix length; enables prompt caching
+                              where supported (None leaves the prompt unmarked)
+
+        Returns:
+            Request body dictionary
+        """
+        raise NotImplementedError
+
+    def parse_response(self, body: Dict[str, Any]) -> ParsedOutput:
+        """
+        Normalize a complete InvokeModel response body
+
+        Args:
+            body: Decoded response body
+
+        Returns:
+            Tuple of (text, stop reason, usage)
+        """
+        raise NotImplementedError
+
+    def parse_stream_chunk(self, payload: Dict[str, Any]) -> ParsedOutput:
+        """
+        Normalize one decoded InvokeModelWithResponseStream chunk
+
+        Args:
+            payload: Decoded chunk JSON
+
+        Returns:
+            Tuple of (text delta or None, stop reason or None, partial usage)
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def invocation_metrics_usage(payload: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Usage from the invocation metrics Bedrock appends to the last stream chunk of every provider
+        """
+        metrics = payload.get('amazon-bedrock-invocationMetrics')
+        if not metrics:
+            return {}
+        usage = {
+            'input_tokens': metrics.get('inputTokenCount', 0),
+            'output_tokens': metrics.get('outputTokenCount', 0)
+        }
+        if 'cacheReadInputTokenCount' in metrics or 'cacheWriteInputTokenCount' in metrics:
+            usage['cache_read_input_tokens'] = metrics.get('cacheReadInputTokenCount', 0)
+            usage['cache_write_input_tokens'] = metrics.get('cacheWriteInputTokenCount', 0)
+        return usage
+
+
+def prompt_cache_min_tokens(model_id: str) -> int:
+    """
+    Shortest prompt prefix the model caches
+
+    Args:
+        model_id: Bedrock model or inference profile id
+
+    Returns:
+        Minimum prefix length in tokens
+    """
+    model_id = model_id.lower()
+    for name, min_tokens in PROMPT_CACHE_MODEL_MIN_TOKENS.items():
+        if name in model_id:
+            return min_tokens
+    return PROMPT_CACHE_MIN_TOKENS
+
+
+def _content_tokens(content: Any) -> int:
+    """Estimated tokens of string content or a list of content blocks"""
+    if isinstance(content, str):
+        return estimate_tokens(content)
+    return sum(estimate_tokens(block.get('text')) for block in content if isinstance(block, dict))
+
+
+class AnthropicAdapter(ProviderAdapter):
+    """Claude models via the Anthropic Messages API"""
+
+    ANTHROPIC_VERSION = "bedrock-2023-05-31"
+    CACHE_CONTROL = {"type": "ephemeral"}
+
+    supports_prompt_caching = True
+
+    def build_request(self, messages, system_prompt, max_tokens, temperature, cache_min_tokens=None):
+        # Messages are already in the Anthropic shape and are passed through untouched
+        request_body = {
+            "anthropic_version": self.ANTHROPIC_VERSION,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": messages
+        }
+        if system_prompt:
+            request_body["system"] = system_prompt
+        if cache_min_tokens:
+            self._add_cache_breakpoints(request_body, cache_min_tokens)
+        return request_body
+
+    def _add_cache_breakpoints(self, request_body: Dict[str, Any], min_tokens: int) -> None:
+        """
+        Mark the system prompt and the history before the newest message as cacheable
+
+        A cache entry covers everything up to its breakpoint, and later
+        requests find it from their own breakpoint, so marking the last
+        message before the new user turn lets each turn read the prefix
+        cached by the previous one. Prefixes shorter than the model's
+        minimum are left unmarked, since they would not be cached anyway.
+        """
+        system_prompt = request_body.get("system")
+        prefix_tokens = estimate_tokens(system_prompt)
+        if system_prompt and prefix_tokens >= min_tokens:
+            request_body["system"] = [{"type": "text", "text": system_prompt, "cache_control": self.CACHE_CONTROL}]
+
+        messages = request_body["messages"]
+        if len(messages) < 2:
+            return
+        prefix_tokens += sum(_content_tokens(m['content']) + MESSAGE_OVERHEAD_TOKENS for m in messages[:-1])
+        if prefix_tokens >= min_tokens:
+            # Copied: the caller's messages may be shared, e.g. with the history cache
+            request_body["messages"] = [*messages[:-2], self._with_cache_control(messages[-2]), messages[-1]]
+
+    def _with_cache_control(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        content = message['content']
+        if isinstance(content, str):
+            blocks = [{"type": "text", "text": content}]
+        else:
+            blocks = [dict(block) for block in content]
+        if blocks:
+            blocks[-1]["cache_control"] = self.CACHE_CONTROL
+        return {**message, "content": blocks}
+
+    @staticmethod
+    def _usage(usage: Dict[str, Any]) -> Dict[str, int]:
+        normalized = {
+            'input_tokens': usage.get('input_tokens', 0),
+            'output_tokens': usage.get('output_tokens', 0)
+        }
+        if 'cache_read_input_tokens' in usage or 'cache_creation_input_tokens' in usage:
+            normalized['cache_read_input_tokens'] = usage.get('cache_read_input_tokens') or 0
+            normalized['cache_write_input_tokens'] = usage.get('cache_creation_input_tokens') or 0
+        return normalized
+
+    def parse_response(self, body):
+        content = body.get('content') or [{}]
+        return content[0].get('text', ''), body.get('stop_reason'), self._usage(body.get('usage', {}))
+
+    def parse_stream_chunk(self, payload):
+        event_type = payload.get('type')
+
+        if event_type == 'content_block_delta':
+            return payload['delta'].get('text'), None, {}
+        if event_type == 'message_start':
+            usage = self._usage(payload['message'].get('usage', {}))
+            del usage['output_tokens']
+            return None, None, usage
+        if event_type == 'message_delta':
+            return None, payload['delta'].get('stop_reason'), {
+                'output_tokens': payload.get('usage', {}).get('output_tokens', 0)
+            }
+        return None, None, self.invocation_metrics_usage(payload)
+
+
+class AmazonNovaAdapter(ProviderAdapter):
+    """Amazon Nova models via the Converse-style messages schema"""
+
+    def build_request(self, messages, system_prompt, max_tokens, temperature, cache_min_tokens=None):
+        # Nova needs content blocks; plain-string content is wrapped in a single pass
+        request_body = {
+            "messages": [
+                {"role": m["role"], "content": [{"text": m["content"]}]} if isinstance(m["content"], str) else m
+                for m in messages
+            ],
+            "inferenceConfig": {
+                "maxTokens": max_tokens,
+                "temperature": temperature
+            }
+        }
+        if system_prompt:
+            request_body["system"] = [{"text": system_prompt}]
+        return request_body
+
+    def parse_response(self, body):
+        content = body.get('output', {}).get('message', {}).get('content') or [{}]
+        usage = body.get('usage', {})
+        return content[0].get('text', ''), body.get('stopReason'), {
+            'input_tokens': usage.get('inputTokens', 0),
+            'output_tokens': usage.get('outputTokens', 0)
+        }
+
+    def parse_stream_chunk(self, payload):
+        if 'contentBlockDelta' in payload:
+            return payload['contentBlockDelta'].get('delta', {}).get('text'), None, {}
+        if 'messageStop' in payload:
+            return None, payload['messageStop'].get('stopReason'), {}
+        if 'metadata' in payload:
+            usage = payload['metadata'].get('usage', {})
+            return None, None, {
+                'input_tokens': usage.get('inputTokens', 0),
+                'output_tokens': usage.get('outputTokens', 0)
+            }
+        return None, None, self.invocation_metrics_usage(payload)
+
+
+class MetaLlamaAdapter(ProviderAdapter):
+    """Meta Llama 3 models via the text-completion schema with the Llama 3 chat template"""
+
+    def build_request(self, messages, system_prompt, max_tokens, temperature, cache_min_tokens=None):
+        parts = ["<|begin_of_text|>"]
+        if system_prompt:
+            parts.append(f"<|start_header_id|>system<|end_header_id|>\n\n{system_prompt}<|eot_id|>")
+        for m in messages:
+            parts.append(f"<|start_header_id|>{m['role']}<|end_header_id|>\n\n{m['content']}<|eot_id|>")
+        parts.append("<|start_header_id|>assistant<|end_header_id|>\n\n")
+
+        return {
+            "prompt": ''.join(parts),
+            "max_gen_len": max_tokens,
+            "temperature": temperature
+        }
+
+    def parse_response(self, body):
+        return body.get('generation', ''), body.get('stop_reason'), {
+            'input_tokens': body.get('prompt_token_count') or 0,
+            'output_tokens': body.get('generation_token_count') or 0
+        }
+
+    def parse_stream_chunk(self, payload):
+        text, stop_reason, usage = self.parse_response(payload)
+        usage = {k: v for k, v in usage.items() if v}
+        return text or None, stop_reason, usage or self.invocation_metrics_usage(payload)
+
+
+class MistralAdapter(ProviderAdapter):
+    """Mistral instruct models via the text-completion schema"""
+
+    def build_request(self, messages, system_prompt, max_tokens, temperature, cache_min_tokens=None):
+        parts = ["<s>"]
+        pending_system = f"{system_prompt}\n\n" if system_prompt else ""
+        for m in messages:
+            if m['role'] == 'user':
+                parts.append(f"[INST] {pending_system}{m['content']} [/INST]")
+                pending_system = ""
+            else:
+                parts.append(f"{m['content']}</s>")
+
+        return {
+            "prompt": ''.join(parts),
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+
+    def parse_response(self, body):
+        output = (body.get('outputs') or [{}])[0]
+        return output.get('text', ''), output.get('stop_reason'), {}
+
+    def parse_stream_chunk(self, payload):
+        text, stop_reason, _ = self.parse_response(payload)
+        return text or None, stop_reason, self.invocation_metrics_usage(payload)
+
+
+class CohereAdapter(ProviderAdapter):
+    """Cohere Command R models via the Cohere chat schema"""
+
+    ROLES = {'user': 'USER', 'assistant': 'CHATBOT'}
+
+    def build_request(self, messages, system_prompt, max_tokens, temperature, cache_min_tokens=None):
+        request_body = {
+            "message": messages[-1]['content'],
+            "chat_history": [{"role": self.ROLES[m['role']], "message": m['content']} for m in messages[:-1]],
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        if system_prompt:
+            request_body["preamble"] = system_prompt
+        return request_body
+
+    def parse_response(self, body):
+        return body.get('text', ''), body.get('finish_reason'), {}
+
+    def parse_stream_chunk(self, payload):
+        event_type = payload.get('event_type')
+        if event_type == 'text-generation':
+            return payload.get('text'), None, {}
+        if event_type == 'stream-end':
+            return None, payload.get('finish_reason'), self.invocation_metrics_usage(payload)
+        return None, None, self.invocation_metrics_usage(payload)
+
+
+# Provider name (the model id segment before the first dot) -> adapter
+_ADAPTERS: Dict[str, ProviderAdapter] = {
+    'anthropic': AnthropicAdapter(),
+    'amazon': AmazonNovaAdapter(),
+    'meta': MetaLlamaAdapter(),
+    'mistral': MistralAdapter(),
+    'cohere': CohereAdapter(),
+}
+DEFAULT_PROVIDER = 'anthropic'
+
+
+def register_adapter(provider: str, adapter: ProviderAdapter) -> None:
+    """
+    Register or replace the adapter for a provider
+
+    Args:
+        provider: Provider name as it appears in model ids (e.g. 'ai21')
+        adapter: Adapter instance
+    """
+    _ADAPTERS[provider] = adapter
+    get_adapter.cache_clear()
+
+
+def provider_from_model_id(model_id: str) -> str:
+    """
+    Extract the provider name from a model id or inference profile id
+
+    Args:
+        model_id: e.g. 'anthropic.claude-3-haiku-20240307-v1:0' or 'us.meta.llama3-1-8b-instruct-v1:0'
+
+    Returns:
+        Provider name, e.g. 'anthropic' or 'meta'
+    """
+    # ARNs end with the model or profile id after the last slash
+    segments = model_id.rsplit('/', 1)[-1].lower().split('.')
+    if len(segments) > 2 and segments[0] in INFERENCE_PROFILE_PREFIXES:
+        return segments[1]
+    return segments[0]
+
+
+@lru_cache(maxsize=64)
+def get_adapter(model_id: str) -> ProviderAdapter:
+    """
+    Resolve the adapter for a model id, falling back to the Anthropic format
+
+    Args:
+        model_id: Bedrock model identifier
+
+    Returns:
+        ProviderAdapter instance
+    """
+    return _ADAPTERS.get(provider_from_model_id(model_id), _ADAPTERS[DEFAULT_PROVIDER])
@@ -0,0 +1,144 @@
+"""
+Exact-match cache for Bedrock responses
+
+Identical requests (same model, system prompt, messages, max_tokens and
+temperature) are answered from an in-memory LRU tier, then from an
+optional DynamoDB tier shared by all containers, before calling Bedrock.
+"""
+import json
+import time
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from src.shared.cache import LRUCache
+from src.shared.dynamodb import DynamoDBTable
+from src.shared.encryption import EncryptionManager
+from src.shared.constants import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS
+
+logger = logging.getLogger()
+
+
+def make_cache_key(
+    model_id: str,
+    system_prompt: Optional[str],
+    messages: List[Dict[str, Any]],
+    max_tokens: int,
+    temperature: float
+) -> str:
+    """
+    Build a cache key from everything that determines the model output
+
+    Args:
+        model_id: Bedrock model identifier
+        system_prompt: Optional system prompt
+        messages: Request messages
+        max_tokens: Maximum tokens to generate
+        temperature: Sampling temperature
+
+    Returns:
+        Hex SHA-256 digest of the canonical request
+    """
+    canonical = json.dumps(
+        [model_id, system_prompt, messages, max_tokens, temperature],
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache: in-process LRU plus optional DynamoDB table with TTL
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS,
+        table_name: Optional[str] = None,
+        encryption_manager: Optional[EncryptionManager] = None
+    ):
+        """
+        Initialize response cache
+
+        Args:
+            max_entries: Maximum responses kept in memory
+            ttl_seconds: Lifetime of a cached response in both tiers
+            table_name: Optional DynamoDB table (hash key 'cache_key', TTL attribute 'ttl') for the shared tier
+            encryption_manager: Optional encryption manager for responses stored in DynamoDB
+        """
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.table = DynamoDBTable(table_name) if table_name else None
+        self.encryption_manager = encryption_manager
+        self.stats = {'hits': 0, 'misses': 0, 'memory_hits': 0, 'dynamodb_hits': 0}
+
+    def get(self, key: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Look up a cached response
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            Tuple of (response or None, tier that served it: 'memory', 'dynamodb' or None)
+        """
+        response = self.memory.get(key)
+        if response is not None:
+            self._record_hit('memory')
+            return response, 'memory'
+
+        if self.table is not None:
+            response = self._get_shared(key)
+            if response is not None:
+                self.memory.put(key, response)
+                self._record_hit('dynamodb')
+                return response, 'dynamodb'
+
+        self.stats['misses'] += 1
+        return None, None
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        """
+        Store a response in both tiers
+
+        Args:
+            key: Cache key from make_cache_key
+            response: Response dictionary from BedrockClient.generate_response
+        """
+        self.memory.put(key, response)
+
+        if self.table is not None:
+            try:
+                payload = json.dumps(response)
+                if self.encryption_manager:
+                    payload = self.encryption_manager.encrypt(payload)
+
+                self.table.put_item(Item={
+                    'cache_key': key,
+                    'response': payload,
+                    'ttl': int(time.time()) + self.ttl_seconds
+                })
+            except Exception as e:
+                logger.error(f"Error writing response cache: {str(e)}")
+
+    def _get_shared(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read a response from the DynamoDB tier, ignoring expired items not yet removed by TTL"""
+        try:
+            item = self.table.get_item(Key={'cache_key': key}).get('Item')
+            if not item or int(item.get('ttl', 0)) <= time.time():
+                return None
+
+            payload = item['response']
+            if self.encryption_manager:
+                payload = self.encryption_manager.decrypt(payload)
+            return json.loads(payload)
+
+        except Exception as e:
+            logger.error(f"Error reading response cache: {str(e)}")
+            return None
+
+    def _record_hit(self, tier: str) -> None:
+        self.stats['hits'] += 1
+        self.stats[f'{tier}_hits'] += 1
@@ -0,0 +1,5 @@
+#!/bin/sh
+# Startup command for the chat stream function; the Lambda Web Adapter
+# (AWS_LAMBDA_EXEC_WRAPPER=/opt/bootstrap) proxies Function URL requests to it.
+export PYTHONPATH="/opt/python:${LAMBDA_TASK_ROOT:-.}${PYTHONPATH:+:$PYTHONPATH}"
+exec python3 -m src.chatbot.stream_server
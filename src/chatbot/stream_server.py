@@ -0,0 +1,177 @@
+"""
+HTTP server for streaming chat responses
+
+API Gateway REST integrations buffer a Lambda's whole response, so POST
+/chat/stream is served by its own function behind a Lambda Function URL in
+RESPONSE_STREAM mode. The managed Python runtime cannot stream a response
+by itself; the Lambda Web Adapter layer starts this server
+(run_stream_server.sh) and relays its chunked response as it is written.
+Every server-sent event is written and flushed as soon as stream_chat
+yields it, so the first tokens reach the client while the model is still
+generating.
+
+Function URLs bypass the API Gateway authorizer, so the bearer API key is
+checked here against the same secret.
+
+Run locally:
+
+    PORT=8080 python -m src.chatbot.stream_server
+"""
+import os
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional
+from src.authorizer.handler import hash_token, lookup_principal
+from src.chatbot import handler as chat
+from src.shared import metrics
+from src.shared.utils import create_response, create_error_response, json_loads, log_request
+from src.shared.constants import ERROR_INVALID_REQUEST, ERROR_UNAUTHORIZED, ERROR_INTERNAL
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+STREAM_PATH = '/chat/stream'
+HEALTH_PATH = '/health'  # Lambda Web Adapter readiness check
+
+
+def authenticate(authorization: Optional[str]) -> Optional[str]:
+    """
+    Resolve the principal of a bearer API key
+
+    Args:
+        authorization: Authorization header value, with or without 'Bearer '
+
+    Returns:
+        Principal, or None if the key is missing or unknown
+    """
+    token = authorization or ''
+    if token.startswith('Bearer '):
+        token = token[7:]
+    if not token:
+        return None
+    entry = lookup_principal(hash_token(token))
+    return entry['principal'] if entry else None
+
+
+class ChatStreamHandler(BaseHTTPRequestHandler):
+    """
+    Serves POST /chat/stream as chunked server-sent events
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        if self.path == HEALTH_PATH:
+            self._send_response(create_response(200, {'status': 'ok'}))
+        else:
+            self._send_response(create_error_response(404, "Endpoint not found"))
+
+    def do_POST(self) -> None:
+        body_bytes = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.path.split('?')[0] != STREAM_PATH:
+            self._send_response(create_error_response(404, "Endpoint not found"))
+            return
+
+        request_metrics = metrics.start_request(STREAM_PATH, chat.METRICS_SAMPLE_RATE)
+        try:
+            status = self._handle_stream(body_bytes)
+            request_metrics.set_property('StatusCode', status)
+        finally:
+            metrics.finish_request(request_metrics)
+
+    def _handle_stream(self, body_bytes: bytes) -> int:
+        """Authenticate, validate and stream one chat turn; returns the HTTP status"""
+        principal = authenticate(self.headers.get('Authorization'))
+        if principal is None:
+            logger.warning("API key validation failed")
+            return self._send_response(create_error_response(401, ERROR_UNAUTHORIZED))
+
+        try:
+            body = json_loads(body_bytes or b'{}')
+        except json.JSONDecodeError:
+            logger.error("Invalid JSON in request body")
+            return self._send_response(create_error_response(400, ERROR_INVALID_REQUEST))
+        if not isinstance(body, dict):
+            return self._send_response(create_error_response(400, ERROR_INVALID_REQUEST))
+
+        event = {'httpMethod': 'POST', 'path': STREAM_PATH, 'requestContext': {'authorizer': {'principalId': principal}}}
+        log_request(event, body, chat.REQUEST_LOG_SAMPLE_RATE)
+
+        try:
+            error, events = chat.start_chat_stream(body, chat.rate_limit_key(event, body))
+        except Exception as e:
+            logger.error(f"Error starting chat stream: {str(e)}")
+            return self._send_response(create_error_response(500, ERROR_INTERNAL))
+        if error is not None:
+            return self._send_response(error)
+
+        self._send_events(events)
+        return 200
+
+    def _send_response(self, response: Dict[str, Any]) -> int:
+        """Write an API Gateway style response; CORS headers come from the Function URL"""
+        body = response['body'].encode('utf-8')
+        self.send_response(response['statusCode'])
+        for name, value in response['headers'].items():
+            if not name.startswith('Access-Control-'):
+                self.send_header(name, str(value))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return response['statusCode']
+
+    def _send_events(self, events: Iterator[str]) -> None:
+        """Write each event as its own HTTP chunk as soon as it is produced"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        connected = True
+        for event in events:
+            if not connected:
+                # Keep consuming so the turn still completes and the reply is stored
+                continue
+            data = event.encode('utf-8')
+            try:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                logger.warning("Client disconnected from chat stream")
+                connected = False
+        if connected:
+            self.wfile.write(b'0\r\n\r\n')
+            self.wfile.flush()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Request logging goes through log_request; keep the access log out of CloudWatch
+        logger.debug(format % args)
+
+
+def make_server(host: str = '0.0.0.0', port: int = 8080) -> ThreadingHTTPServer:
+    """
+    Create the streaming chat server
+
+    Args:
+        host: Interface to bind
+        port: Port to listen on (0 picks a free one)
+
+    Returns:
+        ThreadingHTTPServer; call serve_forever to run it
+    """
+    server = ThreadingHTTPServer((host, port), ChatStreamHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    """Serve until the process is stopped (the Lambda Web Adapter's startup command)"""
+    server = make_server(port=int(os.environ.get('PORT', 8080)))
+    logger.info(f"Chat stream server listening on port {server.server_address[1]}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+# Conversation export package
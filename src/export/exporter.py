@@ -0,0 +1,330 @@
+"""
+Bulk export of conversations to gzip-compressed NDJSON
+
+Every conversation becomes one line:
+
+    {"conversation_id": ..., "user_id": ..., "created_at": ..., "updated_at": ...,
+     "message_count": 3, "title": ..., "messages": [{"seq": 1, "role": "user",
+     "content": "...", "timestamp": ...}, ...]}
+
+A full export runs a parallel segmented Scan of the conversations table,
+one thread and one output part per segment. Exporting one user queries
+the UserIdUpdatedIndex page by page instead (a single segment). For each
+page of headers the messages of up to EXPORT_FETCH_WORKERS conversations
+are read concurrently, the whole page is batch-decrypted, and the lines are
+compressed into the segment's current gzip member.
+
+Memory stays bounded: each segment holds one page of conversations and
+one member of at most about EXPORT_PART_BYTES compressed bytes. Members
+are committed at page boundaries, and the checkpoint then records the
+page's LastEvaluatedKey, so an interrupted export (or one that reaches
+its deadline) resumes every segment where its committed output ends.
+"""
+import time
+import zlib
+import logging
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from src.chatbot.conversation_manager import ConversationManager
+from src.export.targets import ExportTarget, CHECKPOINT_FILE, MANIFEST_FILE, part_name
+from src.shared.concurrency import get_executor
+from src.shared.utils import json_dumps
+from src.shared.constants import (
+    USER_ID_INDEX_NAME,
+    EXPORT_SEGMENTS,
+    EXPORT_PAGE_SIZE,
+    EXPORT_FETCH_WORKERS,
+    EXPORT_PART_BYTES,
+    EXPORT_COMPRESSION_LEVEL,
+)
+
+logger = logging.getLogger()
+
+EXPORT_FORMAT = 'pai-conversation-export'
+EXPORT_FORMAT_VERSION = 1
+HEADER_FIELDS = ('conversation_id', 'user_id', 'created_at', 'updated_at', 'message_count', 'title')
+COUNTERS = ('conversations', 'messages', 'bytes', 'compressed_bytes')
+MB = 1024 * 1024
+
+
+class MemberWriter:
+    """
+    Compresses NDJSON lines into one gzip member at a time
+    """
+
+    def __init__(self, level: int = EXPORT_COMPRESSION_LEVEL):
+        self.level = level
+        self._reset()
+
+    def _reset(self) -> None:
+        # wbits=31: gzip header and trailer, so finished members can be concatenated
+        self._compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        self._chunks: List[bytes] = []
+        self.size = 0  # compressed bytes produced so far
+        self.counts = {'conversations': 0, 'messages': 0, 'bytes': 0}
+
+    def write(self, line: str, messages: int) -> None:
+        data = line.encode('utf-8') + b'\n'
+        compressed = self._compressor.compress(data)
+        if compressed:
+            self._chunks.append(compressed)
+            self.size += len(compressed)
+        self.counts['conversations'] += 1
+        self.counts['messages'] += messages
+        self.counts['bytes'] += len(data)
+
+    @property
+    def empty(self) -> bool:
+        return self.counts['conversations'] == 0
+
+    def finish(self) -> tuple:
+        """Complete the member; returns (member bytes, counts) and starts a new member"""
+        self._chunks.append(self._compressor.flush())
+        member = b''.join(self._chunks)
+        counts = {**self.counts, 'compressed_bytes': len(member)}
+        self._reset()
+        return member, counts
+
+
+class ConversationExporter:
+    """
+    Exports conversations with parallel segments, checkpoints and resume
+    """
+
+    def __init__(
+        self,
+        target: ExportTarget,
+        conversation_manager: ConversationManager,
+        user_id: Optional[str] = None,
+        segments: int = EXPORT_SEGMENTS,
+        page_size: int = EXPORT_PAGE_SIZE,
+        fetch_workers: int = EXPORT_FETCH_WORKERS,
+        part_bytes: int = EXPORT_PART_BYTES,
+        level: int = EXPORT_COMPRESSION_LEVEL
+    ):
+        """
+        Initialize exporter
+
+        Args:
+            target: Where the parts, checkpoint and manifest are written
+            conversation_manager: Reads headers and messages (with its encryption manager, if any)
+            user_id: Export only this user's conversations (one segment)
+            segments: Parallel Scan segments for a full export
+            page_size: Conversation headers per page
+            fetch_workers: Conversations whose messages are read concurrently
+            part_bytes: Compressed bytes after which a member is committed and checkpointed
+            level: gzip compression level
+        """
+        self.target = target
+        self.manager = conversation_manager
+        self.user_id = user_id
+        self.segments = 1 if user_id else segments
+        self.page_size = page_size
+        self.fetch_workers = fetch_workers
+        self.part_bytes = part_bytes
+        self.level = level
+        self._lock = threading.Lock()
+        self._checkpoint: Dict[str, Any] = {}
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        """Parameters a checkpoint must match to be resumed"""
+        return {'table': self.manager.table.name, 'user_id': self.user_id, 'segments': self.segments}
+
+    def run(self, resume: bool = False, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Export, or continue an interrupted export
+
+        Args:
+            resume: Continue from the target's checkpoint (required if one exists)
+            deadline: time.monotonic() value after which segments checkpoint and stop
+
+        Returns:
+            Statistics: totals so far, 'complete', and this run's throughput
+
+        Raises:
+            ValueError: If a checkpoint exists but resume is off, or it belongs to another export
+            RuntimeError: If a segment failed (the others still checkpoint their progress)
+        """
+        started = time.perf_counter()
+        manifest = self.target.read_json(MANIFEST_FILE)
+        if manifest is not None:
+            if resume and manifest.get('params') == self.params:
+                return {**manifest, 'complete': True, 'run': self._throughput({}, 0.0)}
+            raise ValueError(f"An export already exists at {self.target.describe()}")
+
+        checkpoint = self.target.read_json(CHECKPOINT_FILE)
+        if checkpoint is not None:
+            if not resume:
+                raise ValueError(f"An unfinished export exists at {self.target.describe()}; resume it")
+            if checkpoint.get('params') != self.params:
+                raise ValueError(f"The checkpoint at {self.target.describe()} belongs to a different export")
+        else:
+            checkpoint = {
+                'format': EXPORT_FORMAT,
+                'version': EXPORT_FORMAT_VERSION,
+                'params': self.params,
+                'started_at': datetime.now(timezone.utc).isoformat(),
+                'segments': {
+                    str(segment): {
+                        'last_key': None, 'scanned': False, 'done': False, 'part': None,
+                        **dict.fromkeys(COUNTERS, 0),
+                    }
+                    for segment in range(self.segments)
+                },
+            }
+        self._checkpoint = checkpoint
+
+        run_totals = dict.fromkeys(COUNTERS, 0)
+        errors = []
+        pending = [int(s) for s, state in checkpoint['segments'].items() if not state['done']]
+        with ThreadPoolExecutor(max_workers=max(len(pending), 1), thread_name_prefix='export-segment') as pool:
+            futures = {segment: pool.submit(self._run_segment, segment, deadline) for segment in pending}
+            for segment, future in futures.items():
+                try:
+                    for name, value in future.result().items():
+                        run_totals[name] += value
+                except Exception as e:
+                    logger.error(f"Export segment {segment} failed: {str(e)}")
+                    errors.append(e)
+
+        totals = {name: sum(s[name] for s in checkpoint['segments'].values()) for name in COUNTERS}
+        complete = all(s['done'] for s in checkpoint['segments'].values())
+        stats = {
+            'target': self.target.describe(),
+            'params': self.params,
+            'complete': complete,
+            **totals,
+            'run': self._throughput(run_totals, time.perf_counter() - started),
+        }
+        if complete:
+            self.target.write_json(MANIFEST_FILE, {
+                'format': EXPORT_FORMAT,
+                'version': EXPORT_FORMAT_VERSION,
+                'params': self.params,
+                'started_at': checkpoint['started_at'],
+                'completed_at': datetime.now(timezone.utc).isoformat(),
+                'parts': [part_name(segment) for segment in range(self.segments)],
+                **totals,
+            })
+
+        logger.info(f"Export {'finished' if complete else 'stopped'}: {json_dumps(stats)}")
+        if errors:
+            raise RuntimeError(f"{len(errors)} export segment(s) failed; resume to retry: {errors[0]}")
+        return stats
+
+    @staticmethod
+    def _throughput(totals: Dict[str, int], seconds: float) -> Dict[str, Any]:
+        per_second = (lambda value: round(value / seconds, 2)) if seconds > 0 else (lambda value: None)
+        return {
+            **{name: totals.get(name, 0) for name in COUNTERS},
+            'seconds': round(seconds, 3),
+            'conversations_per_second': per_second(totals.get('conversations', 0)),
+            'messages_per_second': per_second(totals.get('messages', 0)),
+            'mb_per_second': per_second(totals.get('bytes', 0) / MB),
+            'compressed_mb_per_second': per_second(totals.get('compressed_bytes', 0) / MB),
+        }
+
+    def _run_segment(self, segment: int, deadline: Optional[float]) -> Dict[str, int]:
+        """Export one segment from its checkpoint; returns the counts committed by this run"""
+        state = self._checkpoint['segments'][str(segment)]
+        part = self.target.open_part(segment, state['part'])
+        threshold = max(self.part_bytes, part.min_member_bytes)
+        writer = MemberWriter(self.level)
+        committed = dict.fromkeys(COUNTERS, 0)
+        last_key = state['last_key']
+
+        def save(**changes):
+            with self._lock:
+                state.update(changes)
+                self.target.write_json(CHECKPOINT_FILE, self._checkpoint)
+
+        def commit(key):
+            member, counts = writer.finish()
+            part_state = part.commit(member)
+            with self._lock:
+                for name in COUNTERS:
+                    state[name] += counts[name]
+                    committed[name] += counts[name]
+            save(last_key=key, part=part_state, scanned=key is None)
+
+        while not state.get('scanned'):
+            if deadline is not None and time.monotonic() >= deadline:
+                # Output since the last commit is redone on resume unless it can be committed now
+                if not writer.empty and writer.size >= part.min_member_bytes:
+                    commit(last_key)
+                return committed
+
+            response = self._read_page(segment, last_key)
+            for line, messages in self._export_page(response.get('Items', [])):
+                writer.write(line, messages)
+            last_key = response.get('LastEvaluatedKey')
+
+            if last_key is None:
+                if writer.empty:
+                    save(last_key=None, scanned=True)
+                else:
+                    commit(None)
+            elif writer.size >= threshold:
+                commit(last_key)
+
+        # Only marked done once the part is complete (e.g. the multipart upload is assembled)
+        part.close()
+        save(done=True)
+        return committed
+
+    def _read_page(self, segment: int, last_key: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Read one page of conversation headers for a segment"""
+        kwargs = {'Limit': self.page_size}
+        if last_key:
+            kwargs['ExclusiveStartKey'] = last_key
+        if self.user_id:
+            return self.manager.table.query(
+                IndexName=USER_ID_INDEX_NAME,
+                KeyConditionExpression='user_id = :uid',
+                ExpressionAttributeValues={':uid': self.user_id},
+                **kwargs
+            )
+        return self.manager.table.scan(Segment=segment, TotalSegments=self.segments, **kwargs)
+
+    def _export_page(self, headers: List[Dict[str, Any]]) -> List[tuple]:
+        """Read and decrypt the conversations of one page; returns (NDJSON line, message count) pairs"""
+        if not headers:
+            return []
+        pool = get_executor('export', self.fetch_workers)
+        conversations = list(pool.map(self._read_conversation, headers))
+        self.manager.decrypt_messages([m for c in conversations for m in c['messages']])
+        return [(json_dumps(c), len(c['messages'])) for c in conversations]
+
+    def _read_conversation(self, header: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a conversation record with its (still lazily encrypted) messages"""
+        if self.user_id and header.get('message_count') is None:
+            # The user index does not project the legacy message list; read the whole item
+            header = self.manager.table.get_item(Key={'conversation_id': header['conversation_id']}).get('Item', header)
+
+        record = {field: header[field] for field in HEADER_FIELDS if header.get(field) is not None}
+        if 'messages' in header:
+            record['messages'] = self._legacy_messages(header)
+        else:
+            record['messages'] = self.manager.get_messages(header['conversation_id'])
+        record['message_count'] = len(record['messages'])
+        return record
+
+    def _legacy_messages(self, header: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Messages of a conversation still in the single-item layout (read without migrating it)"""
+        messages = [
+            {
+                'seq': seq,
+                'role': message['role'],
+                'content': message['content'],
+                'timestamp': message.get('timestamp', header.get('created_at')),
+            }
+            for seq, message in enumerate(header['messages'], start=1)
+        ]
+        if self.manager.encryption_manager:
+            plaintexts = self.manager.encryption_manager.decrypt_many([m['content'] for m in messages])
+            for message, plaintext in zip(messages, plaintexts):
+                message['content'] = plaintext
+        return messages
@@ -0,0 +1,110 @@
+"""
+Entry points for conversation export
+
+lambda_handler exports to S3 and checkpoints shortly before the function
+times out; invoke it again with the same event until 'complete' is true.
+Running the module exports to a local directory or S3 prefix:
+
+    python -m src.export.handler --output ./export
+    python -m src.export.handler --bucket pai-exports --prefix users/u1/ --user-id u1
+    python -m src.export.handler --output ./export --resume
+"""
+import os
+import json
+import time
+import logging
+import argparse
+from typing import Any, Dict, Optional
+from src.chatbot.conversation_manager import ConversationManager
+from src.export.exporter import ConversationExporter
+from src.export.targets import LocalExportTarget, S3ExportTarget
+from src.shared.encryption import EncryptionManager
+from src.shared.constants import (
+    CONVERSATIONS_TABLE_NAME,
+    MESSAGES_TABLE_NAME,
+    ENCRYPTION_MODE,
+    EXPORT_SEGMENTS,
+    EXPORT_PAGE_SIZE,
+    EXPORT_FETCH_WORKERS,
+    EXPORT_DEADLINE_MARGIN_SECONDS,
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Environment variables
+CONVERSATIONS_TABLE = os.environ.get('CONVERSATIONS_TABLE', CONVERSATIONS_TABLE_NAME)
+MESSAGES_TABLE = os.environ.get('MESSAGES_TABLE', MESSAGES_TABLE_NAME)
+KMS_KEY_ID = os.environ.get('KMS_KEY_ID')
+ENCRYPTION_MODE = os.environ.get('ENCRYPTION_MODE', ENCRYPTION_MODE)
+EXPORT_BUCKET = os.environ.get('EXPORT_BUCKET')
+
+
+def make_manager(conversations_table: str, messages_table: str, kms_key_id: Optional[str]) -> ConversationManager:
+    """Conversation manager that can decrypt what the chatbot stored"""
+    encryption_manager = EncryptionManager(kms_key_id, mode=ENCRYPTION_MODE) if kms_key_id else None
+    return ConversationManager(conversations_table, encryption_manager, messages_table)
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Export conversations to S3, resuming any unfinished export at the same prefix
+
+    Args:
+        event: 'prefix' (required), optional 'bucket' (defaults to EXPORT_BUCKET),
+               'user_id' and 'segments'
+        context: Lambda context
+
+    Returns:
+        Export statistics; 'complete' is false if the run stopped at its deadline
+    """
+    try:
+        deadline = None
+        if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+            deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - EXPORT_DEADLINE_MARGIN_SECONDS
+
+        exporter = ConversationExporter(
+            S3ExportTarget(event.get('bucket') or EXPORT_BUCKET, event['prefix']),
+            make_manager(CONVERSATIONS_TABLE, MESSAGES_TABLE, KMS_KEY_ID),
+            user_id=event.get('user_id'),
+            segments=int(event.get('segments', EXPORT_SEGMENTS))
+        )
+        return exporter.run(resume=True, deadline=deadline)
+    except Exception as e:
+        logger.error(f"Export failed: {str(e)}")
+        raise
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description='Export conversations to gzip-compressed NDJSON')
+    destination = parser.add_mutually_exclusive_group(required=True)
+    destination.add_argument('--output', metavar='DIR', help='Export into a local directory')
+    destination.add_argument('--bucket', help='Export into an S3 bucket')
+    parser.add_argument('--prefix', default='', help='S3 key prefix of the export')
+    parser.add_argument('--user-id', help="Export only this user's conversations")
+    parser.add_argument('--segments', type=int, default=EXPORT_SEGMENTS, help='Parallel Scan segments')
+    parser.add_argument('--page-size', type=int, default=EXPORT_PAGE_SIZE)
+    parser.add_argument('--workers', type=int, default=EXPORT_FETCH_WORKERS,
+                        help='Conversations read concurrently per page')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted export')
+    parser.add_argument('--conversations-table', default=CONVERSATIONS_TABLE)
+    parser.add_argument('--messages-table', default=MESSAGES_TABLE)
+    parser.add_argument('--kms-key-id', default=KMS_KEY_ID, help='Key that encrypted message content')
+    args = parser.parse_args(argv)
+
+    target = LocalExportTarget(args.output) if args.output else S3ExportTarget(args.bucket, args.prefix)
+    stats = ConversationExporter(
+        target,
+        make_manager(args.conversations_table, args.messages_table, args.kms_key_id),
+        user_id=args.user_id,
+        segments=args.segments,
+        page_size=args.page_size,
+        fetch_workers=args.workers
+    ).run(resume=args.resume)
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,231 @@
+"""
+Destinations for conversation exports
+
+An export is a directory (or S3 prefix) holding one gzip part per scan
+segment plus small JSON files for the checkpoint and the manifest:
+
+    part-00000.ndjson.gz   NDJSON written by segment 0
+    ...
+    _checkpoint.json       resume state, rewritten as parts grow
+    manifest.json          written when every segment has finished
+
+Parts are built from complete gzip members (a multi-member gzip file is
+still one valid gzip stream). A member is only committed at a scan page
+boundary, so the checkpoint can record the page's LastEvaluatedKey
+together with what is durably stored: a byte offset for local files, the
+upload id and uploaded parts for S3 multipart uploads. A resumed segment
+discards anything written after its checkpoint and continues from there.
+"""
+import os
+import json
+import gzip
+import logging
+from typing import Any, Dict, List, Optional
+from src.shared.aws_clients import get_client
+
+logger = logging.getLogger()
+
+CHECKPOINT_FILE = '_checkpoint.json'
+MANIFEST_FILE = 'manifest.json'
+S3_MIN_PART_BYTES = 5 * 1024 * 1024
+
+
+def part_name(segment: int) -> str:
+    """File name of a segment's part"""
+    return f"part-{segment:05d}.ndjson.gz"
+
+
+class ExportPart:
+    """
+    Append-only gzip part written by one segment
+    """
+
+    # Smallest member that may be committed before the segment's last one
+    min_member_bytes = 0
+
+    def commit(self, member: bytes) -> Dict[str, Any]:
+        """
+        Durably append a complete gzip member
+
+        Args:
+            member: Compressed bytes ending with a gzip trailer
+
+        Returns:
+            State to store in the checkpoint; passing it back to the
+            target's open_part resumes after this member
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Finish the part (the segment has written everything); safe to repeat"""
+        raise NotImplementedError
+
+
+class ExportTarget:
+    """
+    Directory-like destination of an export
+    """
+
+    def open_part(self, segment: int, state: Optional[Dict[str, Any]] = None) -> ExportPart:
+        """
+        Open a segment's part, resuming from checkpointed state if given
+
+        Args:
+            segment: Segment number
+            state: Value last returned by the part's commit
+
+        Returns:
+            ExportPart
+        """
+        raise NotImplementedError
+
+    def write_json(self, name: str, value: Dict[str, Any]) -> None:
+        """Replace a small JSON file atomically"""
+        raise NotImplementedError
+
+    def read_json(self, name: str) -> Optional[Dict[str, Any]]:
+        """Read a small JSON file, or None if it does not exist"""
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        """Location for logs and reports"""
+        raise NotImplementedError
+
+
+class LocalPart(ExportPart):
+    def __init__(self, path: str, state: Optional[Dict[str, Any]]):
+        self.path = path
+        self.offset = (state or {}).get('offset', 0)
+        self.file = open(path, 'r+b' if self.offset and os.path.exists(path) else 'wb')
+        # Drop anything written after the last checkpoint
+        self.file.truncate(self.offset)
+        self.file.seek(self.offset)
+
+    def commit(self, member: bytes) -> Dict[str, Any]:
+        self.file.write(member)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.offset += len(member)
+        return {'offset': self.offset}
+
+    def close(self) -> None:
+        if self.offset == 0:
+            # An empty segment still leaves a readable (empty) gzip file
+            self.commit(gzip.compress(b''))
+        self.file.close()
+
+
+class LocalExportTarget(ExportTarget):
+    """Export into a local directory"""
+
+    def __init__(self, directory: str):
+        """
+        Initialize target
+
+        Args:
+            directory: Output directory (created if missing)
+        """
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def open_part(self, segment: int, state: Optional[Dict[str, Any]] = None) -> ExportPart:
+        return LocalPart(os.path.join(self.directory, part_name(segment)), state)
+
+    def write_json(self, name: str, value: Dict[str, Any]) -> None:
+        path = os.path.join(self.directory, name)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(value, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def read_json(self, name: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def describe(self) -> str:
+        return self.directory
+
+
+class S3Part(ExportPart):
+    min_member_bytes = S3_MIN_PART_BYTES
+
+    def __init__(self, bucket: str, key: str, state: Optional[Dict[str, Any]]):
+        self.bucket = bucket
+        self.key = key
+        self.upload_id = (state or {}).get('upload_id')
+        self.parts: List[Dict[str, Any]] = list((state or {}).get('parts', []))
+
+    def commit(self, member: bytes) -> Dict[str, Any]:
+        s3 = get_client('s3')
+        if self.upload_id is None:
+            self.upload_id = s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType='application/gzip'
+            )['UploadId']
+        # Re-uploading a part number after a resume replaces whatever was sent for it
+        number = len(self.parts) + 1
+        response = s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                  PartNumber=number, Body=member)
+        self.parts.append({'PartNumber': number, 'ETag': response['ETag']})
+        return {'upload_id': self.upload_id, 'parts': self.parts}
+
+    def close(self) -> None:
+        s3 = get_client('s3')
+        if self.upload_id is None:
+            s3.put_object(Bucket=self.bucket, Key=self.key, Body=gzip.compress(b''), ContentType='application/gzip')
+            return
+        from botocore.exceptions import ClientError
+
+        try:
+            s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                         MultipartUpload={'Parts': self.parts})
+        except ClientError as e:
+            # Completed before an interruption: the upload is gone and the object exists
+            if e.response['Error']['Code'] != 'NoSuchUpload':
+                raise
+            s3.head_object(Bucket=self.bucket, Key=self.key)
+
+
+class S3ExportTarget(ExportTarget):
+    """
+    Export into an S3 prefix with one multipart upload per segment
+
+    Every multipart part except a segment's last must be at least 5 MiB,
+    so parts are committed in members of at least that size.
+    """
+
+    def __init__(self, bucket: str, prefix: str = ''):
+        """
+        Initialize target
+
+        Args:
+            bucket: S3 bucket name
+            prefix: Key prefix of the export (e.g. 'exports/2024-06-01/')
+        """
+        self.bucket = bucket
+        self.prefix = prefix if not prefix or prefix.endswith('/') else prefix + '/'
+
+    def open_part(self, segment: int, state: Optional[Dict[str, Any]] = None) -> ExportPart:
+        return S3Part(self.bucket, self.prefix + part_name(segment), state)
+
+    def write_json(self, name: str, value: Dict[str, Any]) -> None:
+        get_client('s3').put_object(Bucket=self.bucket, Key=self.prefix + name,
+                                    Body=json.dumps(value, indent=2).encode('utf-8'),
+                                    ContentType='application/json')
+
+    def read_json(self, name: str) -> Optional[Dict[str, Any]]:
+        from botocore.exceptions import ClientError
+
+        try:
+            body = get_client('s3').get_object(Bucket=self.bucket, Key=self.prefix + name)['Body']
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return json.loads(body.read())
+
+    def describe(self) -> str:
+        return f"s3://{self.bucket}/{self.prefix}"
@@ -0,0 +1 @@
+# Document ingestion package
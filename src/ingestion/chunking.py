@@ -0,0 +1,228 @@
+"""
+Streaming text extraction and overlapping chunking
+
+Documents are decoded incrementally from fixed-size reads and fed to a
+TextChunker, which emits chunks as soon as enough text has arrived, so
+memory stays bounded by the chunk size rather than the document size.
+"""
+import codecs
+import hashlib
+from html.parser import HTMLParser
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional
+from src.shared.constants import INGEST_CHUNK_SIZE, INGEST_CHUNK_OVERLAP, INGEST_READ_SIZE
+
+TEXT_EXTENSIONS = {'.txt', '.md', '.markdown', '.rst', '.csv', '.tsv', '.json', '.jsonl', '.yaml', '.yml', '.xml', '.log'}
+HTML_EXTENSIONS = {'.html', '.htm'}
+
+# Preferred break points, best first; searched for in the second half of a chunk
+BREAK_SEPARATORS = ('\n\n', '\n', '. ', ' ')
+
+
+class Chunk(NamedTuple):
+    """A chunk of document text"""
+    ordinal: int
+    start: int  # character offset in the extracted text
+    text: str
+
+
+def chunk_hash(text: str) -> str:
+    """SHA-256 of a chunk's text, used to reuse embeddings across runs"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def is_supported(key: str) -> bool:
+    """Whether text can be extracted from an object, judged by its extension"""
+    extension = _extension(key)
+    return extension in TEXT_EXTENSIONS or extension in HTML_EXTENSIONS
+
+
+def _extension(key: str) -> str:
+    name = key.rsplit('/', 1)[-1]
+    return '.' + name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+
+
+class TextChunker:
+    """
+    Incremental splitter producing overlapping chunks
+
+    Each chunk is at most chunk_size characters and ends at the best break
+    point in its second half; the next chunk starts overlap characters
+    before that end.
+    """
+
+    def __init__(self, chunk_size: int = INGEST_CHUNK_SIZE, overlap: int = INGEST_CHUNK_OVERLAP):
+        """
+        Initialize chunker
+
+        Args:
+            chunk_size: Maximum chunk length in characters
+            overlap: Characters repeated at the start of the next chunk
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if overlap < 0 or overlap * 2 >= chunk_size:
+            raise ValueError("overlap must be non-negative and less than half of chunk_size")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self._buffer = ''
+        self._offset = 0  # text offset of the buffer start
+        self._ordinal = 0
+
+    def feed(self, text: str) -> List[Chunk]:
+        """
+        Add text and return the chunks that are now complete
+
+        Args:
+            text: Next piece of extracted text
+
+        Returns:
+            Completed chunks
+        """
+        self._buffer += text
+        chunks = []
+        while len(self._buffer) > self.chunk_size:
+            chunks.append(self._emit(self._break_point()))
+        return chunks
+
+    def finish(self) -> List[Chunk]:
+        """
+        Flush the remaining text
+
+        Returns:
+            The final chunk, if any non-blank text remains
+        """
+        chunks = []
+        if self._buffer.strip() and (self._ordinal == 0 or len(self._buffer) > self.overlap):
+            chunks.append(self._emit(len(self._buffer)))
+        self._buffer = ''
+        return chunks
+
+    def _break_point(self) -> int:
+        window = self._buffer[:self.chunk_size]
+        for separator in BREAK_SEPARATORS:
+            index = window.rfind(separator, self.chunk_size // 2)
+            if index != -1:
+                return index + len(separator)
+        return self.chunk_size
+
+    def _emit(self, end: int) -> Chunk:
+        chunk = Chunk(self._ordinal, self._offset, self._buffer[:end])
+        self._ordinal += 1
+        # end >= chunk_size / 2 > overlap, so every chunk advances
+        advance = end - self.overlap if end < len(self._buffer) else end
+        self._buffer = self._buffer[advance:]
+        self._offset += advance
+        return chunk
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """Collects visible text from HTML fed in pieces, skipping scripts and styles"""
+
+    BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section', 'article', 'pre'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self._skip += 1
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style'):
+            self._skip = max(0, self._skip - 1)
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._parts.append(data)
+
+    def take(self) -> str:
+        text = ''.join(self._parts)
+        self._parts = []
+        return text
+
+
+def iter_text(stream: BinaryIO, key: str, read_size: int = INGEST_READ_SIZE) -> Iterator[str]:
+    """
+    Extract text from an object stream piece by piece
+
+    Args:
+        stream: Binary stream supporting read(size)
+        key: Object key, used to pick the extractor
+        read_size: Bytes per read
+
+    Returns:
+        Iterator of text pieces
+    """
+    if not is_supported(key):
+        raise ValueError(f"Unsupported document type: {key}")
+
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    html = _HTMLTextExtractor() if _extension(key) in HTML_EXTENSIONS else None
+
+    while True:
+        data = stream.read(read_size)
+        text = decoder.decode(data or b'', final=not data)
+        if html is not None:
+            html.feed(text)
+            text = html.take()
+        if text:
+            yield text
+        if not data:
+            break
+
+    if html is not None:
+        html.close()
+        text = html.take()
+        if text:
+            yield text
+
+
+def iter_chunks(
+    stream: BinaryIO,
+    key: str,
+    chunk_size: int = INGEST_CHUNK_SIZE,
+    overlap: int = INGEST_CHUNK_OVERLAP,
+    read_size: int = INGEST_READ_SIZE,
+    on_bytes: Optional[callable] = None
+) -> Iterator[Chunk]:
+    """
+    Stream an object into overlapping chunks
+
+    Args:
+        stream: Binary stream supporting read(size)
+        key: Object key, used to pick the extractor
+        chunk_size: Maximum chunk length in characters
+        overlap: Overlap between consecutive chunks
+        read_size: Bytes per read
+        on_bytes: Optional callback receiving every raw block read (e.g. to hash the object)
+
+    Returns:
+        Iterator of chunks
+    """
+    if on_bytes is not None:
+        stream = _TeeReader(stream, on_bytes)
+
+    chunker = TextChunker(chunk_size, overlap)
+    for text in iter_text(stream, key, read_size):
+        yield from chunker.feed(text)
+    yield from chunker.finish()
+
+
+class _TeeReader:
+    """Passes every block read from a stream to a callback"""
+
+    def __init__(self, stream: BinaryIO, callback):
+        self._stream = stream
+        self._callback = callback
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        if data:
+            self._callback(data)
+        return data
@@ -0,0 +1,87 @@
+"""
+Batch text embedding for ingestion
+
+BedrockEmbedder embeds chunks with BedrockClient.embed, which batches
+requests and skips texts already in the embedding cache. FakeEmbedder
+returns deterministic vectors so ingestion can run offline.
+"""
+import hashlib
+from typing import List, Optional
+import numpy as np
+from src.chatbot.bedrock_client import BedrockClient, embedding_dimensions
+from src.chatbot.embedding_cache import EmbeddingCache
+from src.shared.constants import EMBEDDING_MODEL_ID, EMBEDDING_DIMENSIONS
+
+
+class BedrockEmbedder:
+    """
+    Embeds document chunks with a Bedrock embedding model through BedrockClient.embed
+    """
+
+    def __init__(
+        self,
+        model_id: str = EMBEDDING_MODEL_ID,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+        embedding_cache: Optional[EmbeddingCache] = None
+    ):
+        """
+        Initialize embedder
+
+        Args:
+            model_id: Bedrock embedding model identifier (Titan or Cohere)
+            dimensions: Output dimensions (Titan v2 supports 256, 512 or 1024; others are fixed)
+            embedding_cache: Optional cache, e.g. with the shared DynamoDB tier
+        """
+        self.model_id = model_id
+        self.dimensions = embedding_dimensions(model_id, dimensions)
+        self.client = BedrockClient(embedding_model_id=model_id, embedding_cache=embedding_cache)
+
+    def embed(self, texts: List[str]):
+        """
+        Embed a batch of texts
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 NumPy array with one row per text, in input order
+        """
+        return self.client.embed(texts, dimensions=self.dimensions)
+
+
+class FakeEmbedder:
+    """
+    Offline embedder producing deterministic unit vectors from text hashes
+    """
+
+    model_id = 'fake-embedder'
+
+    def __init__(self, dimensions: int = 16):
+        """
+        Initialize embedder
+
+        Args:
+            dimensions: Vector dimensions
+        """
+        self.dimensions = dimensions
+        self.calls = 0
+        self.texts_embedded = 0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts like BedrockEmbedder; calls and texts_embedded count the work done"""
+        self.calls += 1
+        self.texts_embedded += len(texts)
+        vectors = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vectors[row] = self._vector(text)
+        return vectors
+
+    def _vector(self, text: str) -> np.ndarray:
+        blocks = []
+        block = hashlib.sha256(text.encode('utf-8')).digest()
+        while len(blocks) * len(block) < self.dimensions:
+            block = hashlib.sha256(block).digest()
+            blocks.append(block)
+        values = np.frombuffer(b''.join(blocks), dtype=np.uint8)[:self.dimensions]
+        vector = (values.astype(np.float32) - 127.5) / 127.5
+        return vector / (np.linalg.norm(vector) or 1.0)
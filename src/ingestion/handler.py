@@ -0,0 +1,93 @@
+"""
+Entry points for document ingestion
+
+lambda_handler indexes the documents bucket (e.g. on a schedule or after
+uploads). Running the module indexes a local directory instead:
+
+    python -m src.ingestion.handler --local ./docs --fake-embedder
+"""
+import os
+import json
+import logging
+import argparse
+from typing import Any, Dict, Optional
+from src.chatbot.embedding_cache import EmbeddingCache
+from src.ingestion.embeddings import BedrockEmbedder, FakeEmbedder
+from src.ingestion.pipeline import DocumentIngestor
+from src.ingestion.storage import LocalObjectStore, S3ObjectStore
+from src.shared.constants import (
+    INDEX_PREFIX,
+    INGEST_CHUNK_SIZE,
+    INGEST_CHUNK_OVERLAP,
+    EMBEDDING_MODEL_ID,
+    EMBEDDING_DIMENSIONS,
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Environment variables
+DOCUMENTS_BUCKET = os.environ.get('DOCUMENTS_BUCKET')
+DOCUMENTS_PREFIX = os.environ.get('DOCUMENTS_PREFIX', '')
+EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL_ID', EMBEDDING_MODEL_ID)
+EMBEDDING_CACHE_TABLE = os.environ.get('EMBEDDING_CACHE_TABLE')
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Index the documents bucket
+
+    Args:
+        event: Invocation event; 'prefix' optionally overrides DOCUMENTS_PREFIX
+        context: Lambda context
+
+    Returns:
+        Ingestion statistics
+    """
+    try:
+        ingestor = DocumentIngestor(
+            S3ObjectStore(DOCUMENTS_BUCKET),
+            BedrockEmbedder(EMBEDDING_MODEL, embedding_cache=EmbeddingCache(table_name=EMBEDDING_CACHE_TABLE)),
+            source_prefix=(event or {}).get('prefix', DOCUMENTS_PREFIX)
+        )
+        return ingestor.run()
+    except Exception as e:
+        logger.error(f"Ingestion failed: {str(e)}")
+        raise
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description='Build the document vector index')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--local', metavar='DIR', help='Index a local directory standing in for the bucket')
+    source.add_argument('--bucket', help='Index an S3 bucket')
+    parser.add_argument('--prefix', default='', help='Only index keys under this prefix')
+    parser.add_argument('--index-prefix', default=INDEX_PREFIX)
+    parser.add_argument('--chunk-size', type=int, default=INGEST_CHUNK_SIZE)
+    parser.add_argument('--overlap', type=int, default=INGEST_CHUNK_OVERLAP)
+    parser.add_argument('--model-id', default=EMBEDDING_MODEL)
+    parser.add_argument('--dimensions', type=int, default=EMBEDDING_DIMENSIONS)
+    parser.add_argument('--fake-embedder', action='store_true', help='Use deterministic offline embeddings')
+    parser.add_argument('--cache-table', help='DynamoDB table shared as the embedding cache')
+    args = parser.parse_args(argv)
+
+    store = LocalObjectStore(args.local) if args.local else S3ObjectStore(args.bucket)
+    if args.fake_embedder:
+        embedder = FakeEmbedder(args.dimensions)
+    else:
+        embedder = BedrockEmbedder(args.model_id, args.dimensions, EmbeddingCache(table_name=args.cache_table))
+    stats = DocumentIngestor(
+        store,
+        embedder,
+        source_prefix=args.prefix,
+        index_prefix=args.index_prefix,
+        chunk_size=args.chunk_size,
+        overlap=args.overlap
+    ).run()
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,490 @@
+"""
+Incremental document ingestion into a versioned vector index
+
+A run lists the source documents, carries forward the rows of documents
+whose ETag is unchanged, and streams every other document through text
+extraction and chunking. Chunks whose SHA-256 already appears in the
+previous index reuse its vector; only new chunks are sent to the embedder.
+
+Each run that changes anything publishes a new version:
+
+    index/v000042/manifest.json   format, model, dimensions, documents, stats
+    index/v000042/vectors.f32     row-major little-endian float32, count x dimensions
+    index/v000042/chunks.jsonl    one {id, doc, ord, hash, start, text} line per row
+    index/v000042/vectors.pvi     quantized, memory-mappable search index (src.shared.vector_index)
+    index/LATEST                  name of the newest version, written last
+
+Readers follow LATEST, so a partially uploaded version is never visible.
+A run that finds only new ETags on unchanged content (a re-upload or copy)
+publishes nothing; it rewrites the current manifest with the new ETags so
+later runs skip those documents again.
+Previous versions are left in place for rollback; expire them with an S3
+lifecycle rule.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import numpy as np
+from src.ingestion.chunking import Chunk, chunk_hash, is_supported, iter_chunks
+from src.ingestion.storage import ObjectStore
+from src.shared.vector_index import build_index
+from src.shared.constants import (
+    INDEX_PREFIX,
+    INGEST_CHUNK_SIZE,
+    INGEST_CHUNK_OVERLAP,
+    INGEST_READ_SIZE,
+    EMBED_BATCH_SIZE,
+    VECTOR_INDEX_FILE,
+    VECTOR_INDEX_DTYPE,
+)
+
+logger = logging.getLogger()
+
+INDEX_FORMAT = 'pai-vector-index'
+INDEX_FORMAT_VERSION = 1
+LATEST_FILE = 'LATEST'
+MANIFEST_FILE = 'manifest.json'
+VECTORS_FILE = 'vectors.f32'
+CHUNKS_FILE = 'chunks.jsonl'
+
+# Rows copied per read when carrying an unchanged document forward
+COPY_ROWS = 1024
+
+
+def encode_vector(vector: Sequence[float], dimensions: int) -> bytes:
+    """
+    Encode a vector as little-endian float32
+
+    Args:
+        vector: Embedding values (list or NumPy row)
+        dimensions: Expected length
+
+    Returns:
+        Packed bytes
+    """
+    if len(vector) != dimensions:
+        raise ValueError(f"Embedding has {len(vector)} dimensions, expected {dimensions}")
+    return np.asarray(vector, dtype='<f4').tobytes()
+
+
+def version_name(number: int) -> str:
+    """Index version directory name, e.g. 'v000042'"""
+    return f"v{number:06d}"
+
+
+class PreviousIndex:
+    """
+    The last published index, spooled to local files for row lookups
+    """
+
+    def __init__(self, version: int, manifest: Optional[Dict[str, Any]], workdir: str):
+        """
+        Initialize previous index
+
+        Args:
+            version: Version number (0 when nothing was published)
+            manifest: Manifest of a compatible index, or None to rebuild from scratch
+            workdir: Directory for the spooled files
+        """
+        self.version = version
+        self.manifest = manifest
+        self.documents: Dict[str, Dict[str, Any]] = manifest['documents'] if manifest else {}
+        self.rows_by_hash: Dict[str, int] = {}
+        self._line_offsets: List[int] = []
+        self._row_bytes = manifest['dimensions'] * 4 if manifest else 0
+        self._vectors_path = os.path.join(workdir, 'previous-' + VECTORS_FILE)
+        self._chunks_path = os.path.join(workdir, 'previous-' + CHUNKS_FILE)
+        self._vectors = None
+        self._chunks = None
+
+    @classmethod
+    def load(cls, store: ObjectStore, index_prefix: str, model_id: str, dimensions: int, workdir: str) -> 'PreviousIndex':
+        """
+        Load the latest index if it was built with the same model and dimensions
+
+        Args:
+            store: Object store holding the index
+            index_prefix: Index key prefix
+            model_id: Embedding model of this run
+            dimensions: Embedding dimensions of this run
+            workdir: Directory for the spooled files
+
+        Returns:
+            PreviousIndex; empty when there is no compatible index
+        """
+        latest_key = index_prefix + LATEST_FILE
+        if not store.exists(latest_key):
+            return cls(0, None, workdir)
+
+        name = store.get_bytes(latest_key).decode('utf-8').strip()
+        version = int(name.lstrip('v'))
+        prefix = f"{index_prefix}{name}/"
+        manifest = json.loads(store.get_bytes(prefix + MANIFEST_FILE))
+
+        compatible = (
+            manifest.get('format_version') == INDEX_FORMAT_VERSION
+            and manifest.get('model_id') == model_id
+            and manifest.get('dimensions') == dimensions
+        )
+        if not compatible:
+            logger.info(f"Index {name} was built with {manifest.get('model_id')}/{manifest.get('dimensions')}; rebuilding")
+            return cls(version, None, workdir)
+
+        previous = cls(version, manifest, workdir)
+        previous._spool(store, prefix)
+        return previous
+
+    def _spool(self, store: ObjectStore, prefix: str) -> None:
+        for name, path in ((VECTORS_FILE, self._vectors_path), (CHUNKS_FILE, self._chunks_path)):
+            stream = store.open(prefix + name)
+            try:
+                with open(path, 'wb') as f:
+                    shutil.copyfileobj(stream, f, INGEST_READ_SIZE)
+            finally:
+                stream.close()
+
+        offset = 0
+        with open(self._chunks_path, 'rb') as f:
+            for row, line in enumerate(f):
+                self._line_offsets.append(offset)
+                offset += len(line)
+                self.rows_by_hash.setdefault(json.loads(line)['hash'], row)
+
+        self._vectors = open(self._vectors_path, 'rb')
+        self._chunks = open(self._chunks_path, 'rb')
+
+    def vector_bytes(self, first_row: int, count: int = 1) -> bytes:
+        """Packed vectors of consecutive rows"""
+        self._vectors.seek(first_row * self._row_bytes)
+        return self._vectors.read(count * self._row_bytes)
+
+    def chunk_lines(self, first_row: int, count: int) -> Iterator[bytes]:
+        """Raw chunks.jsonl lines of consecutive rows"""
+        self._chunks.seek(self._line_offsets[first_row])
+        for _ in range(count):
+            yield self._chunks.readline()
+
+    def close(self) -> None:
+        """Close the spooled files"""
+        for f in (self._vectors, self._chunks):
+            if f is not None:
+                f.close()
+
+
+class IndexWriter:
+    """
+    Appends rows to local vectors and chunks files
+    """
+
+    def __init__(self, workdir: str, dimensions: int):
+        """
+        Initialize writer
+
+        Args:
+            workdir: Directory for the output files
+            dimensions: Embedding dimensions
+        """
+        self.dimensions = dimensions
+        self.count = 0
+        self.vectors_path = os.path.join(workdir, VECTORS_FILE)
+        self.chunks_path = os.path.join(workdir, CHUNKS_FILE)
+        self._vectors = open(self.vectors_path, 'wb')
+        self._chunks = open(self.chunks_path, 'wb')
+
+    def add(self, key: str, chunk: Chunk, digest: str, vector: bytes) -> None:
+        """
+        Append one chunk and its packed vector
+
+        Args:
+            key: Document key
+            chunk: Chunk
+            digest: Chunk hash
+            vector: Little-endian float32 vector
+        """
+        record = {
+            'id': f"{key}#{chunk.ordinal}",
+            'doc': key,
+            'ord': chunk.ordinal,
+            'hash': digest,
+            'start': chunk.start,
+            'text': chunk.text,
+        }
+        self._chunks.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+        self._vectors.write(vector)
+        self.count += 1
+
+    def copy_rows(self, previous: PreviousIndex, first_row: int, count: int) -> None:
+        """
+        Append consecutive rows of the previous index unchanged
+
+        Args:
+            previous: Previous index
+            first_row: First row to copy
+            count: Number of rows
+        """
+        for start in range(first_row, first_row + count, COPY_ROWS):
+            rows = min(COPY_ROWS, first_row + count - start)
+            self._vectors.write(previous.vector_bytes(start, rows))
+            for line in previous.chunk_lines(start, rows):
+                self._chunks.write(line)
+        self.count += count
+
+    def close(self) -> None:
+        """Flush and close the output files"""
+        self._vectors.close()
+        self._chunks.close()
+
+
+class DocumentIngestor:
+    """
+    Builds and publishes the vector index for a document store
+    """
+
+    def __init__(
+        self,
+        store: ObjectStore,
+        embedder: Any,
+        source_prefix: str = '',
+        index_prefix: str = INDEX_PREFIX,
+        chunk_size: int = INGEST_CHUNK_SIZE,
+        overlap: int = INGEST_CHUNK_OVERLAP,
+        batch_size: int = EMBED_BATCH_SIZE
+    ):
+        """
+        Initialize ingestor
+
+        Args:
+            store: Object store holding the documents and the index
+            embedder: Object with model_id, dimensions and embed(texts)
+            source_prefix: Key prefix of the documents to index
+            index_prefix: Key prefix of the index artifacts (never indexed itself)
+            chunk_size: Maximum chunk length in characters
+            overlap: Overlap between consecutive chunks
+            batch_size: Chunks per embedding call
+        """
+        self.store = store
+        self.embedder = embedder
+        self.source_prefix = source_prefix
+        self.index_prefix = index_prefix
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.batch_size = batch_size
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Ingest changed documents and publish a new index version if anything changed
+
+        Returns:
+            Run statistics, including the published version (or the current one if unchanged)
+        """
+        started = time.perf_counter()
+        stats = {
+            'documents_added': 0,
+            'documents_changed': 0,
+            'documents_unchanged': 0,
+            'documents_deleted': 0,
+            'documents_skipped': 0,
+            'documents_retagged': 0,
+            'chunks_embedded': 0,
+            'chunks_reused': 0,
+            'bytes_read': 0,
+        }
+
+        with tempfile.TemporaryDirectory(prefix='pai-ingest-') as workdir:
+            previous = PreviousIndex.load(
+                self.store, self.index_prefix, self.embedder.model_id, self.embedder.dimensions, workdir
+            )
+            writer = IndexWriter(workdir, self.embedder.dimensions)
+            try:
+                documents = self._build(previous, writer, stats)
+            finally:
+                writer.close()
+                previous.close()
+
+            stats['documents_deleted'] = len(set(previous.documents) - set(documents))
+            stats['full_rebuild'] = previous.manifest is None and previous.version > 0
+            stats['chunks'] = writer.count
+
+            changed = stats['documents_added'] or stats['documents_changed'] or stats['documents_deleted']
+            if previous.manifest is not None and not changed:
+                if stats['documents_retagged']:
+                    self._update_etags(version_name(previous.version), previous.manifest, documents)
+                stats.update(version=version_name(previous.version), published=False)
+            else:
+                name = version_name(previous.version + 1)
+                stats['seconds'] = round(time.perf_counter() - started, 3)
+                self._publish(name, writer, documents, stats)
+                stats.update(version=name, published=True)
+
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        logger.info(f"Ingestion finished: {json.dumps(stats)}")
+        return stats
+
+    def _build(self, previous: PreviousIndex, writer: IndexWriter, stats: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        documents = {}
+        for obj in sorted(self.store.list_objects(self.source_prefix), key=lambda o: o['key']):
+            key = obj['key']
+            if key.startswith(self.index_prefix) or key.endswith('/'):
+                continue
+            if not is_supported(key):
+                stats['documents_skipped'] += 1
+                continue
+
+            old = previous.documents.get(key)
+            if old is not None and old['etag'] == obj['etag']:
+                first_row = writer.count
+                writer.copy_rows(previous, old['first_row'], old['row_count'])
+                documents[key] = {**old, 'first_row': first_row}
+                stats['documents_unchanged'] += 1
+                continue
+
+            entry = self._ingest_document(obj, previous, writer, stats)
+            documents[key] = entry
+            if old is None:
+                stats['documents_added'] += 1
+            elif old['sha256'] == entry['sha256']:
+                # Re-uploaded without changes: only the ETag moved
+                stats['documents_unchanged'] += 1
+                stats['documents_retagged'] += 1
+            else:
+                stats['documents_changed'] += 1
+        return documents
+
+    def _ingest_document(
+        self,
+        obj: Dict[str, Any],
+        previous: PreviousIndex,
+        writer: IndexWriter,
+        stats: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        key = obj['key']
+        digest = hashlib.sha256()
+        first_row = writer.count
+        pending: List[Chunk] = []
+
+        def on_bytes(data: bytes) -> None:
+            digest.update(data)
+            stats['bytes_read'] += len(data)
+
+        stream = self.store.open(key)
+        try:
+            for chunk in iter_chunks(stream, key, self.chunk_size, self.overlap, on_bytes=on_bytes):
+                pending.append(chunk)
+                if len(pending) >= self.batch_size:
+                    self._write_chunks(key, pending, previous, writer, stats)
+                    pending = []
+            self._write_chunks(key, pending, previous, writer, stats)
+        except Exception as e:
+            logger.error(f"Error ingesting {key}: {str(e)}")
+            raise
+        finally:
+            stream.close()
+
+        return {
+            'etag': obj['etag'],
+            'sha256': digest.hexdigest(),
+            'size': obj['size'],
+            'first_row': first_row,
+            'row_count': writer.count - first_row,
+        }
+
+    def _write_chunks(
+        self,
+        key: str,
+        chunks: List[Chunk],
+        previous: PreviousIndex,
+        writer: IndexWriter,
+        stats: Dict[str, Any]
+    ) -> None:
+        if not chunks:
+            return
+
+        hashes = [chunk_hash(chunk.text) for chunk in chunks]
+        missing: Dict[str, str] = {}
+        for chunk, digest in zip(chunks, hashes):
+            if digest not in previous.rows_by_hash:
+                missing.setdefault(digest, chunk.text)
+
+        embedded = {}
+        if missing:
+            vectors = self.embedder.embed(list(missing.values()))
+            embedded = {
+                digest: encode_vector(vector, self.embedder.dimensions)
+                for digest, vector in zip(missing, vectors)
+            }
+            stats['chunks_embedded'] += len(embedded)
+
+        for chunk, digest in zip(chunks, hashes):
+            vector = embedded.get(digest)
+            if vector is None:
+                vector = previous.vector_bytes(previous.rows_by_hash[digest])
+                stats['chunks_reused'] += 1
+            writer.add(key, chunk, digest, vector)
+
+    def _publish(self, name: str, writer: IndexWriter, documents: Dict[str, Dict[str, Any]], stats: Dict[str, Any]) -> None:
+        prefix = f"{self.index_prefix}{name}/"
+        manifest = {
+            'format': INDEX_FORMAT,
+            'format_version': INDEX_FORMAT_VERSION,
+            'version': name,
+            'created_at': int(time.time()),
+            'model_id': self.embedder.model_id,
+            'dimensions': self.embedder.dimensions,
+            'dtype': '<f4',
+            'count': writer.count,
+            'chunk_size': self.chunk_size,
+            'chunk_overlap': self.overlap,
+            'documents': documents,
+            'search_index': {'file': VECTOR_INDEX_FILE, 'dtype': VECTOR_INDEX_DTYPE},
+            'stats': dict(stats),
+        }
+
+        try:
+            search_index_path = self._build_search_index(writer)
+            self.store.put_file(prefix + VECTORS_FILE, writer.vectors_path)
+            self.store.put_file(prefix + VECTOR_INDEX_FILE, search_index_path)
+            self.store.put_file(prefix + CHUNKS_FILE, writer.chunks_path, content_type='application/x-ndjson')
+            self.store.put_bytes(prefix + MANIFEST_FILE, json.dumps(manifest).encode('utf-8'), content_type='application/json')
+            # Switch readers over only once the version is complete
+            self.store.put_bytes(self.index_prefix + LATEST_FILE, name.encode('utf-8'), content_type='text/plain')
+        except Exception as e:
+            logger.error(f"Error publishing index {name}: {str(e)}")
+            raise
+
+    def _update_etags(self, name: str, manifest: Dict[str, Any], documents: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Record new ETags of unchanged documents in the current version's manifest
+
+        Without a new version the ETags would otherwise never be saved, and
+        every run would download those documents again to hash them. Only
+        ETags differ from the stored entries: the rows are identical because
+        no document's content changed.
+
+        Args:
+            name: Current version name
+            manifest: Its manifest
+            documents: Document entries of this run
+        """
+        key = f"{self.index_prefix}{name}/{MANIFEST_FILE}"
+        try:
+            self.store.put_bytes(key, json.dumps({**manifest, 'documents': documents}).encode('utf-8'),
+                                 content_type='application/json')
+        except Exception as e:
+            # Harmless to lose: the next run re-hashes the documents and tries again
+            logger.error(f"Error updating ETags in {key}: {str(e)}")
+
+    def _build_search_index(self, writer: IndexWriter) -> str:
+        path = os.path.join(os.path.dirname(writer.vectors_path), VECTOR_INDEX_FILE)
+        if writer.count:
+            vectors = np.memmap(writer.vectors_path, dtype='<f4', mode='r', shape=(writer.count, writer.dimensions))
+        else:
+            vectors = np.empty((0, writer.dimensions), dtype='<f4')
+        with open(writer.chunks_path, 'rb') as f:
+            ids = [json.loads(line)['id'] for line in f]
+        build_index(path, vectors, ids, VECTOR_INDEX_DTYPE)
+        return path
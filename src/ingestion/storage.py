@@ -0,0 +1,170 @@
+"""
+Object storage for document ingestion
+
+S3ObjectStore reads and writes the documents bucket; LocalObjectStore
+serves a directory with the same interface so ingestion can run locally.
+Objects are read as streams and written from files, so large documents
+and index artifacts never have to fit in memory.
+"""
+import os
+import shutil
+import hashlib
+from typing import Any, BinaryIO, Dict, Iterator
+from src.shared.aws_clients import get_client
+
+
+class ObjectStore:
+    """
+    Minimal object-store interface used by ingestion
+    """
+
+    def list_objects(self, prefix: str = '') -> Iterator[Dict[str, Any]]:
+        """
+        List objects under a prefix
+
+        Args:
+            prefix: Key prefix
+
+        Returns:
+            Iterator of {'key', 'etag', 'size'} dictionaries
+        """
+        raise NotImplementedError
+
+    def open(self, key: str) -> BinaryIO:
+        """
+        Open an object for streaming reads
+
+        Args:
+            key: Object key
+
+        Returns:
+            Binary stream supporting read(size); close it when done
+        """
+        raise NotImplementedError
+
+    def get_bytes(self, key: str) -> bytes:
+        """Read a small object completely"""
+        stream = self.open(key)
+        try:
+            return stream.read()
+        finally:
+            stream.close()
+
+    def put_bytes(self, key: str, data: bytes, content_type: str = 'application/octet-stream') -> None:
+        """
+        Write a small object
+
+        Args:
+            key: Object key
+            data: Object content
+            content_type: MIME type
+        """
+        raise NotImplementedError
+
+    def put_file(self, key: str, path: str, content_type: str = 'application/octet-stream') -> None:
+        """
+        Upload a local file, streaming it
+
+        Args:
+            key: Object key
+            path: Local file path
+            content_type: MIME type
+        """
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        """Whether an object exists"""
+        raise NotImplementedError
+
+
+class S3ObjectStore(ObjectStore):
+    """S3 bucket backed object store"""
+
+    def __init__(self, bucket: str):
+        """
+        Initialize store
+
+        Args:
+            bucket: S3 bucket name
+        """
+        self.bucket = bucket
+
+    def list_objects(self, prefix: str = '') -> Iterator[Dict[str, Any]]:
+        paginator = get_client('s3').get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                yield {'key': obj['Key'], 'etag': obj['ETag'].strip('"'), 'size': obj['Size']}
+
+    def open(self, key: str) -> BinaryIO:
+        return get_client('s3').get_object(Bucket=self.bucket, Key=key)['Body']
+
+    def put_bytes(self, key: str, data: bytes, content_type: str = 'application/octet-stream') -> None:
+        get_client('s3').put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
+
+    def put_file(self, key: str, path: str, content_type: str = 'application/octet-stream') -> None:
+        # upload_fileobj switches to multipart uploads for large files
+        with open(path, 'rb') as f:
+            get_client('s3').upload_fileobj(f, self.bucket, key, ExtraArgs={'ContentType': content_type})
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            get_client('s3').head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+
+class LocalObjectStore(ObjectStore):
+    """
+    Directory backed stand-in for S3; keys are paths relative to the root
+
+    ETags are derived from size and modification time, so unchanged files
+    are skipped without being read, like S3 ETags.
+    """
+
+    def __init__(self, root: str):
+        """
+        Initialize store
+
+        Args:
+            root: Directory holding the objects
+        """
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            raise ValueError(f"Key escapes the store root: {key}")
+        return path
+
+    def list_objects(self, prefix: str = '') -> Iterator[Dict[str, Any]]:
+        for directory, _, files in sorted(os.walk(self.root)):
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                if not key.startswith(prefix):
+                    continue
+                stat = os.stat(path)
+                etag = hashlib.md5(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+                yield {'key': key, 'etag': etag, 'size': stat.st_size}
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), 'rb')
+
+    def put_bytes(self, key: str, data: bytes, content_type: str = 'application/octet-stream') -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def put_file(self, key: str, path: str, content_type: str = 'application/octet-stream') -> None:
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(path, target)
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
@@ -0,0 +1,56 @@
+"""
+Lazy, memoized AWS client factories
+
+boto3 is imported and clients are created on first use rather than at
+module import, so Lambda cold starts only pay for the clients a request
+actually needs. Clients are reused for the life of the container.
+"""
+import threading
+from typing import Any, Dict, Optional
+
+_clients: Dict[tuple, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(service_name: str, region_name: Optional[str] = None, config: Optional[Any] = None) -> Any:
+    """
+    Return a shared low-level boto3 client, creating it on first use
+
+    Args:
+        service_name: AWS service name, e.g. 'dynamodb'
+        region_name: Optional region; defaults to the environment's region
+        config: Optional botocore Config, applied when the client is first created
+
+    Returns:
+        boto3 client
+    """
+    key = (service_name, region_name)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                import boto3
+
+                client = boto3.client(service_name, region_name=region_name, config=config)
+                _clients[key] = client
+    return client
+
+
+def set_client(service_name: str, client: Any, region_name: Optional[str] = None) -> None:
+    """
+    Install a client (or stand-in) to be returned by get_client
+
+    Args:
+        service_name: AWS service name
+        client: Client object
+        region_name: Region the client is registered under, as passed to get_client
+    """
+    with _clients_lock:
+        _clients[(service_name, region_name)] = client
+
+
+def reset_clients() -> None:
+    """Drop all memoized clients (used by tests that swap the AWS backend)"""
+    with _clients_lock:
+        _clients.clear()
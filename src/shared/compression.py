@@ -0,0 +1,130 @@
+"""
+Compression codec for stored message content
+
+Encoded values start with a one-byte header naming the codec, so the codec
+or threshold can change at any time and every value still decodes:
+
+    0x00  raw UTF-8 (below the size threshold, or compression did not help)
+    0x01  zlib
+    0x02  zstd (requires the optional 'zstandard' package)
+
+The codec runs before encryption, because ciphertext does not compress.
+"""
+import zlib
+import logging
+import threading
+from typing import Optional
+from src.shared import metrics
+from src.shared.constants import COMPRESSION_MIN_BYTES, COMPRESSION_LEVELS
+
+logger = logging.getLogger()
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_IDS = {'zlib': CODEC_ZLIB, 'zstd': CODEC_ZSTD}
+
+
+def _zstd():
+    """Import the optional zstandard module"""
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression requires the 'zstandard' package")
+    return zstandard
+
+
+def decode_content(data: bytes) -> str:
+    """
+    Decode a value produced by ContentCodec.encode, whatever codec wrote it
+
+    Args:
+        data: Header byte followed by the encoded body
+
+    Returns:
+        Plaintext string
+    """
+    data = bytes(data)
+    codec, body = data[0], data[1:]
+    if codec == CODEC_RAW:
+        return body.decode('utf-8')
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(body).decode('utf-8')
+    if codec == CODEC_ZSTD:
+        return _zstd().ZstdDecompressor().decompress(body).decode('utf-8')
+    raise ValueError(f"Unknown content codec: {codec}")
+
+
+class ContentCodec:
+    """
+    Compresses message content above a size threshold
+    """
+
+    def __init__(self, codec: str = 'zlib', min_bytes: int = COMPRESSION_MIN_BYTES, level: Optional[int] = None):
+        """
+        Initialize codec
+
+        Args:
+            codec: 'zlib' or 'zstd'
+            min_bytes: Values with fewer UTF-8 bytes are stored raw
+            level: Compression level (defaults to COMPRESSION_LEVELS[codec])
+        """
+        if codec not in CODEC_IDS:
+            raise ValueError(f"Unsupported compression codec: {codec}")
+
+        self.codec = codec
+        self.codec_id = CODEC_IDS[codec]
+        self.min_bytes = min_bytes
+        self.level = COMPRESSION_LEVELS[codec] if level is None else level
+        if codec == 'zstd':
+            _zstd()
+        # ZstdCompressor is not thread-safe and batch chat encodes from a pool, so each thread gets its own
+        self._local = threading.local()
+
+    def _zstd_compressor(self):
+        compressor = getattr(self._local, 'zstd_compressor', None)
+        if compressor is None:
+            compressor = self._local.zstd_compressor = _zstd().ZstdCompressor(level=self.level)
+        return compressor
+
+    def encode(self, plaintext: str) -> bytes:
+        """
+        Encode a value, compressing it if that makes it smaller
+
+        Args:
+            plaintext: String to encode
+
+        Returns:
+            Header byte followed by the (possibly compressed) UTF-8 bytes
+        """
+        data = plaintext.encode('utf-8')
+        if len(data) >= self.min_bytes:
+            if self.codec_id == CODEC_ZSTD:
+                compressed = self._zstd_compressor().compress(data)
+            else:
+                compressed = zlib.compress(data, self.level)
+            if len(compressed) < len(data):
+                metrics.count('ContentBytesSaved', len(data) - len(compressed), 'Bytes')
+                return bytes([self.codec_id]) + compressed
+        return bytes([CODEC_RAW]) + data
+
+    @staticmethod
+    def decode(data: bytes) -> str:
+        """Decode a value written by any codec (see decode_content)"""
+        return decode_content(data)
+
+
+def make_codec(name: Optional[str], min_bytes: int = COMPRESSION_MIN_BYTES) -> Optional[ContentCodec]:
+    """
+    Build a codec from a configuration value
+
+    Args:
+        name: 'zlib', 'zstd', or 'none'/empty to disable compression
+        min_bytes: Size threshold
+
+    Returns:
+        ContentCodec, or None when compression is disabled
+    """
+    if not name or name.lower() == 'none':
+        return None
+    return ContentCodec(name.lower(), min_bytes=min_bytes)
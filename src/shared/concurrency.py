@@ -0,0 +1,108 @@
+"""
+Shared thread pools reused across warm Lambda invocations
+
+Tasks run in a copy of the submitting thread's context, so context
+variables such as the current request's metrics follow the work.
+AdaptiveLimiter bounds concurrent calls to a service that throttles.
+"""
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that runs each task in a copy of the submitter's contextvars context"""
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        context = contextvars.copy_context()
+        return super().submit(context.run, fn, *args, **kwargs)
+
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    """
+    Return a named, bounded thread pool, creating it on first use
+
+    Each kind of work gets its own pool so tasks never block waiting on
+    tasks queued behind them in the same pool.
+
+    Args:
+        name: Pool name, also used as the thread name prefix
+        max_workers: Maximum number of threads in the pool
+
+    Returns:
+        ThreadPoolExecutor for the name
+    """
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = ContextThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+                _executors[name] = executor
+    return executor
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to throttling (additive increase, multiplicative decrease)
+
+    A throttled call halves the limit; after as many consecutive successes
+    as the current limit, it grows by one, up to the initial limit.
+    """
+
+    def __init__(self, limit: int, min_limit: int = 1):
+        """
+        Initialize limiter
+
+        Args:
+            limit: Initial and maximum number of concurrent holders
+            min_limit: Floor the limit never drops below
+        """
+        self.max_limit = max(limit, min_limit)
+        self.min_limit = min_limit
+        self.limit = self.max_limit
+        self.throttles = 0
+        self._active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for a free slot
+
+        Args:
+            timeout: Seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True if a slot was acquired
+        """
+        with self._condition:
+            acquired = self._condition.wait_for(lambda: self._active < self.limit, timeout=timeout)
+            if acquired:
+                self._active += 1
+            return acquired
+
+    def release(self, throttled: bool = False) -> None:
+        """
+        Free a slot and record the outcome of the call made while holding it
+
+        Args:
+            throttled: Whether the call was throttled
+        """
+        with self._condition:
+            self._active -= 1
+            if throttled:
+                self.throttles += 1
+                self._successes = 0
+                self.limit = max(self.min_limit, self.limit // 2)
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
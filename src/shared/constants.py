@@ -6,17 +6,128 @@ Constants used across the application
 # Using Claude 3 Haiku (fast, no use case form required)
 BEDROCK_MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
 BEDROCK_REGION = "us-east-1"
+BEDROCK_MAX_POOL_CONNECTIONS = 25
+BEDROCK_CONNECT_TIMEOUT = 3
+BEDROCK_READ_TIMEOUT = 55  # just under the chatbot Lambda timeout
+BEDROCK_MAX_ATTEMPTS = 4
+
+# Anthropic prompt caching (opt-in; the model must support it on Bedrock)
+PROMPT_CACHING = False
+PROMPT_CACHE_MIN_TOKENS = 1024  # shortest cacheable prefix for most Claude models
+PROMPT_CACHE_MODEL_MIN_TOKENS = {
+    'claude-3-5-haiku': 2048,
+    'claude-3-haiku': 2048,
+    'claude-haiku-4-5': 4096,
+    'claude-opus-4-5': 4096,
+}
 
 # DynamoDB Configuration
 CONVERSATIONS_TABLE_NAME = "PAI-Conversations"
+MESSAGES_TABLE_NAME = "PAI-Messages"
 CONVERSATION_TTL_DAYS = 30
+USER_ID_INDEX_NAME = "UserIdUpdatedIndex"  # user_id + updated_at, metadata attributes only
+CONVERSATION_LIST_DEFAULT_LIMIT = 20
+CONVERSATION_LIST_MAX_LIMIT = 100
+CONVERSATION_HEADER_FIELDS = ('conversation_id', 'created_at', 'updated_at', 'message_count')
+CONVERSATION_MESSAGES_MAX_LIMIT = 1000  # per GET /conversations/{id} request
+
+# Warm-container history cache
+HISTORY_CACHE_MAX_ENTRIES = 256
+HISTORY_CACHE_MAX_BYTES = 8 * 1024 * 1024
+HISTORY_CACHE_MESSAGES = 50
 
 # API Configuration
 MAX_TOKENS = 4096
 TEMPERATURE = 1.0
 
+# Context window
+CONTEXT_TOKEN_BUDGET = 8000  # estimated input tokens for system prompt + history + new message
+CONTEXT_MAX_MESSAGES = 50  # most history messages considered per turn
+SUMMARY_MIN_MESSAGES = 6  # dropped messages accumulated before folding them into the summary
+SUMMARY_MAX_TOKENS = 512
+SUMMARY_FOLD_MAX_MESSAGES = 100  # oldest unsummarized messages folded per turn; long backlogs catch up over turns
+SUMMARY_TIMEOUT_SECONDS = 2.0  # longer summary updates finish in the background and apply from the next turn
+SUMMARY_FINISH_TIMEOUT_SECONDS = 0.5  # extra wait for a summary update once the reply is stored; a later turn redoes an unfinished one
+SUMMARY_MAX_WORKERS = 4
+
+# Response cache
+RESPONSE_CACHE_MAX_ENTRIES = 512
+RESPONSE_CACHE_TTL_SECONDS = 3600
+
 # Encryption
 ENCRYPTION_ALGORITHM = "AES256"
+ENCRYPTION_MODE = "envelope"  # "envelope" (local AES-GCM with KMS data keys) or "kms" (KMS per message)
+DATA_KEY_TTL_SECONDS = 300
+DATA_KEY_MAX_MESSAGES = 10000
+DATA_KEY_CACHE_SIZE = 64
+DECRYPT_MAX_WORKERS = 8
+
+# Message content compression (applied before encryption)
+CONTENT_COMPRESSION = "none"  # "none", "zlib" or "zstd"
+COMPRESSION_MIN_BYTES = 256  # smaller values are stored raw
+COMPRESSION_LEVELS = {"zlib": 6, "zstd": 3}
+
+# Conversation writes
+TURN_WRITE_ATTEMPTS = 3
+WRITE_MAX_WORKERS = 4
+
+# Context reads (history and summary fetched side by side)
+CONTEXT_READ_MAX_WORKERS = 4
+
+# Secrets cached by the authorizer
+SECRET_TTL_SECONDS = 300
+SECRET_REFRESH_FRACTION = 0.8  # refresh in the background after 80% of the TTL
+SECRET_MAX_STALE_SECONDS = 3600  # serve the last value this long if Secrets Manager fails
+SECRET_RETRY_SECONDS = 10
+AUTH_DECISION_CACHE_SIZE = 10000
+AUTH_DECISION_TTL_SECONDS = 300
+
+# Rate limiting (token buckets per caller, reconciled through DynamoDB counters)
+RATE_LIMIT_TABLE_NAME = "PAI-RateLimits"
+RATE_LIMIT_REQUESTS_PER_MINUTE = 60
+RATE_LIMIT_INPUT_TOKENS_PER_MINUTE = 200000
+RATE_LIMIT_SYNC_SECONDS = 1.0
+RATE_LIMIT_WINDOW_SECONDS = 60
+RATE_LIMIT_MAX_KEYS = 10000
+
+# Batch chat
+BATCH_MAX_ITEMS = 32  # four waves at full concurrency, so typical batches finish inside the deadline
+BATCH_MAX_CONCURRENCY = 8
+BATCH_DEADLINE_SECONDS = 26  # whole batch, queued items included; API Gateway ends the request at 29 seconds
+BATCH_ITEM_TIMEOUT_SECONDS = 25
+BATCH_THROTTLE_RETRIES = 2
+
+# Document ingestion (RAG)
+INDEX_PREFIX = "index/"
+INGEST_CHUNK_SIZE = 2000  # characters, roughly 500 tokens
+INGEST_CHUNK_OVERLAP = 200
+INGEST_READ_SIZE = 64 * 1024
+EMBEDDING_MODEL_ID = "amazon.titan-embed-text-v2:0"
+EMBEDDING_DIMENSIONS = 512
+EMBED_BATCH_SIZE = 32
+EMBED_MAX_WORKERS = 8
+EMBEDDING_CACHE_MAX_ENTRIES = 4096  # about 8 MB of 512-dimension vectors
+EMBEDDING_CACHE_TTL_SECONDS = 30 * 24 * 3600  # embeddings are deterministic; the TTL only bounds the DynamoDB tier
+VECTOR_INDEX_FILE = "vectors.pvi"
+VECTOR_INDEX_DTYPE = "int8"  # the only supported dtype; float16 blocks convert too slowly to search
+VECTOR_SEARCH_BLOCK_BYTES = 1024 * 1024  # float32 block converted and scored per matrix product; half of a 2 MiB L2
+
+# Conversation export (gzip NDJSON, one part per scan segment)
+EXPORT_SEGMENTS = 4
+EXPORT_PAGE_SIZE = 100  # conversation headers per Scan/Query page
+EXPORT_FETCH_WORKERS = 16  # conversations whose messages are read concurrently
+EXPORT_PART_BYTES = 8 * 1024 * 1024  # compressed bytes per committed member; S3 parts need at least 5 MiB
+EXPORT_COMPRESSION_LEVEL = 6
+EXPORT_DEADLINE_MARGIN_SECONDS = 30  # a Lambda export checkpoints and stops this long before its timeout
+
+# Metrics (CloudWatch Embedded Metric Format)
+METRICS_NAMESPACE = "PAI"
+METRICS_SAMPLE_RATE = 1.0  # fraction of requests that emit a metrics record; cold starts always do
+
+# Request logging (structured summaries without message content)
+REQUEST_LOG_SAMPLE_RATE = 0.01  # fraction of requests logged
+REQUEST_LOG_MAX_BYTES = 2048
+REQUEST_LOG_VALUE_MAX_CHARS = 128  # longer strings are logged as their length
 
 # Error Messages
 ERROR_UNAUTHORIZED = "Unauthorized"
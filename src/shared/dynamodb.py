@@ -0,0 +1,253 @@
+"""
+Minimal DynamoDB attribute-value marshalling for the low-level client
+
+Covers the types this application stores (strings, numbers, booleans,
+null, binary, lists and maps) without importing the boto3 resource layer.
+Integral numbers are returned as int, other numbers as Decimal.
+
+DynamoDBTable wraps the low-level client with the same plain-value calling
+convention as the resource Table for the operations used here.
+"""
+import time
+from decimal import Decimal
+from typing import Any, Dict, List
+from src.shared import metrics
+from src.shared.aws_clients import get_client
+
+BATCH_WRITE_SIZE = 25
+BATCH_GET_SIZE = 100
+BATCH_WRITE_ATTEMPTS = 5
+
+
+def serialize_value(value: Any) -> Dict[str, Any]:
+    """
+    Convert a Python value to a DynamoDB attribute value
+
+    Args:
+        value: Python value
+
+    Returns:
+        Attribute value dictionary, e.g. {'S': 'text'}
+    """
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, float):
+        return {'N': repr(value)}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, (bytes, bytearray)):
+        return {'B': bytes(value)}
+    if isinstance(value, dict):
+        return {'M': {k: serialize_value(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize_value(v) for v in value]}
+    raise TypeError(f"Unsupported DynamoDB type: {type(value).__name__}")
+
+
+def deserialize_value(attribute: Dict[str, Any]) -> Any:
+    """
+    Convert a DynamoDB attribute value to a Python value
+
+    Args:
+        attribute: Attribute value dictionary
+
+    Returns:
+        Python value
+    """
+    (type_name, value), = attribute.items()
+
+    if type_name == 'S':
+        return value
+    if type_name == 'N':
+        if '.' in value or 'e' in value or 'E' in value:
+            return Decimal(value)
+        return int(value)
+    if type_name == 'BOOL':
+        return value
+    if type_name == 'NULL':
+        return None
+    if type_name == 'B':
+        return value
+    if type_name == 'M':
+        return {k: deserialize_value(v) for k, v in value.items()}
+    if type_name == 'L':
+        return [deserialize_value(v) for v in value]
+    if type_name == 'SS':
+        return set(value)
+    if type_name == 'NS':
+        return {deserialize_value({'N': v}) for v in value}
+    raise TypeError(f"Unsupported DynamoDB attribute type: {type_name}")
+
+
+def serialize_item(item: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Convert a Python dictionary to a DynamoDB item (or key / expression values)
+
+    Args:
+        item: Python dictionary
+
+    Returns:
+        Dictionary of attribute values
+    """
+    return {k: serialize_value(v) for k, v in item.items()}
+
+
+def deserialize_item(item: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Convert a DynamoDB item to a Python dictionary
+
+    Args:
+        item: Dictionary of attribute values
+
+    Returns:
+        Python dictionary
+    """
+    return {k: deserialize_value(v) for k, v in item.items()}
+
+
+def get_dynamodb_client():
+    """Return the shared low-level DynamoDB client, created on first use"""
+    return get_client('dynamodb')
+
+
+def call_dynamodb(operation: str, **kwargs) -> Dict[str, Any]:
+    """
+    Call a DynamoDB API operation, recording it in the request metrics
+
+    Args:
+        operation: Client method name, e.g. 'query'
+        **kwargs: Operation parameters
+
+    Returns:
+        DynamoDB response
+    """
+    metrics.count('DynamoDBCalls')
+    with metrics.span('dynamodb'):
+        return getattr(get_dynamodb_client(), operation)(**kwargs)
+
+
+class DynamoDBTable:
+    """
+    Thin wrapper over the low-level client for one table
+
+    Accepts and returns plain Python values like the boto3 resource Table,
+    for the handful of operations this application uses.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize table wrapper
+
+        Args:
+            name: DynamoDB table name
+        """
+        self.name = name
+
+    def get_item(self, Key: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        response = call_dynamodb('get_item', TableName=self.name, Key=serialize_item(Key), **kwargs)
+        if 'Item' in response:
+            response['Item'] = deserialize_item(response['Item'])
+        return response
+
+    def put_item(self, Item: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        _serialize_expression_values(kwargs)
+        return call_dynamodb('put_item', TableName=self.name, Item=serialize_item(Item), **kwargs)
+
+    def update_item(self, Key: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        _serialize_expression_values(kwargs)
+        response = call_dynamodb('update_item', TableName=self.name, Key=serialize_item(Key), **kwargs)
+        if 'Attributes' in response:
+            response['Attributes'] = deserialize_item(response['Attributes'])
+        return response
+
+    def query(self, **kwargs) -> Dict[str, Any]:
+        """Query the table; LastEvaluatedKey is returned in wire format for use as ExclusiveStartKey"""
+        _serialize_expression_values(kwargs)
+        response = call_dynamodb('query', TableName=self.name, **kwargs)
+        response['Items'] = [deserialize_item(item) for item in response.get('Items', [])]
+        return response
+
+    def scan(self, **kwargs) -> Dict[str, Any]:
+        """Scan the table (or one Segment of it); LastEvaluatedKey is returned in wire format"""
+        _serialize_expression_values(kwargs)
+        response = call_dynamodb('scan', TableName=self.name, **kwargs)
+        response['Items'] = [deserialize_item(item) for item in response.get('Items', [])]
+        return response
+
+    def batch_get(self, keys: List[Dict[str, Any]], **kwargs) -> List[Dict[str, Any]]:
+        """
+        Get items in batches of 100, resending unprocessed keys
+
+        Args:
+            keys: Primary keys to read
+            **kwargs: Extra per-table arguments such as ProjectionExpression
+
+        Returns:
+            Items found, in no particular order
+        """
+        items = []
+        for start in range(0, len(keys), BATCH_GET_SIZE):
+            requests = {self.name: {'Keys': [serialize_item(key) for key in keys[start:start + BATCH_GET_SIZE]], **kwargs}}
+            for attempt in range(BATCH_WRITE_ATTEMPTS):
+                response = call_dynamodb('batch_get_item', RequestItems=requests)
+                items.extend(deserialize_item(item) for item in response.get('Responses', {}).get(self.name, []))
+                requests = response.get('UnprocessedKeys')
+                if not requests:
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+            else:
+                raise RuntimeError(f"Unprocessed keys remain after batch get from {self.name}")
+        return items
+
+    def batch_put(self, items: List[Dict[str, Any]]) -> None:
+        """
+        Put items in batches of 25, resending unprocessed items
+
+        Args:
+            items: Items to write
+        """
+        for start in range(0, len(items), BATCH_WRITE_SIZE):
+            requests = {self.name: [{'PutRequest': {'Item': serialize_item(item)}}
+                                    for item in items[start:start + BATCH_WRITE_SIZE]]}
+            for attempt in range(BATCH_WRITE_ATTEMPTS):
+                requests = call_dynamodb('batch_write_item', RequestItems=requests).get('UnprocessedItems')
+                if not requests:
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+            else:
+                raise RuntimeError(f"Unprocessed items remain after batch write to {self.name}")
+
+
+def transact_write_items(transact_items: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+    """
+    Run TransactWriteItems with plain Python values in Item, Key and ExpressionAttributeValues
+
+    Args:
+        transact_items: Operations as for the client call, e.g. [{'Put': {'TableName': ..., 'Item': {...}}}]
+        **kwargs: Extra arguments such as ReturnConsumedCapacity
+
+    Returns:
+        Client response
+    """
+    serialized = []
+    for operation in transact_items:
+        (op_name, params), = operation.items()
+        params = dict(params)
+        if 'Item' in params:
+            params['Item'] = serialize_item(params['Item'])
+        if 'Key' in params:
+            params['Key'] = serialize_item(params['Key'])
+        _serialize_expression_values(params)
+        serialized.append({op_name: params})
+
+    return call_dynamodb('transact_write_items', TransactItems=serialized, **kwargs)
+
+
+def _serialize_expression_values(params: Dict[str, Any]) -> None:
+    """Serialize ExpressionAttributeValues in place if present"""
+    if 'ExpressionAttributeValues' in params:
+        params['ExpressionAttributeValues'] = serialize_item(params['ExpressionAttributeValues'])
@@ -1,13 +1,66 @@
 """
 End-to-end encryption utilities using AWS KMS
+
+Two modes are supported:
+    kms:      every value is encrypted by a KMS Encrypt call (4 KB plaintext limit)
+    envelope: a KMS data key is generated once and values are encrypted locally
+              with AES-GCM; the encrypted data key travels with each value
+
+Envelope ciphertexts carry the ENVELOPE_PREFIX so values written in kms mode
+keep decrypting after switching modes.
+
+With a ContentCodec, values are compressed before encryption and carry the
+ENVELOPE_CODEC_PREFIX or KMS_CODEC_PREFIX instead; their plaintext starts
+with the codec header byte. Values written without a codec still decrypt.
 """
+import os
 import base64
-import boto3
+import struct
+import threading
+import time
 import logging
-from typing import Optional
+from typing import List, Optional
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from src.shared import metrics
+from src.shared.aws_clients import get_client
+from src.shared.cache import LRUCache
+from src.shared.compression import ContentCodec, decode_content
+from src.shared.concurrency import get_executor
+from src.shared.constants import (
+    ENCRYPTION_MODE,
+    DATA_KEY_TTL_SECONDS,
+    DATA_KEY_MAX_MESSAGES,
+    DATA_KEY_CACHE_SIZE,
+    DECRYPT_MAX_WORKERS,
+)
 
 logger = logging.getLogger()
-kms_client = boto3.client('kms')
+
+ENVELOPE_PREFIX = 'env1:'
+ENVELOPE_CODEC_PREFIX = 'env2:'
+KMS_CODEC_PREFIX = 'kms2:'
+NONCE_SIZE = 12
+
+
+def get_kms_client():
+    """Return the shared KMS client, created on first use"""
+    return get_client('kms')
+
+
+def call_kms(operation: str, **kwargs) -> dict:
+    """
+    Call a KMS API operation, recording it in the request metrics
+
+    Args:
+        operation: Client method name, e.g. 'decrypt'
+        **kwargs: Operation parameters
+
+    Returns:
+        KMS response
+    """
+    metrics.count('KMSCalls')
+    with metrics.span('kms'):
+        return getattr(get_kms_client(), operation)(**kwargs)
 
 
 class EncryptionManager:
@@ -15,30 +68,109 @@ class EncryptionManager:
     Manages encryption and decryption using AWS KMS
     """
 
-    def __init__(self, kms_key_id: str):
+    def __init__(
+        self,
+        kms_key_id: str,
+        mode: str = ENCRYPTION_MODE,
+        data_key_ttl_seconds: float = DATA_KEY_TTL_SECONDS,
+        data_key_max_messages: int = DATA_KEY_MAX_MESSAGES,
+        data_key_cache_size: int = DATA_KEY_CACHE_SIZE,
+        codec: Optional[ContentCodec] = None
+    ):
         """
         Initialize encryption manager
 
         Args:
             kms_key_id: AWS KMS key ID or ARN
+            mode: 'envelope' for local AES-GCM with KMS data keys, 'kms' for per-message KMS calls
+            data_key_ttl_seconds: How long a data key is used for encryption and kept for decryption
+            data_key_max_messages: Number of values encrypted under one data key before rotating
+            data_key_cache_size: Maximum number of decrypted data keys kept in memory
+            codec: Optional codec compressing values before encryption
         """
+        if mode not in ('envelope', 'kms'):
+            raise ValueError(f"Unsupported encryption mode: {mode}")
+
         self.kms_key_id = kms_key_id
+        self.mode = mode
+        self.data_key_ttl_seconds = data_key_ttl_seconds
+        self.data_key_max_messages = data_key_max_messages
+        self.codec = codec
+
+        # Decrypted data keys keyed by their encrypted blob
+        self._data_keys = LRUCache(max_entries=data_key_cache_size, ttl_seconds=data_key_ttl_seconds)
+
+        # Data key currently used for encryption: (aesgcm, encrypted_key, created_at, uses)
+        self._current_key = None
+        self._key_lock = threading.Lock()
 
     def encrypt(self, plaintext: str) -> str:
         """
-        Encrypt data using KMS
+        Encrypt data using the configured mode
 
         Args:
             plaintext: String to encrypt
 
+        Returns:
+            Encrypted data as a string
+        """
+        if self.codec is not None:
+            data = self.codec.encode(plaintext)
+            if self.mode == 'envelope':
+                return ENVELOPE_CODEC_PREFIX + self._encrypt_envelope(data)
+            return KMS_CODEC_PREFIX + self._encrypt_kms(data)
+
+        data = plaintext.encode('utf-8')
+        if self.mode == 'envelope':
+            return ENVELOPE_PREFIX + self._encrypt_envelope(data)
+        return self._encrypt_kms(data)
+
+    def decrypt(self, ciphertext: str) -> str:
+        """
+        Decrypt data produced in either mode
+
+        Args:
+            ciphertext: Encrypted data as returned by encrypt
+
+        Returns:
+            Decrypted plaintext string
+        """
+        if ciphertext.startswith(ENVELOPE_CODEC_PREFIX):
+            return decode_content(self._decrypt_envelope(ciphertext[len(ENVELOPE_CODEC_PREFIX):]))
+        if ciphertext.startswith(KMS_CODEC_PREFIX):
+            return decode_content(self._decrypt_kms(ciphertext[len(KMS_CODEC_PREFIX):]))
+        if ciphertext.startswith(ENVELOPE_PREFIX):
+            return self._decrypt_envelope(ciphertext[len(ENVELOPE_PREFIX):]).decode('utf-8')
+        return self._decrypt_kms(ciphertext).decode('utf-8')
+
+    def decrypt_many(self, ciphertexts: List[str]) -> List[str]:
+        """
+        Decrypt a batch of values, fanning out over the shared thread pool
+
+        Args:
+            ciphertexts: Encrypted values as returned by encrypt
+
+        Returns:
+            Decrypted plaintext strings in input order
+        """
+        if len(ciphertexts) <= 1:
+            return [self.decrypt(ciphertext) for ciphertext in ciphertexts]
+        pool = get_executor('decrypt', DECRYPT_MAX_WORKERS)
+        return list(pool.map(self.decrypt, ciphertexts))
+
+    def _encrypt_kms(self, data: bytes) -> str:
+        """
+        Encrypt data using KMS
+
+        Args:
+            data: Bytes to encrypt
+
         Returns:
             Base64 encoded encrypted data
         """
         try:
-            response = kms_client.encrypt(
-                KeyId=self.kms_key_id,
-                Plaintext=plaintext.encode('utf-8')
-            )
+            metrics.count('BytesEncrypted', len(data), 'Bytes')
+            response = call_kms('encrypt', KeyId=self.kms_key_id, Plaintext=data)
 
             # Return base64 encoded ciphertext
             return base64.b64encode(response['CiphertextBlob']).decode('utf-8')
@@ -47,7 +179,7 @@ class EncryptionManager:
             logger.error(f"Encryption error: {str(e)}")
             raise
 
-    def decrypt(self, ciphertext: str) -> str:
+    def _decrypt_kms(self, ciphertext: str) -> bytes:
         """
         Decrypt data using KMS
 
@@ -55,23 +187,109 @@ class EncryptionManager:
             ciphertext: Base64 encoded encrypted data
 
         Returns:
-            Decrypted plaintext string
+            Decrypted bytes
         """
         try:
             # Decode base64
             ciphertext_blob = base64.b64decode(ciphertext)
 
-            response = kms_client.decrypt(
-                CiphertextBlob=ciphertext_blob,
-                KeyId=self.kms_key_id
-            )
+            response = call_kms('decrypt', CiphertextBlob=ciphertext_blob, KeyId=self.kms_key_id)
 
-            return response['Plaintext'].decode('utf-8')
+            return response['Plaintext']
 
         except Exception as e:
             logger.error(f"Decryption error: {str(e)}")
             raise
 
+    def _encrypt_envelope(self, data: bytes) -> str:
+        """
+        Encrypt data locally with the current data key
+
+        Args:
+            data: Bytes to encrypt
+
+        Returns:
+            Base64 of key length (2 bytes) | encrypted data key | nonce | AES-GCM ciphertext
+            (without the prefix)
+        """
+        try:
+            aesgcm, encrypted_key = self._get_encryption_key()
+            nonce = os.urandom(NONCE_SIZE)
+            metrics.count('BytesEncrypted', len(data), 'Bytes')
+            sealed = aesgcm.encrypt(nonce, data, None)
+
+            payload = struct.pack('>H', len(encrypted_key)) + encrypted_key + nonce + sealed
+            return base64.b64encode(payload).decode('utf-8')
+
+        except Exception as e:
+            logger.error(f"Encryption error: {str(e)}")
+            raise
+
+    def _decrypt_envelope(self, ciphertext: str) -> bytes:
+        """
+        Decrypt an envelope ciphertext, unwrapping its data key through the cache
+
+        Args:
+            ciphertext: Value produced by _encrypt_envelope (prefix removed)
+
+        Returns:
+            Decrypted bytes
+        """
+        try:
+            payload = base64.b64decode(ciphertext)
+            (key_length,) = struct.unpack_from('>H', payload)
+            key_end = 2 + key_length
+            encrypted_key = payload[2:key_end]
+            nonce = payload[key_end:key_end + NONCE_SIZE]
+            sealed = payload[key_end + NONCE_SIZE:]
+
+            aesgcm = self._get_decryption_key(encrypted_key)
+            return aesgcm.decrypt(nonce, sealed, None)
+
+        except Exception as e:
+            logger.error(f"Decryption error: {str(e)}")
+            raise
+
+    def _get_encryption_key(self) -> tuple:
+        """
+        Return the current data key, generating a new one when it is expired or exhausted
+
+        Returns:
+            Tuple of (AESGCM cipher, encrypted data key blob)
+        """
+        with self._key_lock:
+            current = self._current_key
+            if current is not None:
+                aesgcm, encrypted_key, created_at, uses = current
+                if uses < self.data_key_max_messages and time.monotonic() - created_at < self.data_key_ttl_seconds:
+                    self._current_key = (aesgcm, encrypted_key, created_at, uses + 1)
+                    return aesgcm, encrypted_key
+
+            response = call_kms('generate_data_key', KeyId=self.kms_key_id, KeySpec='AES_256')
+            aesgcm = AESGCM(response['Plaintext'])
+            encrypted_key = response['CiphertextBlob']
+
+            self._current_key = (aesgcm, encrypted_key, time.monotonic(), 1)
+            self._data_keys.put(encrypted_key, aesgcm)
+            return aesgcm, encrypted_key
+
+    def _get_decryption_key(self, encrypted_key: bytes) -> AESGCM:
+        """
+        Unwrap a data key, using the in-memory cache before calling KMS
+
+        Args:
+            encrypted_key: Encrypted data key blob
+
+        Returns:
+            AESGCM cipher for the data key
+        """
+        aesgcm = self._data_keys.get(encrypted_key)
+        if aesgcm is None:
+            response = call_kms('decrypt', CiphertextBlob=encrypted_key, KeyId=self.kms_key_id)
+            aesgcm = AESGCM(response['Plaintext'])
+            self._data_keys.put(encrypted_key, aesgcm)
+        return aesgcm
+
     def encrypt_conversation(self, conversation_data: dict) -> dict:
         """
         Encrypt sensitive fields in conversation data
@@ -0,0 +1,226 @@
+"""
+Request-scoped spans and counters emitted as CloudWatch Embedded Metric Format
+
+The handler starts a RequestMetrics per invocation; code anywhere below it
+records into the current request through span() and count(), which are
+no-ops outside a request. The current request travels in a ContextVar, and
+the shared thread pools copy the caller's context, so work done on
+background threads is attributed to the request that submitted it.
+
+At the end of a sampled request one EMF JSON line is written to stdout,
+which Lambda ships to CloudWatch Logs and CloudWatch turns into metrics.
+The sample rate trades per-request detail for log volume; cold starts are
+always emitted.
+"""
+import os
+import sys
+import json
+import time
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+from src.shared.timing import StageTimer
+from src.shared.constants import METRICS_NAMESPACE, METRICS_SAMPLE_RATE
+
+_current: ContextVar[Optional['RequestMetrics']] = ContextVar('request_metrics', default=None)
+_cold_start = True
+
+
+def _write_stdout(record: Dict[str, Any]) -> None:
+    sys.stdout.write(json.dumps(record, separators=(',', ':')) + '\n')
+    sys.stdout.flush()
+
+
+_sink: Callable[[Dict[str, Any]], None] = _write_stdout
+
+
+class RequestMetrics(StageTimer):
+    """
+    Stage durations plus counters for one request, with optional EMF output
+    """
+
+    def __init__(self, route: str, sampled: bool, cold_start: bool, service: Optional[str] = None):
+        """
+        Initialize request metrics
+
+        Args:
+            route: Route dimension, e.g. '/chat'
+            sampled: Whether finish_request emits an EMF record
+            cold_start: Whether this is the first request of the container
+            service: Service dimension; defaults to the Lambda function name
+        """
+        super().__init__()
+        self.route = route
+        self.sampled = sampled
+        self.cold_start = cold_start
+        self.service = service or os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'pai-chatbot')
+        self._counters: Dict[str, list] = {}
+        self._properties: Dict[str, Any] = {}
+
+    def count(self, name: str, value: float = 1, unit: str = 'Count') -> None:
+        """
+        Add to a counter metric
+
+        Args:
+            name: Metric name
+            value: Amount to add
+            unit: CloudWatch unit, e.g. 'Count' or 'Bytes'
+        """
+        with self._lock:
+            counter = self._counters.get(name)
+            if counter is None:
+                self._counters[name] = [value, unit]
+            else:
+                counter[0] += value
+
+    def set_metric(self, name: str, value: float, unit: str = 'None') -> None:
+        """Set a metric to a value, replacing any earlier value"""
+        with self._lock:
+            self._counters[name] = [value, unit]
+
+    def set_property(self, name: str, value: Any) -> None:
+        """Attach a searchable, non-metric field to the record (e.g. a request id)"""
+        self._properties[name] = value
+
+    def counters(self) -> Dict[str, float]:
+        """Counter values by name"""
+        with self._lock:
+            return {name: value for name, (value, _) in self._counters.items()}
+
+    def to_emf(self) -> Dict[str, Any]:
+        """
+        Build the Embedded Metric Format record
+
+        Returns:
+            EMF dictionary with stage durations in milliseconds ('<stage>Ms'),
+            counters and the ColdStart flag under the Service/Route dimensions
+        """
+        metrics = [{'Name': 'ColdStart', 'Unit': 'Count'}]
+        record: Dict[str, Any] = {
+            'Service': self.service,
+            'Route': self.route,
+            'ColdStart': 1 if self.cold_start else 0,
+            **self._properties,
+        }
+
+        for stage, ms in self.as_dict().items():
+            name = f'{stage}Ms'
+            metrics.append({'Name': name, 'Unit': 'Milliseconds'})
+            record[name] = ms
+
+        with self._lock:
+            counters = dict(self._counters)
+        for name, (value, unit) in counters.items():
+            metrics.append({'Name': name, 'Unit': unit})
+            record[name] = value
+
+        record['_aws'] = {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Service', 'Route']],
+                'Metrics': metrics,
+            }],
+        }
+        return record
+
+
+def start_request(route: str, sample_rate: float = METRICS_SAMPLE_RATE) -> RequestMetrics:
+    """
+    Begin metrics for a request and make them current
+
+    Args:
+        route: Route dimension
+        sample_rate: Fraction of requests that emit an EMF record (cold starts always do)
+
+    Returns:
+        RequestMetrics for the request
+    """
+    global _cold_start
+    cold_start, _cold_start = _cold_start, False
+
+    sampled = cold_start or (sample_rate > 0 and random.random() < sample_rate)
+    request_metrics = RequestMetrics(route, sampled, cold_start)
+    _current.set(request_metrics)
+    return request_metrics
+
+
+def finish_request(request_metrics: RequestMetrics) -> None:
+    """
+    Emit the request's EMF record if sampled and clear the current request
+
+    Args:
+        request_metrics: Metrics returned by start_request
+    """
+    if _current.get() is request_metrics:
+        _current.set(None)
+    if request_metrics.sampled:
+        try:
+            _sink(request_metrics.to_emf())
+        except Exception:
+            # Metrics must never fail the request
+            pass
+
+
+def current() -> Optional[RequestMetrics]:
+    """Metrics of the request running in this context, if any"""
+    return _current.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time the enclosed block as a stage of the current request (no-op outside a request)
+
+    Args:
+        name: Stage name; repeated spans accumulate
+    """
+    request_metrics = _current.get()
+    if request_metrics is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        request_metrics.record(name, (time.perf_counter() - start) * 1000)
+
+
+def record(name: str, milliseconds: float) -> None:
+    """
+    Add an already measured duration to a stage of the current request (no-op outside a request)
+
+    Args:
+        name: Stage name
+        milliseconds: Duration to add
+    """
+    request_metrics = _current.get()
+    if request_metrics is not None:
+        request_metrics.record(name, milliseconds)
+
+
+def count(name: str, value: float = 1, unit: str = 'Count') -> None:
+    """
+    Add to a counter of the current request (no-op outside a request)
+
+    Args:
+        name: Metric name
+        value: Amount to add
+        unit: CloudWatch unit
+    """
+    request_metrics = _current.get()
+    if request_metrics is not None:
+        request_metrics.count(name, value, unit)
+
+
+def set_sink(sink: Optional[Callable[[Dict[str, Any]], None]]) -> None:
+    """
+    Replace where EMF records go (stdout by default); None restores stdout
+
+    Args:
+        sink: Callable receiving each EMF record
+    """
+    global _sink
+    _sink = sink or _write_stdout
@@ -0,0 +1,229 @@
+"""
+Token-bucket rate limiting per caller, shared across Lambda containers
+
+Each caller has one bucket per limit ('requests' and 'input_tokens'),
+holding up to a minute's allowance and refilling continuously. Decisions
+are made against an in-process copy of the bucket, so most requests make
+no AWS call. After a decision, at most once per sync interval, a container
+adds its own usage to a per-minute DynamoDB counter (one atomic UpdateItem)
+and reads back the total; usage by other containers since the last sync is
+then debited from the local bucket. Every container therefore drains the same logical
+bucket, lagging by at most the sync interval.
+
+Input tokens are known only after the model call, so the token bucket
+admits a request while it is not empty and charge() bills the actual
+usage afterwards; a bucket in debt refuses requests until it refills.
+
+If the counter table is unreachable, limits are enforced per container.
+"""
+import math
+import time
+import logging
+import threading
+from typing import Callable, Dict, NamedTuple, Optional
+from src.shared import metrics
+from src.shared.cache import LRUCache
+from src.shared.dynamodb import DynamoDBTable
+from src.shared.constants import (
+    RATE_LIMIT_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_INPUT_TOKENS_PER_MINUTE,
+    RATE_LIMIT_SYNC_SECONDS,
+    RATE_LIMIT_WINDOW_SECONDS,
+    RATE_LIMIT_MAX_KEYS,
+)
+
+logger = logging.getLogger()
+
+
+class RateLimitDecision(NamedTuple):
+    """Outcome of RateLimiter.acquire"""
+    allowed: bool
+    retry_after: float = 0.0  # seconds until the request would be admitted
+    bucket: Optional[str] = None  # the bucket that refused it
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value: whole seconds, at least 1"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """
+    Token bucket that can go into debt, plus its reconciliation state
+    """
+
+    def __init__(self, capacity: float, now: float):
+        self.capacity = capacity
+        self.rate = capacity / 60.0
+        self.level = capacity
+        self.updated = now
+        self.pending = 0.0  # local usage not yet added to the shared counter
+        self.window: Optional[int] = None
+        self.window_total = 0.0  # shared counter value at the last sync
+        self.last_sync: Optional[float] = None
+        self.syncing = False
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until the bucket holds amount (at least one unit, at most its capacity)"""
+        deficit = min(max(amount, 1.0), self.capacity) - self.level
+        return deficit / self.rate if deficit > 0 else 0.0
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+        self.pending += amount
+
+
+class RateLimiter:
+    """
+    Per-caller request and input-token limits with DynamoDB reconciliation
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = RATE_LIMIT_REQUESTS_PER_MINUTE,
+        input_tokens_per_minute: float = RATE_LIMIT_INPUT_TOKENS_PER_MINUTE,
+        table_name: Optional[str] = None,
+        sync_interval_seconds: float = RATE_LIMIT_SYNC_SECONDS,
+        max_keys: int = RATE_LIMIT_MAX_KEYS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize rate limiter
+
+        Args:
+            requests_per_minute: Request allowance per caller (0 disables the limit)
+            input_tokens_per_minute: Input token allowance per caller (0 disables the limit)
+            table_name: Optional DynamoDB table (hash key 'limit_key', TTL attribute 'ttl')
+                        holding the shared per-minute usage counters
+            sync_interval_seconds: Minimum time between syncs of one bucket
+            max_keys: Callers whose buckets are kept in memory
+            clock: Monotonic clock (injectable for tests)
+        """
+        self.limits = {
+            name: float(limit)
+            for name, limit in (('requests', requests_per_minute), ('input_tokens', input_tokens_per_minute))
+            if limit
+        }
+        self.table = DynamoDBTable(table_name) if table_name else None
+        self.sync_interval_seconds = sync_interval_seconds
+        self.clock = clock
+        self._buckets = LRUCache(max_entries=max_keys)
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, requests: int = 1, input_tokens: int = 0) -> RateLimitDecision:
+        """
+        Admit or refuse a request, consuming from the caller's buckets if admitted
+
+        Args:
+            key: Caller identity (API key principal and/or user id)
+            requests: Requests to consume
+            input_tokens: Input tokens known up front (more can be charged later)
+
+        Returns:
+            RateLimitDecision
+        """
+        costs = {'requests': requests, 'input_tokens': input_tokens}
+        # A bucket new to this container first learns the caller's current usage
+        self._sync_due(key, initial=True)
+
+        with self._lock:
+            now = self.clock()
+            buckets = self._get_buckets(key, now)
+            refused = None
+            for name, bucket in buckets.items():
+                bucket.refill(now)
+                wait = bucket.wait_time(costs[name])
+                if wait > 0 and (refused is None or wait > refused.retry_after):
+                    refused = RateLimitDecision(False, wait, name)
+            if refused is None:
+                for name, bucket in buckets.items():
+                    bucket.take(costs[name])
+
+        self._sync_due(key)
+        if refused is not None:
+            metrics.count('RateLimited')
+            logger.warning(f"Rate limited {key}: {refused.bucket} (retry after {refused.retry_after:.1f}s)")
+            return refused
+        return RateLimitDecision(True)
+
+    def charge(self, key: str, input_tokens: float) -> None:
+        """
+        Bill usage measured after the request was admitted (may put the bucket in debt)
+
+        Args:
+            key: Caller identity
+            input_tokens: Additional input tokens consumed (negative refunds an over-estimate)
+        """
+        if 'input_tokens' not in self.limits or not input_tokens:
+            return
+        with self._lock:
+            now = self.clock()
+            bucket = self._get_buckets(key, now)['input_tokens']
+            bucket.refill(now)
+            bucket.take(input_tokens)
+
+    def _get_buckets(self, key: str, now: float) -> Dict[str, TokenBucket]:
+        """Buckets of a caller, created full on first use (call with the lock held)"""
+        buckets = self._buckets.get(key)
+        if buckets is None:
+            buckets = {name: TokenBucket(limit, now) for name, limit in self.limits.items()}
+            self._buckets.put(key, buckets)
+        return buckets
+
+    def _sync_due(self, key: str, initial: bool = False) -> None:
+        """Reconcile the caller's buckets whose sync interval has elapsed (or, if initial, that never synced)"""
+        if self.table is None:
+            return
+
+        with self._lock:
+            now = self.clock()
+            due = []
+            for name, bucket in self._get_buckets(key, now).items():
+                if bucket.syncing or (initial and bucket.last_sync is not None):
+                    continue
+                if bucket.last_sync is None or now - bucket.last_sync >= self.sync_interval_seconds:
+                    bucket.syncing = True
+                    bucket.last_sync = now
+                    due.append((name, bucket, bucket.pending))
+                    bucket.pending = 0.0
+
+        for name, bucket, pushed in due:
+            self._sync(key, name, bucket, pushed)
+
+    def _sync(self, key: str, name: str, bucket: TokenBucket, pushed: float) -> None:
+        """Add local usage to the shared counter and debit usage by other containers"""
+        window = int(time.time() // RATE_LIMIT_WINDOW_SECONDS)
+        try:
+            metrics.count('RateLimitSyncs')
+            response = self.table.update_item(
+                Key={'limit_key': f"{key}#{name}#{window}"},
+                UpdateExpression='ADD used :used SET #ttl = if_not_exists(#ttl, :ttl)',
+                ExpressionAttributeNames={'#ttl': 'ttl'},
+                ExpressionAttributeValues={
+                    ':used': int(math.ceil(pushed)),
+                    ':ttl': (window + 2) * RATE_LIMIT_WINDOW_SECONDS,
+                },
+                ReturnValues='ALL_NEW'
+            )
+            total = float(response['Attributes']['used'])
+        except Exception as e:
+            logger.error(f"Error syncing rate limit counter: {str(e)}")
+            with self._lock:
+                bucket.pending += pushed
+                bucket.syncing = False
+            return
+
+        with self._lock:
+            if bucket.window != window:
+                bucket.window = window
+                bucket.window_total = 0.0
+            others = total - bucket.window_total - math.ceil(pushed)
+            if others > 0:
+                bucket.refill(self.clock())
+                bucket.level -= others
+            bucket.window_total = total
+            bucket.syncing = False
@@ -0,0 +1,134 @@
+"""
+Secrets Manager values cached across warm Lambda invocations
+
+A CachedSecret is fetched once and then served from memory. Once it is
+older than the refresh point, the current value is still returned while
+one background thread fetches a new one. Only an expired value is
+fetched on the request path. If that fetch fails, the stale value keeps
+being served up to a maximum age, with fetches retried at most every few
+seconds, so a Secrets Manager outage or throttling neither fails nor
+slows down every request.
+"""
+import json
+import time
+import logging
+import threading
+from typing import Any, Callable, Optional
+from src.shared.aws_clients import get_client
+from src.shared.concurrency import get_executor
+from src.shared.constants import (
+    SECRET_TTL_SECONDS,
+    SECRET_REFRESH_FRACTION,
+    SECRET_MAX_STALE_SECONDS,
+    SECRET_RETRY_SECONDS,
+)
+
+logger = logging.getLogger()
+
+
+class CachedSecret:
+    """
+    JSON secret with TTL, background refresh and stale-on-error fallback
+    """
+
+    def __init__(
+        self,
+        secret_id: str,
+        parse: Callable[[dict], Any] = lambda secret: secret,
+        ttl_seconds: float = SECRET_TTL_SECONDS,
+        refresh_fraction: float = SECRET_REFRESH_FRACTION,
+        max_stale_seconds: float = SECRET_MAX_STALE_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize cached secret
+
+        Args:
+            secret_id: Secrets Manager secret ARN or name
+            parse: Converts the decoded JSON secret into the cached value (run once per fetch)
+            ttl_seconds: Age after which the value must be fetched again before use
+            refresh_fraction: Fraction of the TTL after which a background refresh starts
+            max_stale_seconds: Age up to which the value is still served if fetching fails
+            clock: Monotonic clock (injectable for tests)
+        """
+        self.secret_id = secret_id
+        self.parse = parse
+        self.ttl_seconds = ttl_seconds
+        self.refresh_after = ttl_seconds * refresh_fraction
+        self.max_stale_seconds = max_stale_seconds
+        self.clock = clock
+        self.version = 0  # incremented whenever a fetched value replaces the cached one
+        self._value: Any = None
+        self._fetched_at: Optional[float] = None
+        self._retry_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()  # held while fetching on the request path
+        self._refresh_lock = threading.Lock()
+
+    def get(self) -> Any:
+        """
+        Return the parsed secret, fetching it only when missing or expired
+
+        Returns:
+            Parsed secret value
+
+        Raises:
+            Exception: If there is no usable value and the fetch fails
+        """
+        fetched_at = self._fetched_at
+        if fetched_at is not None:
+            age = self.clock() - fetched_at
+            if age < self.refresh_after:
+                return self._value
+            if age < self.ttl_seconds:
+                self._refresh_in_background()
+                return self._value
+
+        with self._lock:
+            now = self.clock()
+            if self._fetched_at is not None:
+                age = now - self._fetched_at
+                # Another thread may have fetched it while this one waited, or a fetch just failed
+                if age < self.ttl_seconds or (now < self._retry_at and age < self.max_stale_seconds):
+                    return self._value
+            try:
+                self._store(self._load())
+            except Exception as e:
+                if self._fetched_at is None or now - self._fetched_at >= self.max_stale_seconds:
+                    raise
+                self._retry_at = now + SECRET_RETRY_SECONDS
+                logger.error(f"Error refreshing secret, serving stale value: {str(e)}")
+            return self._value
+
+    def invalidate(self) -> None:
+        """Drop the cached value so the next get fetches it"""
+        with self._lock:
+            self._value = None
+            self._fetched_at = None
+
+    def _load(self) -> Any:
+        response = get_client('secretsmanager').get_secret_value(SecretId=self.secret_id)
+        return self.parse(json.loads(response['SecretString']))
+
+    def _store(self, value: Any) -> None:
+        self._value = value
+        self._fetched_at = self.clock()
+        self.version += 1
+
+    def _refresh_in_background(self) -> None:
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        get_executor('secret-refresh', 1).submit(self._background_refresh)
+
+    def _background_refresh(self) -> None:
+        try:
+            value = self._load()
+            with self._lock:
+                self._store(value)
+        except Exception as e:
+            logger.error(f"Error refreshing secret in background: {str(e)}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing = False
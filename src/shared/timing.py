@@ -0,0 +1,71 @@
+"""
+Per-request stage timings
+
+A StageTimer collects wall-clock durations of named stages, including
+stages that run on background threads, so responses and logs can show
+which stages sit on the critical path.
+"""
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+
+class StageTimer:
+    """
+    Thread-safe collector of stage durations in milliseconds
+    """
+
+    def __init__(self):
+        """Initialize timer; the 'total' stage is measured from here"""
+        self._start = time.perf_counter()
+        self._durations: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time the enclosed block as a stage
+
+        Args:
+            name: Stage name; repeated stages accumulate
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def record(self, name: str, milliseconds: float) -> None:
+        """
+        Add a measured duration to a stage
+
+        Args:
+            name: Stage name
+            milliseconds: Duration to add
+        """
+        with self._lock:
+            self._durations[name] = self._durations.get(name, 0.0) + milliseconds
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage durations rounded to 0.1 ms, plus the elapsed total"""
+        with self._lock:
+            timings = {name: round(ms, 1) for name, ms in self._durations.items()}
+        timings['total'] = round((time.perf_counter() - self._start) * 1000, 1)
+        return timings
+
+
+@contextmanager
+def optional_stage(timer: Optional[StageTimer], name: str) -> Iterator[None]:
+    """
+    Time a stage when a timer is given, otherwise do nothing
+
+    Args:
+        timer: Optional StageTimer
+        name: Stage name
+    """
+    if timer is None:
+        yield
+    else:
+        with timer.stage(name):
+            yield
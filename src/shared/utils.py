@@ -1,23 +1,90 @@
 """
 Shared utility functions
+
+JSON goes through json_dumps/json_loads, which use orjson when it is
+installed (several times faster on large response bodies) and the
+standard library otherwise. Both produce compact UTF-8 JSON and encode
+DynamoDB Decimal values as numbers.
 """
 import json
+import random
 import logging
-from typing import Dict, Any
+from decimal import Decimal
+from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
+from src.shared.constants import REQUEST_LOG_MAX_BYTES, REQUEST_LOG_VALUE_MAX_CHARS
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library is used instead
+    orjson = None
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Request fields that may hold user content; only their size is logged
+REQUEST_LOG_REDACTED_FIELDS = frozenset({'message', 'messages', 'items', 'system_prompt'})
+
+
+def _json_default(value: Any) -> Any:
+    """Encode values neither JSON library handles natively"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        # orjson is told to pass dict subclasses here so that lazy ones (LazyMessage)
+        # are read through their own methods rather than their raw storage
+        return dict(value)
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if isinstance(value, str):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def json_dumps(value: Any) -> str:
+    """
+    Serialize to compact JSON
+
+    Args:
+        value: JSON-serializable value; Decimal is encoded as int or float
+
+    Returns:
+        JSON string
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            value, default=_json_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_SUBCLASS
+        ).decode('utf-8')
+    return json.dumps(value, default=_json_default, separators=(',', ':'), ensure_ascii=False)
+
+
+def json_loads(data: Any) -> Any:
+    """
+    Parse JSON from str or bytes
+
+    Args:
+        data: JSON document
+
+    Returns:
+        Parsed value
 
-def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
+    Raises:
+        json.JSONDecodeError: If the document is invalid (orjson's error subclasses it)
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def create_response(status_code: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
     """
     Create a standardized API Gateway response
 
     Args:
         status_code: HTTP status code
         body: Response body dictionary
+        headers: Optional extra response headers
 
     Returns:
         API Gateway response dict
@@ -28,11 +95,92 @@ def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
             "Content-Type": "application/json",
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Credentials": True,
+            **(headers or {}),
+        },
+        "body": json_dumps(body),
+    }
+
+
+def create_not_modified_response(etag: str) -> Dict[str, Any]:
+    """
+    Create a 304 response for a conditional GET whose ETag still matches
+
+    Args:
+        etag: Current entity tag of the resource
+
+    Returns:
+        API Gateway response dict with an empty body
+    """
+    return {
+        "statusCode": 304,
+        "headers": {
+            "ETag": etag,
+            "Cache-Control": "private, no-cache",
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Credentials": True,
+            "Access-Control-Expose-Headers": "ETag",
         },
-        "body": json.dumps(body),
+        "body": "",
     }
 
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header against an entity tag (weak comparison)
+
+    Args:
+        if_none_match: Header value, e.g. '"abc", W/"def"' or '*'
+        etag: Current entity tag
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    current = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+
+def get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    """
+    Read a request header case-insensitively
+
+    Args:
+        event: API Gateway event
+        name: Header name
+
+    Returns:
+        Header value or None
+    """
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def format_sse_event(event: str, data: Dict[str, Any]) -> str:
+    """
+    Format a server-sent event
+
+    Args:
+        event: Event name
+        data: JSON-serializable event payload
+
+    Returns:
+        SSE-formatted event string
+    """
+    return f"event: {event}\ndata: {json_dumps(data)}\n\n"
+
+
 def create_error_response(status_code: int, message: str) -> Dict[str, Any]:
     """
     Create a standardized error response
@@ -78,3 +226,52 @@ def validate_required_fields(data: Dict[str, Any], required_fields: list) -> tup
         return False, f"Missing required fields: {', '.join(missing_fields)}"
 
     return True, ""
+
+
+def _summarize_value(name: str, value: Any) -> Any:
+    """Loggable form of a request field: sizes instead of content and long values"""
+    if isinstance(value, (list, tuple)):
+        return f"<{len(value)} items>"
+    if isinstance(value, dict):
+        return f"<{len(value)} keys>"
+    if isinstance(value, str) and (name in REQUEST_LOG_REDACTED_FIELDS or len(value) > REQUEST_LOG_VALUE_MAX_CHARS):
+        return f"<{len(value)} chars>"
+    return value
+
+
+def log_request(event: Dict[str, Any], body: Dict[str, Any], sample_rate: float,
+                request_id: Optional[str] = None) -> bool:
+    """
+    Log a sampled, size-capped structured summary of a request
+
+    Message text and other user content are never logged, only their sizes.
+
+    Args:
+        event: API Gateway event
+        body: Parsed request body
+        sample_rate: Fraction of requests to log (0 disables, 1 logs every request)
+        request_id: Optional request id to correlate with metrics
+
+    Returns:
+        True if the request was logged
+    """
+    if sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate):
+        return False
+
+    record = {
+        'event': 'request',
+        'method': event.get('httpMethod'),
+        'path': event.get('path'),
+        'request_id': request_id,
+        'body_bytes': len(event.get('body') or ''),
+        'body': {name: _summarize_value(name, value) for name, value in body.items()}
+        if isinstance(body, dict) else _summarize_value('', body),
+    }
+    line = json_dumps(record)
+    if len(line) > REQUEST_LOG_MAX_BYTES:
+        # Many or long field names; keep only the shape of the body
+        record['body'] = _summarize_value('', body)
+        record['truncated'] = True
+        line = json_dumps(record)
+    logger.info(line)
+    return True
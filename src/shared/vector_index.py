@@ -0,0 +1,280 @@
+"""
+Memory-mapped, quantized vector index for top-k similarity search
+
+One flat file holds everything a search needs:
+
+    header      b'PAIVEC01', uint32 JSON length, JSON (dtype, count, dimensions,
+                section offsets), padded to HEADER_SIZE bytes
+    vectors     count x dimensions unit vectors, int8 with a per-row scale
+    scales      float32 per row; int8 value * scale = unit-vector component
+    norms       float32 per row, norm of the original embedding
+    id_offsets  uint64 count + 1 byte offsets into ids
+    ids         UTF-8 chunk ids, concatenated
+
+Sections are 64-byte aligned and opened with mmap, so loading copies
+nothing and only the pages a search touches are read. Searches score
+blocks of rows with one BLAS matrix product per block (converting the
+quantized block into a reused float32 buffer that stays in cache) and
+select the top k with argpartition.
+
+float16 storage is not supported: numpy has no fast float16 to float32
+conversion, and converting the blocks made single-query search about five
+times slower than exact float32 search (72 ms vs 13 ms at 100k x 512 on one
+core), for a recall gain of about 0.02 over int8.
+"""
+import json
+import mmap
+import struct
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from src.shared.constants import VECTOR_INDEX_DTYPE, VECTOR_SEARCH_BLOCK_BYTES
+
+MAGIC = b'PAIVEC01'
+FORMAT_VERSION = 1
+HEADER_SIZE = 4096
+ALIGNMENT = 64
+DTYPES = {'int8': '<i1'}
+METRICS = ('cosine', 'dot')
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def quantize(unit_vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize unit vectors
+
+    Args:
+        unit_vectors: float32 rows of norm 1 (or 0)
+        dtype: 'int8' (symmetric, one scale per row)
+
+    Returns:
+        Quantized rows and float32 per-row scales
+    """
+    if dtype != 'int8':
+        raise ValueError(f"Unsupported index dtype: {dtype}")
+
+    scales = (np.abs(unit_vectors).max(axis=1) / 127.0).astype(np.float32)
+    safe = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    quantized = np.rint(unit_vectors / safe[:, None]).astype(np.int8)
+    return quantized, scales
+
+
+def build_index(
+    path: str,
+    vectors: np.ndarray,
+    ids: Sequence[str],
+    dtype: str = VECTOR_INDEX_DTYPE,
+    block_rows: int = 8192
+) -> None:
+    """
+    Write an index file
+
+    Args:
+        path: Output path
+        vectors: count x dimensions embeddings (any float dtype; may be a np.memmap)
+        ids: Chunk id of each row
+        dtype: Stored precision, 'int8'
+        block_rows: Rows converted per step, bounding memory for large inputs
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported index dtype: {dtype}")
+    if vectors.ndim != 2 or len(vectors) != len(ids):
+        raise ValueError("vectors must be 2-D with one row per id")
+
+    count, dimensions = vectors.shape
+    encoded = [chunk_id.encode('utf-8') for chunk_id in ids]
+    id_offsets = np.zeros(count + 1, dtype='<u8')
+    np.cumsum([len(e) for e in encoded], out=id_offsets[1:])
+
+    sizes = {
+        'vectors': count * dimensions * np.dtype(DTYPES[dtype]).itemsize,
+        'scales': count * 4,
+        'norms': count * 4,
+        'id_offsets': (count + 1) * 8,
+        'ids': int(id_offsets[-1]),
+    }
+    header = {
+        'format_version': FORMAT_VERSION,
+        'dtype': dtype,
+        'count': count,
+        'dimensions': dimensions,
+    }
+    header['sections'] = {}
+    offset = HEADER_SIZE
+    for name, size in sizes.items():
+        header['sections'][name] = [offset, size]
+        offset = _align(offset + size)
+    header_bytes = json.dumps(header).encode('utf-8')
+    if len(MAGIC) + 4 + len(header_bytes) > HEADER_SIZE:
+        raise ValueError("Vector index header does not fit in HEADER_SIZE")
+
+    scales = np.empty(count, dtype='<f4')
+    norms = np.empty(count, dtype='<f4')
+    sections = header['sections']
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes)
+
+        f.seek(sections['vectors'][0])
+        for start in range(0, count, block_rows):
+            block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+            block_norms = np.linalg.norm(block, axis=1)
+            unit = block / np.where(block_norms > 0, block_norms, 1.0)[:, None]
+            quantized, block_scales = quantize(unit, dtype)
+            f.write(quantized.astype(DTYPES[dtype], copy=False).tobytes())
+            norms[start:start + len(block)] = block_norms
+            scales[start:start + len(block)] = block_scales
+
+        for name, data in (('scales', scales), ('norms', norms), ('id_offsets', id_offsets)):
+            f.seek(sections[name][0])
+            f.write(data.tobytes())
+        f.seek(sections['ids'][0])
+        for chunk_id in encoded:
+            f.write(chunk_id)
+        # Pad to the aligned end so every section lies inside the file
+        f.truncate(offset)
+
+
+class VectorIndex:
+    """
+    Read-only, memory-mapped view of an index file
+    """
+
+    def __init__(self, path: str, block_rows: Optional[int] = None):
+        """
+        Open an index file without copying it
+
+        Args:
+            path: Index file path
+            block_rows: Rows scored per matrix product (default: as many as fit
+                in VECTOR_SEARCH_BLOCK_BYTES of float32)
+        """
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"Not a vector index file: {path}")
+        (header_length,) = struct.unpack_from('<I', self._mmap, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(bytes(self._mmap[start:start + header_length]))
+        if header['format_version'] != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"Unsupported vector index version: {header['format_version']}")
+        if header['dtype'] not in DTYPES:
+            self._mmap.close()
+            raise ValueError(f"Unsupported index dtype: {header['dtype']}")
+
+        self.path = path
+        self.dtype = header['dtype']
+        self.count = header['count']
+        self.dimensions = header['dimensions']
+        # Past the L2 cache the converted block is evicted before the product reads it
+        self.block_rows = block_rows or max(1, VECTOR_SEARCH_BLOCK_BYTES // (4 * self.dimensions))
+
+        sections = header['sections']
+        self.vectors = self._view('vectors', sections, DTYPES[self.dtype]).reshape(self.count, self.dimensions)
+        self.scales = self._view('scales', sections, '<f4')
+        self.norms = self._view('norms', sections, '<f4')
+        self._id_offsets = self._view('id_offsets', sections, '<u8')
+        self._ids_start = sections['ids'][0]
+
+    def _view(self, name: str, sections: dict, dtype) -> np.ndarray:
+        offset, size = sections[name]
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self._mmap, dtype=dtype, count=size // dtype.itemsize, offset=offset)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __enter__(self) -> 'VectorIndex':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the arrays and unmap the file"""
+        self.vectors = self.scales = self.norms = self._id_offsets = None
+        self._mmap.close()
+
+    def chunk_id(self, row: int) -> str:
+        """Chunk id stored for a row"""
+        start = self._ids_start + int(self._id_offsets[row])
+        end = self._ids_start + int(self._id_offsets[row + 1])
+        return self._mmap[start:end].decode('utf-8')
+
+    def chunk_ids(self, rows: Sequence[int]) -> List[str]:
+        """Chunk ids of several rows"""
+        return [self.chunk_id(int(row)) for row in rows]
+
+    def scores(self, queries: np.ndarray, metric: str = 'cosine') -> np.ndarray:
+        """
+        Score every row against a batch of queries
+
+        Args:
+            queries: m x dimensions float array
+            metric: 'cosine' or 'dot' (dot product with the original, unnormalized embeddings)
+
+        Returns:
+            count x m float32 scores
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unsupported metric: {metric}")
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        if metric == 'cosine':
+            query_norms = np.linalg.norm(queries, axis=1)
+            queries = queries / np.where(query_norms > 0, query_norms, 1.0)[:, None]
+
+        transposed = np.ascontiguousarray(queries.T)
+        scores = np.empty((self.count, len(queries)), dtype=np.float32)
+        buffer = np.empty((self.block_rows, self.dimensions), dtype=np.float32)
+        for start in range(0, self.count, self.block_rows):
+            block = self.vectors[start:start + self.block_rows]
+            rows = len(block)
+            np.copyto(buffer[:rows], block, casting='unsafe')
+            np.dot(buffer[:rows], transposed, out=scores[start:start + rows])
+
+        scores *= self.scales[:, None]
+        if metric == 'dot':
+            scores *= self.norms[:, None]
+        return scores
+
+    def search(self, queries: np.ndarray, k: int = 10, metric: str = 'cosine') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k highest-scoring rows for each query
+
+        Args:
+            queries: One query vector, or an m x dimensions batch
+            k: Results per query (capped at the index size)
+            metric: 'cosine' or 'dot'
+
+        Returns:
+            Row indices and scores, best first; shaped (k,) for one query or (m, k) for a batch
+        """
+        queries = np.asarray(queries)
+        single = queries.ndim == 1
+        if single:
+            queries = queries[None, :]
+        if queries.shape[1] != self.dimensions:
+            raise ValueError(f"Query has {queries.shape[1]} dimensions, index has {self.dimensions}")
+
+        k = min(k, self.count)
+        if k <= 0:
+            empty = np.empty((len(queries), 0))
+            return (empty[0].astype(np.int64), empty[0]) if single else (empty.astype(np.int64), empty)
+
+        scores = self.scores(queries, metric).T
+        if k < self.count:
+            # Partition the scores themselves; negating them first costs a full copy
+            candidates = np.argpartition(scores, self.count - k, axis=1)[:, self.count - k:]
+        else:
+            candidates = np.broadcast_to(np.arange(self.count), scores.shape)
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+        rows = np.take_along_axis(candidates, order, axis=1)
+        top_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        return (rows[0], top_scores[0]) if single else (rows, top_scores)
+
@@ -0,0 +1,87 @@
+"""
+Shared pytest configuration
+"""
+import os
+import boto3
+import pytest
+from moto import mock_aws
+
+# boto3 clients need a region and credentials when first created
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+
+class FakeKMS:
+    """In-memory stand-in for the KMS client that counts calls"""
+
+    def __init__(self):
+        self.calls = {'encrypt': 0, 'decrypt': 0, 'generate_data_key': 0}
+
+    def encrypt(self, KeyId, Plaintext):
+        self.calls['encrypt'] += 1
+        return {'CiphertextBlob': b'kms:' + Plaintext}
+
+    def decrypt(self, CiphertextBlob, KeyId=None):
+        self.calls['decrypt'] += 1
+        return {'Plaintext': CiphertextBlob[len(b'kms:'):]}
+
+    def generate_data_key(self, KeyId, KeySpec):
+        self.calls['generate_data_key'] += 1
+        key = os.urandom(32)
+        return {'Plaintext': key, 'CiphertextBlob': b'kms:' + key}
+
+
+@pytest.fixture
+def fake_kms(monkeypatch):
+    """KMS client stand-in wired into the encryption module"""
+    from src.shared import encryption
+
+    kms = FakeKMS()
+    monkeypatch.setattr(encryption, 'get_kms_client', lambda: kms)
+    return kms
+
+
+@pytest.fixture
+def dynamodb_tables():
+    """Mocked conversations and messages tables; shared clients are recreated inside the mock"""
+    from src.shared.aws_clients import reset_clients
+
+    with mock_aws():
+        reset_clients()
+        resource = boto3.resource('dynamodb')
+        resource.create_table(
+            TableName='PAI-Conversations',
+            BillingMode='PAY_PER_REQUEST',
+            AttributeDefinitions=[
+                {'AttributeName': 'conversation_id', 'AttributeType': 'S'},
+                {'AttributeName': 'user_id', 'AttributeType': 'S'},
+                {'AttributeName': 'updated_at', 'AttributeType': 'S'}
+            ],
+            KeySchema=[{'AttributeName': 'conversation_id', 'KeyType': 'HASH'}],
+            GlobalSecondaryIndexes=[{
+                'IndexName': 'UserIdUpdatedIndex',
+                'KeySchema': [
+                    {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+                    {'AttributeName': 'updated_at', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {
+                    'ProjectionType': 'INCLUDE',
+                    'NonKeyAttributes': ['created_at', 'message_count', 'title']
+                }
+            }]
+        )
+        resource.create_table(
+            TableName='PAI-Messages',
+            BillingMode='PAY_PER_REQUEST',
+            AttributeDefinitions=[
+                {'AttributeName': 'conversation_id', 'AttributeType': 'S'},
+                {'AttributeName': 'seq', 'AttributeType': 'N'}
+            ],
+            KeySchema=[
+                {'AttributeName': 'conversation_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'seq', 'KeyType': 'RANGE'}
+            ]
+        )
+        yield resource
+        reset_clients()
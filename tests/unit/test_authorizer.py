@@ -0,0 +1,97 @@
+"""
+Unit tests for the API key authorizer
+"""
+import json
+import pytest
+from src.authorizer import handler
+from src.shared.aws_clients import set_client, reset_clients
+from src.shared.rate_limiter import RateLimiter
+
+METHOD_ARN = 'arn:aws:execute-api:us-east-1:123456789012:api/dev/POST/chat'
+
+
+class StubSecretsManager:
+    def __init__(self, secret=None):
+        self.secret = secret or {'api_key': 'good-key'}
+        self.calls = 0
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        return {'SecretString': json.dumps(self.secret)}
+
+
+@pytest.fixture
+def secrets():
+    stub = StubSecretsManager()
+    set_client('secretsmanager', stub)
+    handler.api_keys.invalidate()
+    handler.decision_cache.clear()
+    yield stub
+    reset_clients()
+    handler.api_keys.invalidate()
+    handler.decision_cache.clear()
+
+
+def authorize(token):
+    return handler.lambda_handler({'authorizationToken': f'Bearer {token}', 'methodArn': METHOD_ARN}, None)
+
+
+def effect(policy):
+    return policy['policyDocument']['Statement'][0]['Effect']
+
+
+def test_valid_key_is_allowed_and_invalid_denied(secrets):
+    """Test the bearer token is compared with the stored key"""
+    assert effect(authorize('good-key')) == 'Allow'
+    assert effect(authorize('bad-key')) == 'Deny'
+
+
+def test_secret_is_fetched_once_and_decisions_cached(secrets):
+    """Test warm calls reuse the cached secret and decision"""
+    for _ in range(5):
+        assert effect(authorize('good-key')) == 'Allow'
+    assert effect(authorize('bad-key')) == 'Deny'
+
+    assert secrets.calls == 1
+
+
+def test_many_keys_map_to_principals_and_context(secrets):
+    """Test hashed keys in 'api_keys' authorize their own principal and context"""
+    secrets.secret = {'api_keys': {
+        handler.hash_token('key-a'): {'principal': 'team-a', 'context': {'tier': 'pro', 'seats': 5}},
+        handler.hash_token('key-b'): 'team-b',
+    }}
+
+    policy = authorize('key-a')
+    assert policy['principalId'] == 'team-a'
+    assert policy['context'] == {'principal': 'team-a', 'tier': 'pro', 'seats': '5'}
+    assert authorize('key-b')['principalId'] == 'team-b'
+    assert effect(authorize('good-key')) == 'Deny'
+
+
+def test_allow_covers_the_whole_stage(secrets):
+    """Test the allowed resource is widened to every route of the stage"""
+    policy = authorize('good-key')
+
+    assert policy['policyDocument']['Statement'][0]['Resource'] == 'arn:aws:execute-api:us-east-1:123456789012:api/dev/*'
+
+
+def test_rotated_secret_replaces_cached_decisions(secrets):
+    """Test a refetched secret invalidates decisions made with the old keys"""
+    assert effect(authorize('good-key')) == 'Allow'
+    secrets.secret = {'api_key': 'rotated-key'}
+    handler.api_keys.invalidate()
+
+    assert effect(authorize('good-key')) == 'Deny'
+    assert effect(authorize('rotated-key')) == 'Allow'
+
+
+def test_over_limit_key_is_denied_with_retry_after(secrets, monkeypatch):
+    """Test a key over its request limit is denied with the retry delay in the context"""
+    monkeypatch.setattr(handler, 'rate_limiter', RateLimiter(requests_per_minute=1, input_tokens_per_minute=0))
+
+    assert effect(authorize('good-key')) == 'Allow'
+    denied = authorize('good-key')
+
+    assert effect(denied) == 'Deny'
+    assert denied['context'] == {'message': handler.ERROR_RATE_LIMIT, 'retryAfter': '60'}
@@ -0,0 +1,60 @@
+"""
+Unit tests for Bedrock client
+"""
+import json
+import pytest
+from src.chatbot import bedrock_client
+from src.chatbot.bedrock_client import BedrockClient
+
+
+class StubRuntime:
+    """bedrock-runtime stand-in replaying a fixed event stream"""
+
+    def __init__(self, events):
+        self.events = events
+        self.requests = []
+
+    def invoke_model_with_response_stream(self, **kwargs):
+        self.requests.append(kwargs)
+        return {'body': iter({'chunk': {'bytes': json.dumps(e).encode()}} for e in self.events)}
+
+
+ANTHROPIC_EVENTS = [
+    {'type': 'message_start', 'message': {'usage': {'input_tokens': 12, 'output_tokens': 1}}},
+    {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}},
+    {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': 'Hello'}},
+    {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': ' there'}},
+    {'type': 'content_block_stop', 'index': 0},
+    {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'}, 'usage': {'output_tokens': 3}},
+    {'type': 'message_stop', 'amazon-bedrock-invocationMetrics': {'inputTokenCount': 12, 'outputTokenCount': 3}},
+]
+
+NOVA_EVENTS = [
+    {'messageStart': {'role': 'assistant'}},
+    {'contentBlockDelta': {'delta': {'text': 'Hello'}, 'contentBlockIndex': 0}},
+    {'contentBlockDelta': {'delta': {'text': ' there'}, 'contentBlockIndex': 0}},
+    {'contentBlockStop': {'contentBlockIndex': 0}},
+    {'messageStop': {'stopReason': 'end_turn'}},
+    {'metadata': {'usage': {'inputTokens': 12, 'outputTokens': 3}}},
+]
+
+
+@pytest.mark.parametrize('model_id,events', [
+    ('anthropic.claude-3-haiku-20240307-v1:0', ANTHROPIC_EVENTS),
+    ('amazon.nova-lite-v1:0', NOVA_EVENTS),
+])
+def test_stream_response_normalizes_events(monkeypatch, model_id, events):
+    """Test both provider event formats yield the same deltas and final usage"""
+    stub = StubRuntime(events)
+    monkeypatch.setattr(bedrock_client, 'get_bedrock_runtime', lambda: stub)
+
+    stream = list(BedrockClient(model_id).stream_response([{'role': 'user', 'content': 'Hi'}]))
+
+    assert [e['text'] for e in stream if e['type'] == 'delta'] == ['Hello', ' there']
+    assert stream[-1] == {
+        'type': 'done',
+        'message': 'Hello there',
+        'stop_reason': 'end_turn',
+        'usage': {'input_tokens': 12, 'output_tokens': 3},
+        'model': model_id
+    }
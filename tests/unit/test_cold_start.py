@@ -0,0 +1,45 @@
+"""
+Import-time budget for the Lambda handlers
+
+Handlers must not import boto3 or create AWS clients at module import;
+both are deferred to the first request that needs them.
+"""
+import json
+import subprocess
+import sys
+import pytest
+
+# Generous enough for slow CI machines; importing boto3 alone exceeds it on most
+IMPORT_BUDGET_MS = 150
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{'ms': elapsed, 'loaded': [m for m in ('boto3', 'botocore.client', 'botocore.config') if m in sys.modules]}}))
+"""
+
+
+def measure_import(module):
+    # A fresh interpreter so modules cached by other tests don't hide the cost
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(module=module)],
+        capture_output=True, text=True, check=True,
+        env={'AWS_DEFAULT_REGION': 'us-east-1', 'PATH': ''}
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize('module', ['src.chatbot.handler', 'src.authorizer.handler'])
+def test_handler_import_defers_aws_sdk(module):
+    """Test importing a handler loads neither boto3 nor botocore's client machinery"""
+    assert measure_import(module)['loaded'] == []
+
+
+@pytest.mark.parametrize('module', ['src.chatbot.handler', 'src.authorizer.handler'])
+def test_handler_import_within_budget(module):
+    """Test importing a handler stays within the cold-start import budget"""
+    # Best of three to smooth out scheduler noise
+    elapsed = min(measure_import(module)['ms'] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET_MS, f"{module} imported in {elapsed:.0f} ms"
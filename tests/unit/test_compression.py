@@ -0,0 +1,70 @@
+"""
+Unit tests for the content compression codec
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from benchmarks.compression_bench import run_benchmark, synthetic_transcripts
+from src.shared.compression import ContentCodec, decode_content, make_codec, CODEC_RAW, CODEC_ZLIB
+
+
+def test_small_values_are_stored_raw():
+    """Test values under the threshold skip compression but still carry the header byte"""
+    codec = ContentCodec('zlib', min_bytes=64)
+
+    small = codec.encode('hi there')
+    large = codec.encode('hello world ' * 100)
+
+    assert small[0] == CODEC_RAW and decode_content(small) == 'hi there'
+    assert large[0] == CODEC_ZLIB and len(large) < 200
+    assert decode_content(large) == 'hello world ' * 100
+
+
+def test_incompressible_values_fall_back_to_raw():
+    """Test compression is skipped when it would not shrink the value"""
+    text = 'a7Qz'
+
+    encoded = ContentCodec('zlib', min_bytes=1).encode(text)
+
+    assert encoded[0] == CODEC_RAW and decode_content(encoded) == text
+
+
+@pytest.mark.parametrize('name', ['zlib', 'zstd'])
+def test_concurrent_encodes_round_trip(name):
+    """Test one codec shared by many threads encodes every value intact"""
+    if name == 'zstd':
+        pytest.importorskip('zstandard')
+    codec = ContentCodec(name, min_bytes=16)
+    values = [f'message {i} ' * (50 + i) for i in range(64)]
+    start = threading.Barrier(8)
+
+    def encode(index):
+        if index < 8:
+            # The first eight encodes start together so the threads overlap
+            start.wait()
+        return codec.encode(values[index])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        encoded = list(pool.map(encode, range(len(values))))
+
+    assert [decode_content(e) for e in encoded] == values
+    assert all(e[0] == codec.codec_id for e in encoded)
+
+
+def test_unknown_codecs_are_rejected():
+    """Test configuration and decoding errors for unsupported codecs"""
+    assert make_codec('none') is None
+    with pytest.raises(ValueError):
+        make_codec('lz4')
+    with pytest.raises(ValueError):
+        decode_content(b'\x09payload')
+
+
+def test_benchmark_reports_savings():
+    """Test the benchmark compares stored bytes and WCU with and without compression"""
+    report = run_benchmark(synthetic_transcripts(count=3, turns=4))
+
+    results = {r['name']: r for r in report['results']}
+    assert report['meta']['messages'] == 24
+    assert results['envelope+zlib']['bytes'] < results['envelope']['bytes']
+    assert results['envelope+zlib']['wcu_saved_pct'] > 0
@@ -0,0 +1,37 @@
+"""
+Unit tests for shared concurrency helpers
+"""
+import contextvars
+from src.shared.concurrency import AdaptiveLimiter, get_executor
+
+
+def test_executor_tasks_see_submitter_context():
+    """Test pool tasks run in a copy of the submitting thread's context"""
+    variable = contextvars.ContextVar('variable', default=None)
+    variable.set('request-1')
+
+    assert get_executor('context-test', 1).submit(variable.get).result() == 'request-1'
+
+
+def test_limiter_halves_on_throttle_and_recovers():
+    """Test the limit halves on throttling and grows by one after a full window of successes"""
+    limiter = AdaptiveLimiter(8)
+
+    assert limiter.acquire(timeout=0)
+    limiter.release(throttled=True)
+    assert limiter.limit == 4
+
+    for _ in range(4):
+        assert limiter.acquire(timeout=0)
+        limiter.release()
+    assert limiter.limit == 5
+
+
+def test_limiter_blocks_beyond_limit():
+    """Test acquire times out once the limit is reached"""
+    limiter = AdaptiveLimiter(1)
+
+    assert limiter.acquire(timeout=0)
+    assert not limiter.acquire(timeout=0.01)
+    limiter.release()
+    assert limiter.acquire(timeout=0)
@@ -0,0 +1,132 @@
+"""
+Unit tests for the token-budget context builder
+"""
+import threading
+from src.chatbot.context_builder import ContextBuilder, estimate_tokens, normalize_alternation
+
+
+class FakeConversationManager:
+    """In-memory history and summary store"""
+
+    def __init__(self, history):
+        self.history = history
+        self.summary = (None, 0)
+
+    def get_conversation_history(self, conversation_id, limit=10):
+        return self.history[-limit:]
+
+    def get_messages(self, conversation_id, since_seq=None, limit=None):
+        return [m for m in self.history if m['seq'] > since_seq][:limit]
+
+    def get_summary(self, conversation_id):
+        return self.summary
+
+    def save_summary(self, conversation_id, summary, through_seq):
+        self.summary = (summary, through_seq)
+        return True
+
+
+def make_history(count, size=40):
+    roles = ['user', 'assistant']
+    return [{'role': roles[i % 2], 'content': f"{i:03d}" + "x" * (size - 3), 'seq': i + 1} for i in range(count)]
+
+
+def test_estimate_tokens():
+    """Test the estimator rounds up at four characters per token"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_history_fits_budget_and_starts_with_user():
+    """Test the newest messages are kept within the budget with valid alternation"""
+    builder = ContextBuilder(FakeConversationManager(make_history(20)), token_budget=100)
+
+    context = builder.build('c1', 'next question')
+
+    assert context['input_tokens_estimate'] <= 100
+    assert context['messages'][0]['role'] == 'user'
+    assert [m['role'] for m in context['messages']] == ['user', 'assistant'] * (len(context['messages']) // 2) + ['user']
+    assert context['messages'][-2]['content'].startswith('019')
+
+
+def test_short_messages_are_not_dropped_by_count():
+    """Test many short turns all fit when the budget allows"""
+    builder = ContextBuilder(FakeConversationManager(make_history(30, size=4)), token_budget=1000)
+
+    context = builder.build('c1', 'hi')
+
+    assert context['history_messages'] == 30
+
+
+def test_normalize_alternation_merges_orphan_user_message():
+    """Test a stored user message without a reply is merged with the next one"""
+    messages = normalize_alternation([
+        {'role': 'assistant', 'content': 'dangling'},
+        {'role': 'user', 'content': 'a'},
+        {'role': 'user', 'content': 'b'}
+    ])
+
+    assert messages == [{'role': 'user', 'content': 'a\n\nb'}]
+
+
+def test_dropped_turns_fold_into_summary():
+    """Test dropped messages are summarized and the summary joins the system prompt"""
+    manager = FakeConversationManager(make_history(20))
+    folded = []
+
+    def summarizer(previous, messages):
+        folded.extend(messages)
+        return f"summary of {len(messages)} messages"
+
+    builder = ContextBuilder(manager, token_budget=150, summarizer=summarizer, summary_min_messages=2)
+    context = builder.build('c1', 'next question', system_prompt='Be brief.')
+
+    context['summary_write'].result()
+
+    assert context['summary_used'] is True
+    assert context['system_prompt'].startswith('Be brief.')
+    assert 'summary of' in context['system_prompt']
+    assert manager.summary[1] == folded[-1]['seq']
+    assert context['input_tokens_estimate'] <= 150
+
+
+def test_turns_older_than_the_history_window_are_folded():
+    """Test messages before the fetched window are summarized, oldest first, a capped batch per turn"""
+    manager = FakeConversationManager(make_history(40, size=4))
+    folded = []
+
+    def summarizer(previous, messages):
+        folded.append([m['seq'] for m in messages])
+        return f"summary through {messages[-1]['seq']}"
+
+    builder = ContextBuilder(manager, token_budget=1000, max_messages=10, summarizer=summarizer,
+                             summary_min_messages=2, summary_fold_max_messages=20)
+    first = builder.build('c1', 'next')
+    first['summary_write'].result()
+    second = builder.build('c1', 'next')
+    second['summary_write'].result()
+
+    assert folded == [list(range(1, 21)), list(range(21, 31))]
+    assert manager.summary == ('summary through 30', 30)
+    assert second['history_messages'] == 10 and 'summary through 30' in second['system_prompt']
+
+
+def test_slow_summary_update_does_not_block_the_turn():
+    """Test a summarizer past its time budget finishes in the background while the stored summary is used"""
+    manager = FakeConversationManager(make_history(20))
+    manager.summary = ('stored summary', 2)
+    release = threading.Event()
+
+    def summarizer(previous, messages):
+        release.wait(5)
+        return 'new summary'
+
+    builder = ContextBuilder(manager, token_budget=150, summarizer=summarizer,
+                             summary_min_messages=2, summary_timeout=0.01)
+    context = builder.build('c1', 'next question')
+
+    assert 'stored summary' in context['system_prompt'] and not context['summary_write'].done()
+    release.set()
+    assert context['summary_write'].result() == 'new summary'
+    assert manager.summary[0] == 'new summary'
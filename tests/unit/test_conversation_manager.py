@@ -0,0 +1,245 @@
+"""
+Unit tests for conversation manager
+"""
+import json
+import pytest
+from src.chatbot.conversation_manager import ConversationManager, ConversationNotFound
+from src.shared.compression import ContentCodec
+from src.shared.encryption import EncryptionManager
+
+
+def test_create_and_get_conversation(dynamodb_tables):
+    """Test a new conversation stores a header and one message item"""
+    manager = ConversationManager()
+    conversation_id = manager.create_conversation('user-1', {'role': 'user', 'content': 'Hi'})
+    manager.add_message(conversation_id, {'role': 'assistant', 'content': 'Hello!'})
+
+    conversation = manager.get_conversation(conversation_id)
+
+    assert conversation['user_id'] == 'user-1'
+    assert conversation['message_count'] == 2
+    assert 'messages' not in dynamodb_tables.Table('PAI-Conversations').get_item(
+        Key={'conversation_id': conversation_id})['Item']
+    assert [m['content'] for m in conversation['messages']] == ['Hi', 'Hello!']
+
+
+def test_history_reads_only_the_tail(dynamodb_tables):
+    """Test get_conversation_history returns the newest N messages in order"""
+    manager = ConversationManager()
+    conversation_id = manager.create_conversation('user-1', {'role': 'user', 'content': 'm1'})
+    for i in range(2, 8):
+        manager.add_message(conversation_id, {'role': 'user', 'content': f'm{i}'})
+
+    history = manager.get_conversation_history(conversation_id, limit=3)
+
+    assert [m['content'] for m in history] == ['m5', 'm6', 'm7']
+
+
+def test_history_of_missing_conversation_raises(dynamodb_tables):
+    """Test reading the history of an unknown conversation raises ConversationNotFound"""
+    with pytest.raises(ConversationNotFound):
+        ConversationManager().get_conversation_history('missing')
+
+
+def test_legacy_conversation_migrates_on_read(dynamodb_tables):
+    """Test a single-item conversation is moved to per-message items lazily"""
+    dynamodb_tables.Table('PAI-Conversations').put_item(Item={
+        'conversation_id': 'legacy',
+        'user_id': 'user-1',
+        'created_at': '2024-01-01T00:00:00',
+        'updated_at': '2024-01-01T00:00:00',
+        'messages': [
+            {'role': 'user', 'content': 'old question', 'timestamp': '2024-01-01T00:00:00'},
+            {'role': 'assistant', 'content': 'old answer', 'timestamp': '2024-01-01T00:00:01'}
+        ]
+    })
+    manager = ConversationManager()
+
+    history = manager.get_conversation_history('legacy', limit=10)
+    assert [m['content'] for m in history] == ['old question', 'old answer']
+
+    manager.add_message('legacy', {'role': 'user', 'content': 'new question'})
+    conversation = manager.get_conversation('legacy')
+
+    assert conversation['message_count'] == 3
+    assert [m['content'] for m in conversation['messages']] == ['old question', 'old answer', 'new question']
+
+
+def test_add_message_migrates_legacy_conversation(dynamodb_tables):
+    """Test appending to an unread legacy conversation keeps sequence numbers contiguous"""
+    dynamodb_tables.Table('PAI-Conversations').put_item(Item={
+        'conversation_id': 'legacy',
+        'user_id': 'user-1',
+        'created_at': '2024-01-01T00:00:00',
+        'updated_at': '2024-01-01T00:00:00',
+        'messages': [{'role': 'user', 'content': 'old question', 'timestamp': '2024-01-01T00:00:00'}]
+    })
+    manager = ConversationManager()
+
+    assert manager.add_message('legacy', {'role': 'assistant', 'content': 'answer'}) is True
+    assert [m['content'] for m in manager.get_conversation_history('legacy')] == ['old question', 'answer']
+
+
+def test_encrypted_messages_decrypt_lazily(dynamodb_tables, fake_kms):
+    """Test content is only decrypted for messages that are read"""
+    manager = ConversationManager(encryption_manager=EncryptionManager('key-id'))
+    conversation_id = manager.create_conversation('user-1', {'role': 'user', 'content': 'first'})
+    manager.add_message(conversation_id, {'role': 'assistant', 'content': 'second'})
+    manager.add_message(conversation_id, {'role': 'user', 'content': 'third'})
+
+    conversation = manager.get_conversation(conversation_id)
+    assert conversation['messages'][2]['content'] == 'third'
+    assert manager.last_decrypt_stats.as_dict() == {'fetched': 3, 'decrypted': 1, 'skipped': 2}
+
+    assert json.loads(json.dumps(conversation['messages']))[0]['content'] == 'first'
+    assert manager.last_decrypt_stats.skipped == 0
+
+
+def test_history_batch_decrypts(dynamodb_tables, fake_kms):
+    """Test history is decrypted as one batch"""
+    manager = ConversationManager(encryption_manager=EncryptionManager('key-id', mode='kms'))
+    conversation_id = manager.create_conversation('user-1', {'role': 'user', 'content': 'm1'})
+    for i in range(2, 6):
+        manager.add_message(conversation_id, {'role': 'user', 'content': f'm{i}'})
+    manager.history_cache.clear()
+    fake_kms.calls['decrypt'] = 0
+
+    history = manager.get_conversation_history(conversation_id, limit=3)
+
+    assert [m['content'] for m in history] == ['m3', 'm4', 'm5']
+    assert fake_kms.calls['decrypt'] == 3
+    assert manager.last_decrypt_stats.as_dict() == {'fetched': 3, 'decrypted': 3, 'skipped': 0}
+
+
+def test_history_cache_hit_after_write_through(dynamodb_tables, fake_kms):
+    """Test follow-up turns are served from the cache without decrypting"""
+    manager = ConversationManager(encryption_manager=EncryptionManager('key-id', mode='kms'))
+    conversation_id = manager.create_conversation('user-1', {'role': 'user', 'content': 'Hi'})
+    manager.add_message(conversation_id, {'role': 'assistant', 'content': 'Hello!'})
+    fake_kms.calls['decrypt'] = 0
+
+    history = manager.get_conversation_history(conversation_id)
+
+    assert [m['content'] for m in history] == ['Hi', 'Hello!']
+    assert manager.history_cache_stats == {'hits': 1, 'misses': 0}
+    assert fake_kms.calls['decrypt'] == 0
+
+
+def test_history_cache_detects_stale_entry(dynamodb_tables):
+    """Test a write from another container invalidates the cached entry"""
+    manager = ConversationManager()
+    other_container = ConversationManager()
+    conversation_id = manager.create_conversation('user-1', {'role': 'user', 'content': 'Hi'})
+
+    other_container.add_message(conversation_id, {'role': 'assistant', 'content': 'Hello!'})
+    history = manager.get_conversation_history(conversation_id)
+
+    assert [m['content'] for m in history] == ['Hi', 'Hello!']
+    assert manager.history_cache_stats == {'hits': 0, 'misses': 1}
+    manager.get_conversation_history(conversation_id)
+    assert manager.history_cache_stats['hits'] == 1
+
+
+def test_append_turn_stores_both_messages_atomically(dynamodb_tables):
+    """Test a turn on a new and an existing conversation lands in one write each"""
+    manager = ConversationManager()
+
+    turn = manager.append_turn(None, {'role': 'user', 'content': 'Q1'}, {'role': 'assistant', 'content': 'A1'})
+    manager.append_turn(turn['conversation_id'], {'role': 'user', 'content': 'Q2'},
+                        {'role': 'assistant', 'content': 'A2'})
+
+    manager.history_cache.clear()
+    conversation = manager.get_conversation(turn['conversation_id'])
+    assert conversation['message_count'] == 4
+    assert [m['content'] for m in conversation['messages']] == ['Q1', 'A1', 'Q2', 'A2']
+    assert 'write_units' in turn
+
+
+def test_append_turn_retries_after_concurrent_append(dynamodb_tables):
+    """Test a stale cached version is detected by the transaction condition"""
+    manager = ConversationManager()
+    other_container = ConversationManager()
+    conversation_id = manager.create_conversation('user-1', {'role': 'user', 'content': 'Hi'})
+    other_container.add_message(conversation_id, {'role': 'assistant', 'content': 'Hello!'})
+
+    manager.append_turn(conversation_id, {'role': 'user', 'content': 'Q'}, {'role': 'assistant', 'content': 'A'})
+
+    history = other_container.get_conversation_history(conversation_id)
+    assert [m['content'] for m in history] == ['Hi', 'Hello!', 'Q', 'A']
+
+
+def test_eager_turn_keeps_user_message_without_commit(dynamodb_tables):
+    """Test eager mode stores the user message before the reply exists"""
+    manager = ConversationManager()
+    conversation_id = manager.create_conversation('user-1', {'role': 'user', 'content': 'Hi'})
+
+    pending = manager.begin_turn(conversation_id, {'role': 'user', 'content': 'Q'}, eager_write=True)
+    pending.wait_user_message()
+    assert [m['content'] for m in ConversationManager().get_conversation_history(conversation_id)] == ['Hi', 'Q']
+
+    pending.commit({'role': 'assistant', 'content': 'A'})
+    assert [m['content'] for m in ConversationManager().get_conversation_history(conversation_id)] == ['Hi', 'Q', 'A']
+
+
+def test_list_conversations_pages_newest_first(dynamodb_tables):
+    """Test listing returns metadata only, newest first, across cursor pages"""
+    manager = ConversationManager()
+    ids = [manager.create_conversation('user-1', {'role': 'user', 'content': f'c{i}' * 500}) for i in range(5)]
+    manager.create_conversation('user-2', {'role': 'user', 'content': 'other'})
+    manager.add_message(ids[0], {'role': 'assistant', 'content': 'bumped'})
+
+    first = manager.list_conversations('user-1', limit=3)
+    second = manager.list_conversations('user-1', limit=3, cursor=first['next_cursor'])
+
+    listed = first['conversations'] + second['conversations']
+    assert [c['conversation_id'] for c in listed] == [ids[0], ids[4], ids[3], ids[2], ids[1]]
+    assert set(listed[0]) == {'conversation_id', 'created_at', 'updated_at', 'message_count'}
+    assert listed[0]['message_count'] == 2
+    assert second['next_cursor'] is None
+
+
+def test_list_conversations_rejects_foreign_cursor(dynamodb_tables):
+    """Test a cursor issued for one user cannot page another user's index"""
+    manager = ConversationManager()
+    for i in range(2):
+        manager.create_conversation('user-1', {'role': 'user', 'content': f'c{i}'})
+    cursor = manager.list_conversations('user-1', limit=1)['next_cursor']
+
+    with pytest.raises(ValueError):
+        manager.list_conversations('user-2', cursor=cursor)
+    with pytest.raises(ValueError):
+        manager.list_conversations('user-1', cursor='not-a-cursor')
+
+
+def test_get_messages_windows_and_projects(dynamodb_tables, fake_kms):
+    """Test get_messages pages by sequence, selects fields and decrypts only returned content"""
+    manager = ConversationManager(encryption_manager=EncryptionManager('key-id', mode='kms'))
+    conversation_id = manager.create_conversation('user-1', {'role': 'user', 'content': 'm1'})
+    for i in range(2, 7):
+        manager.add_message(conversation_id, {'role': 'user', 'content': f'm{i}'})
+    fake_kms.calls['decrypt'] = 0
+
+    assert manager.get_conversation_header(conversation_id)['message_count'] == 6
+    page = manager.decrypt_messages(manager.get_messages(conversation_id, since_seq=2, limit=2))
+    assert [(m['seq'], m['content']) for m in page] == [(3, 'm3'), (4, 'm4')]
+    assert fake_kms.calls['decrypt'] == 2
+
+    tail = manager.get_messages(conversation_id, limit=2, fields=['role'])
+    assert tail == [{'seq': 5, 'role': 'user'}, {'seq': 6, 'role': 'user'}]
+    assert manager.decrypt_messages(tail) == tail and fake_kms.calls['decrypt'] == 2
+
+    timestamp = page[-1]['timestamp']
+    assert [m['seq'] for m in manager.get_messages(conversation_id, since_timestamp=timestamp, limit=1)] == [5]
+
+
+def test_unencrypted_content_is_compressed(dynamodb_tables):
+    """Test a codec stores long unencrypted content as binary while old string items still read"""
+    manager = ConversationManager(codec=ContentCodec('zlib', min_bytes=100))
+    conversation_id = ConversationManager().create_conversation('user-1', {'role': 'user', 'content': 'old'})
+    manager.add_message(conversation_id, {'role': 'assistant', 'content': 'long answer ' * 50})
+
+    stored = dynamodb_tables.Table('PAI-Messages').get_item(Key={'conversation_id': conversation_id, 'seq': 2})['Item']
+    assert len(stored['content'].value) < 100
+
+    history = ConversationManager().get_conversation_history(conversation_id)
+    assert [m['content'] for m in history] == ['old', 'long answer ' * 50]
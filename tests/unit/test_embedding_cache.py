@@ -0,0 +1,107 @@
+"""
+Unit tests for BedrockClient.embed and the embedding cache
+"""
+import io
+import json
+import threading
+import boto3
+import numpy as np
+import pytest
+from moto import mock_aws
+from src.chatbot import bedrock_client
+from src.chatbot.bedrock_client import BedrockClient
+from src.chatbot.embedding_cache import EmbeddingCache
+from src.shared.aws_clients import reset_clients
+
+
+class EmbeddingRuntime:
+    """bedrock-runtime stand-in answering Titan and Cohere embedding requests"""
+
+    def __init__(self):
+        self.requests = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def vector(text, dimensions):
+        return [float(len(text) + i) for i in range(dimensions)]
+
+    def invoke_model(self, modelId, body, **kwargs):
+        request = json.loads(body)
+        with self._lock:
+            self.requests.append(request)
+        if modelId.startswith('cohere.'):
+            payload = {'embeddings': [self.vector(t, 1024) for t in request['texts']]}
+        else:
+            payload = {'embedding': self.vector(request['inputText'], request['dimensions']), 'inputTextTokenCount': 3}
+        return {'body': io.BytesIO(json.dumps(payload).encode())}
+
+
+@pytest.fixture
+def runtime(monkeypatch):
+    stub = EmbeddingRuntime()
+    monkeypatch.setattr(bedrock_client, 'get_bedrock_runtime', lambda: stub)
+    return stub
+
+
+def test_embed_dedupes_and_returns_contiguous_float32(runtime):
+    """Test identical texts are embedded once and the result is a C-contiguous float32 matrix"""
+    client = BedrockClient('anthropic.claude-3-haiku', embedding_model_id='amazon.titan-embed-text-v2:0')
+
+    vectors = client.embed(['alpha', 'beta', 'alpha'], dimensions=4)
+
+    assert vectors.shape == (3, 4) and vectors.dtype == np.float32
+    assert vectors.flags['C_CONTIGUOUS']
+    assert sorted(r['inputText'] for r in runtime.requests) == ['alpha', 'beta']
+    assert all(r['dimensions'] == 4 and r['normalize'] for r in runtime.requests)
+    np.testing.assert_array_equal(vectors[0], vectors[2])
+    np.testing.assert_array_equal(vectors[1], EmbeddingRuntime.vector('beta', 4))
+
+
+def test_embed_serves_repeats_from_memory(runtime):
+    """Test repeated texts are not re-embedded and the cache key includes the dimensions"""
+    client = BedrockClient('anthropic.claude-3-haiku', embedding_model_id='amazon.titan-embed-text-v2:0')
+
+    client.embed(['alpha', 'beta'], dimensions=4)
+    again = client.embed(['beta', 'gamma'], dimensions=4)
+    client.embed(['beta'], dimensions=8)
+
+    assert [r['inputText'] for r in runtime.requests[2:]] == ['gamma', 'beta']
+    assert client.embedding_cache.stats['memory_hits'] == 1
+    np.testing.assert_array_equal(again[0], EmbeddingRuntime.vector('beta', 4))
+
+
+def test_cohere_texts_are_batched(runtime):
+    """Test Cohere requests carry up to 96 texts each"""
+    client = BedrockClient('anthropic.claude-3-haiku', embedding_model_id='cohere.embed-english-v3')
+
+    vectors = client.embed([f'text {i}' for i in range(150)], input_type='search_query')
+
+    assert vectors.shape == (150, 1024)
+    assert sorted(len(r['texts']) for r in runtime.requests) == [54, 96]
+    assert {r['input_type'] for r in runtime.requests} == {'search_query'}
+
+
+def test_shared_tier_serves_other_containers(runtime):
+    """Test vectors cached by one container are read from DynamoDB by another"""
+    with mock_aws():
+        reset_clients()
+        boto3.resource('dynamodb').create_table(
+            TableName='PAI-EmbeddingCache',
+            BillingMode='PAY_PER_REQUEST',
+            AttributeDefinitions=[{'AttributeName': 'cache_key', 'AttributeType': 'S'}],
+            KeySchema=[{'AttributeName': 'cache_key', 'KeyType': 'HASH'}]
+        )
+
+        def container():
+            return BedrockClient('anthropic.claude-3-haiku',
+                                 embedding_model_id='amazon.titan-embed-text-v2:0',
+                                 embedding_cache=EmbeddingCache(table_name='PAI-EmbeddingCache'))
+
+        warm = container().embed(['alpha', 'beta'], dimensions=4)
+        cold = container()
+        vectors = cold.embed(['beta', 'alpha'], dimensions=4)
+
+        assert len(runtime.requests) == 2
+        assert cold.embedding_cache.stats['dynamodb_hits'] == 2
+        np.testing.assert_array_equal(vectors, warm[::-1])
+    reset_clients()
@@ -0,0 +1,68 @@
+"""
+Unit tests for encryption manager
+"""
+from src.shared.compression import ContentCodec
+from src.shared.encryption import EncryptionManager, ENVELOPE_PREFIX, ENVELOPE_CODEC_PREFIX, KMS_CODEC_PREFIX
+
+
+def test_envelope_round_trip_uses_one_data_key(fake_kms):
+    """Test envelope mode encrypts many values with a single KMS call"""
+    manager = EncryptionManager('key-id')
+
+    ciphertexts = [manager.encrypt(f"message {i}") for i in range(10)]
+
+    assert all(c.startswith(ENVELOPE_PREFIX) for c in ciphertexts)
+    assert [manager.decrypt(c) for c in ciphertexts] == [f"message {i}" for i in range(10)]
+    assert fake_kms.calls == {'encrypt': 0, 'decrypt': 0, 'generate_data_key': 1}
+
+
+def test_envelope_handles_large_plaintext(fake_kms):
+    """Test envelope mode is not bound by the 4 KB KMS plaintext limit"""
+    manager = EncryptionManager('key-id')
+    plaintext = "x" * 50000
+
+    assert manager.decrypt(manager.encrypt(plaintext)) == plaintext
+
+
+def test_envelope_caches_unwrapped_data_keys(fake_kms):
+    """Test a cold manager unwraps each data key once"""
+    ciphertext = EncryptionManager('key-id').encrypt("hello")
+    cold_manager = EncryptionManager('key-id')
+
+    assert cold_manager.decrypt(ciphertext) == "hello"
+    assert cold_manager.decrypt(ciphertext) == "hello"
+    assert fake_kms.calls['decrypt'] == 1
+
+
+def test_data_key_rotates_after_max_messages(fake_kms):
+    """Test a new data key is generated once the usage limit is reached"""
+    manager = EncryptionManager('key-id', data_key_max_messages=2)
+
+    for _ in range(5):
+        manager.encrypt("hello")
+
+    assert fake_kms.calls['generate_data_key'] == 3
+
+
+def test_legacy_kms_ciphertext_still_decrypts(fake_kms):
+    """Test values written in kms mode decrypt with an envelope manager"""
+    legacy = EncryptionManager('key-id', mode='kms').encrypt("old message")
+
+    assert not legacy.startswith(ENVELOPE_PREFIX)
+    assert EncryptionManager('key-id').decrypt(legacy) == "old message"
+
+
+def test_codec_compresses_before_encryption(fake_kms):
+    """Test compressed values are smaller, round trip in both modes and old values still decrypt"""
+    plain = EncryptionManager('key-id')
+    compressed = EncryptionManager('key-id', codec=ContentCodec('zlib'))
+    kms = EncryptionManager('key-id', mode='kms', codec=ContentCodec('zlib'))
+    text = "The quick brown fox jumps over the lazy dog. " * 40
+
+    old_value = plain.encrypt(text)
+    new_value = compressed.encrypt(text)
+
+    assert new_value.startswith(ENVELOPE_CODEC_PREFIX) and len(new_value) < len(old_value) / 4
+    assert kms.encrypt(text).startswith(KMS_CODEC_PREFIX)
+    assert compressed.decrypt(old_value) == text and plain.decrypt(new_value) == text
+    assert kms.decrypt(kms.encrypt(text)) == text and compressed.decrypt(compressed.encrypt("short")) == "short"
@@ -0,0 +1,134 @@
+"""
+Unit tests for the conversation export
+"""
+import io
+import gzip
+import json
+import boto3
+import pytest
+from src.chatbot.conversation_manager import ConversationManager
+from src.export.exporter import ConversationExporter
+from src.export.targets import LocalExportTarget, S3ExportTarget, CHECKPOINT_FILE, MANIFEST_FILE
+from src.shared.encryption import EncryptionManager
+
+
+def seed(manager, users=('u1', 'u2'), per_user=4, messages=3):
+    ids = {}
+    for user in users:
+        for n in range(per_user):
+            conversation_id = manager.create_conversation(user, {'role': 'user', 'content': f'{user}-{n}-m1'})
+            for i in range(2, messages + 1):
+                manager.add_message(conversation_id, {'role': 'assistant', 'content': f'{user}-{n}-m{i}'})
+            ids[conversation_id] = user
+    return ids
+
+
+def read_lines(data: bytes):
+    return [json.loads(line) for line in gzip.decompress(data).splitlines()]
+
+
+def read_local(directory, segments):
+    lines = []
+    for segment in range(segments):
+        with open(directory / f'part-{segment:05d}.ndjson.gz', 'rb') as f:
+            lines.extend(read_lines(f.read()))
+    return lines
+
+
+def test_segmented_export_decrypts_every_conversation(dynamodb_tables, fake_kms, tmp_path):
+    """Test a parallel scan writes each conversation once with decrypted messages, plus a manifest"""
+    manager = ConversationManager(encryption_manager=EncryptionManager('key-id'))
+    ids = seed(manager)
+    dynamodb_tables.Table('PAI-Conversations').put_item(Item={
+        'conversation_id': 'legacy', 'user_id': 'u3', 'created_at': '2024-01-01T00:00:00',
+        'updated_at': '2024-01-01T00:00:00',
+        'messages': [{'role': 'user', 'content': manager.encryption_manager.encrypt('old'), 'timestamp': 't'}],
+    })
+
+    stats = ConversationExporter(LocalExportTarget(str(tmp_path)), manager, segments=3, page_size=2).run()
+
+    lines = read_local(tmp_path, 3)
+    assert sorted(c['conversation_id'] for c in lines) == sorted([*ids, 'legacy'])
+    exported = {c['conversation_id']: c for c in lines}
+    first = exported[next(iter(ids))]
+    assert [m['seq'] for m in first['messages']] == [1, 2, 3] and first['message_count'] == 3
+    assert first['messages'][0]['content'].endswith('-m1') and first['user_id'] == ids[first['conversation_id']]
+    assert exported['legacy']['messages'][0]['content'] == 'old'
+
+    assert stats['complete'] and stats['conversations'] == 9 and stats['messages'] == 25
+    assert stats['run']['conversations_per_second'] > 0 and stats['run']['mb_per_second'] is not None
+    manifest = json.loads((tmp_path / MANIFEST_FILE).read_text())
+    assert manifest['conversations'] == 9 and len(manifest['parts']) == 3
+
+
+def test_user_export_reads_only_that_users_conversations(dynamodb_tables, tmp_path):
+    """Test exporting one user pages through the user index instead of scanning"""
+    manager = ConversationManager()
+    ids = seed(manager)
+
+    stats = ConversationExporter(LocalExportTarget(str(tmp_path)), manager, user_id='u2', page_size=3).run()
+
+    lines = read_local(tmp_path, 1)
+    assert sorted(c['conversation_id'] for c in lines) == sorted(c for c, user in ids.items() if user == 'u2')
+    assert stats['params']['segments'] == 1
+
+
+def test_interrupted_export_resumes_from_checkpoint(dynamodb_tables, tmp_path, monkeypatch):
+    """Test a failed run keeps committed pages and a resumed run exports the rest exactly once"""
+    manager = ConversationManager()
+    ids = seed(manager, per_user=5)
+    target = LocalExportTarget(str(tmp_path))
+    exporter = ConversationExporter(target, manager, segments=1, page_size=2, part_bytes=1)
+
+    export_page = exporter._export_page
+    calls = []
+
+    def flaky(headers):
+        calls.append(len(headers))
+        if len(calls) == 3:
+            raise RuntimeError('throttled')
+        return export_page(headers)
+
+    monkeypatch.setattr(exporter, '_export_page', flaky)
+    with pytest.raises(RuntimeError):
+        exporter.run()
+
+    checkpoint = json.loads((tmp_path / CHECKPOINT_FILE).read_text())
+    assert checkpoint['segments']['0']['conversations'] == 4 and not checkpoint['segments']['0']['done']
+    with pytest.raises(ValueError):
+        exporter.run()
+
+    stats = exporter.run(resume=True)
+
+    lines = read_local(tmp_path, 1)
+    assert sorted(c['conversation_id'] for c in lines) == sorted(ids)
+    assert stats['complete'] and stats['conversations'] == 10 and stats['run']['conversations'] == 6
+
+
+def test_deadline_checkpoints_and_stops(dynamodb_tables, tmp_path):
+    """Test a run past its deadline stops without losing the export"""
+    manager = ConversationManager()
+    ids = seed(manager, per_user=2)
+    exporter = ConversationExporter(LocalExportTarget(str(tmp_path)), manager, segments=2)
+
+    assert not exporter.run(deadline=0.0)['complete']
+    stats = exporter.run(resume=True)
+
+    assert stats['complete'] and sorted(c['conversation_id'] for c in read_local(tmp_path, 2)) == sorted(ids)
+
+
+def test_s3_export_uses_multipart_upload(dynamodb_tables, tmp_path):
+    """Test an S3 export uploads each segment's part and a manifest"""
+    s3 = boto3.client('s3')
+    s3.create_bucket(Bucket='exports')
+    manager = ConversationManager()
+    ids = seed(manager)
+
+    stats = ConversationExporter(S3ExportTarget('exports', 'run-1'), manager, segments=2).run()
+
+    lines = []
+    for segment in range(2):
+        lines.extend(read_lines(s3.get_object(Bucket='exports', Key=f'run-1/part-{segment:05d}.ndjson.gz')['Body'].read()))
+    assert sorted(c['conversation_id'] for c in lines) == sorted(ids)
+    manifest = json.load(io.BytesIO(s3.get_object(Bucket='exports', Key='run-1/manifest.json')['Body'].read()))
+    assert manifest['conversations'] == stats['conversations'] == 8
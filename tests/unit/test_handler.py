@@ -0,0 +1,340 @@
+"""
+Unit tests for the chatbot Lambda handler
+"""
+import json
+import threading
+import pytest
+from src.chatbot import handler
+from src.chatbot.context_builder import ContextBuilder
+from src.chatbot.conversation_manager import ConversationManager
+from src.shared.rate_limiter import RateLimiter
+
+
+class StubBedrockClient:
+    """Echoes the last user message instead of calling Bedrock"""
+
+    def __init__(self):
+        self.requests = []
+
+    def format_conversation(self, history):
+        return [{'role': m['role'], 'content': m['content']} for m in history]
+
+    def generate_response(self, messages, system_prompt=None, **kwargs):
+        self.requests.append(messages)
+        return {
+            'message': f"echo: {messages[-1]['content']}",
+            'stop_reason': 'end_turn',
+            'usage': {'input_tokens': 1, 'output_tokens': 1},
+            'model': 'stub'
+        }
+
+    def stream_response(self, messages, system_prompt=None, **kwargs):
+        self.requests.append(messages)
+        reply = f"echo: {messages[-1]['content']}"
+        for word in reply.split(' '):
+            yield {'type': 'delta', 'text': word}
+        yield {'type': 'done', 'message': reply, 'stop_reason': 'end_turn',
+               'usage': {'input_tokens': 1, 'output_tokens': 2}, 'model': 'stub'}
+
+
+@pytest.fixture
+def chat_env(dynamodb_tables, monkeypatch):
+    bedrock = StubBedrockClient()
+    monkeypatch.setattr(handler, 'bedrock_client', bedrock)
+    monkeypatch.setattr(handler, 'conversation_manager', ConversationManager())
+    monkeypatch.setattr(handler, 'encryption_manager', None)
+    return bedrock
+
+
+def post_chat(body):
+    response = handler.lambda_handler({'httpMethod': 'POST', 'path': '/chat', 'body': json.dumps(body)}, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_chat_turns_persist_history(chat_env):
+    """Test two chat turns store four messages and feed history to the model"""
+    status, first = post_chat({'message': 'Hi'})
+    assert status == 200
+    assert first['metadata']['write_units'] >= 0
+
+    status, second = post_chat({'message': 'Again', 'conversation_id': first['conversation_id']})
+    assert status == 200
+    assert [m['content'] for m in chat_env.requests[-1]] == ['Hi', 'echo: Hi', 'Again']
+
+
+def test_chat_unknown_conversation_returns_404(chat_env):
+    """Test chatting in a missing conversation is rejected before the model is called"""
+    status, body = post_chat({'message': 'Hi', 'conversation_id': 'missing'})
+
+    assert status == 404
+    assert chat_env.requests == []
+
+
+def test_chat_response_does_not_wait_for_a_slow_summary(chat_env, monkeypatch):
+    """Test the reply is returned while a slow summary update is still running"""
+    _, first = post_chat({'message': 'Hi ' * 40})
+    for _ in range(3):
+        post_chat({'message': 'More ' * 40, 'conversation_id': first['conversation_id']})
+    started, release, finished = threading.Event(), threading.Event(), threading.Event()
+
+    def summarizer(previous, messages):
+        started.set()
+        release.wait(5)
+        finished.set()
+        return 'new summary'
+
+    builder = ContextBuilder(handler.conversation_manager, token_budget=150, summarizer=summarizer,
+                             summary_min_messages=2, summary_timeout=0.01)
+    monkeypatch.setattr(handler, 'context_builder', builder)
+    monkeypatch.setattr(handler, 'SUMMARY_FINISH_TIMEOUT_SECONDS', 0.01)
+    try:
+        status, _ = post_chat({'message': 'Again', 'conversation_id': first['conversation_id']})
+        assert status == 200
+        assert started.is_set() and not finished.is_set()
+    finally:
+        release.set()
+
+
+def test_chat_value_errors_are_server_errors(chat_env, monkeypatch):
+    """Test a ValueError from the model call is a 500, not a missing conversation"""
+    def bad_body(*args, **kwargs):
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+    monkeypatch.setattr(chat_env, 'generate_response', bad_body)
+    status, body = post_chat({'message': 'Hi'})
+
+    assert status == 500
+
+
+def test_chat_reports_stage_timings(chat_env):
+    """Test the chat response carries per-stage timings"""
+    status, body = post_chat({'message': 'Hi'})
+
+    timings = body['metadata']['timings_ms']
+    assert {'context', 'model', 'prepare_turn', 'commit', 'total'} <= set(timings)
+    assert timings['total'] >= timings['model']
+
+
+def test_user_message_preparation_overlaps_history_read(chat_env, monkeypatch):
+    """Test the user message is prepared while the history is still being read"""
+    _, first = post_chat({'message': 'Hi'})
+    manager = handler.conversation_manager
+    manager.history_cache.clear()
+    prepare_started = threading.Event()
+    read_count, read_history = manager._current_message_count, manager.get_conversation_history
+
+    def current_message_count(conversation_id):
+        prepare_started.set()
+        return read_count(conversation_id)
+
+    def get_conversation_history(conversation_id, limit=10):
+        # Deadlocks (until the timeout) if preparation only starts after the context is built
+        assert prepare_started.wait(timeout=2)
+        return read_history(conversation_id, limit=limit)
+
+    monkeypatch.setattr(manager, '_current_message_count', current_message_count)
+    monkeypatch.setattr(manager, 'get_conversation_history', get_conversation_history)
+
+    status, _ = post_chat({'message': 'Again', 'conversation_id': first['conversation_id']})
+
+    assert status == 200
+    assert [m['content'] for m in chat_env.requests[-1]] == ['Hi', 'echo: Hi', 'Again']
+
+
+def test_eager_write_keeps_history_order(chat_env, monkeypatch):
+    """Test an eager user-message write never shows up twice in the model input"""
+    monkeypatch.setattr(handler, 'EAGER_USER_WRITE', True)
+
+    _, first = post_chat({'message': 'Hi'})
+    post_chat({'message': 'Again', 'conversation_id': first['conversation_id']})
+
+    assert [m['content'] for m in chat_env.requests[-1]] == ['Hi', 'echo: Hi', 'Again']
+    history = handler.conversation_manager.get_conversation_history(first['conversation_id'])
+    assert [m['content'] for m in history] == ['Hi', 'echo: Hi', 'Again', 'echo: Again']
+
+
+def test_chat_emits_emf_record(chat_env):
+    """Test a chat request emits one EMF record with stage durations, calls and tokens"""
+    from src.shared import metrics
+
+    records = []
+    metrics.set_sink(records.append)
+    try:
+        handler.lambda_handler({'httpMethod': 'POST', 'path': '/chat', 'resource': '/chat',
+                                'body': json.dumps({'message': 'Hi'})}, None)
+    finally:
+        metrics.set_sink(None)
+
+    (record,) = records
+    assert record['Route'] == '/chat' and record['StatusCode'] == 200
+    assert record['DynamoDBCalls'] >= 1
+    assert {'contextMs', 'modelMs', 'commitMs', 'dynamodbMs', 'totalMs'} <= set(record)
+
+
+def post_batch(body):
+    response = handler.lambda_handler({'httpMethod': 'POST', 'path': '/chat/batch', 'body': json.dumps(body)}, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_batch_returns_results_in_order_without_persisting(chat_env, dynamodb_tables):
+    """Test stateless batch items answer in order, report invalid items and store nothing"""
+    status, body = post_batch({'items': [{'message': 'one'}, {'nope': True}, {'message': 'three'}]})
+
+    assert status == 200
+    assert [r['status'] for r in body['results']] == ['ok', 'error', 'ok']
+    assert body['results'][0]['message'] == 'echo: one' and body['results'][2]['message'] == 'echo: three'
+    assert body['results'][1]['code'] == 'invalid'
+    assert body['summary'] == {'succeeded': 2, 'failed': 1, 'throttles': 0, 'final_concurrency': 8}
+    assert dynamodb_tables.Table('PAI-Conversations').scan()['Count'] == 0
+
+
+def test_batch_stateful_item_continues_conversation(chat_env):
+    """Test a batch item with a conversation_id runs a persisted chat turn"""
+    _, first = post_chat({'message': 'Hi'})
+
+    _, body = post_batch({'items': [{'message': 'Again', 'conversation_id': first['conversation_id']}]})
+
+    assert body['results'][0]['conversation_id'] == first['conversation_id']
+    history = handler.conversation_manager.get_conversation_history(first['conversation_id'])
+    assert [m['content'] for m in history] == ['Hi', 'echo: Hi', 'Again', 'echo: Again']
+
+
+def test_batch_item_for_unknown_conversation_skips_the_model(chat_env):
+    """Test a batch item in a missing conversation fails as not_found without a model call"""
+    _, body = post_batch({'items': [{'message': 'Hi', 'conversation_id': 'missing'}]})
+
+    assert body['results'][0]['code'] == 'not_found'
+    assert chat_env.requests == []
+
+
+def test_batch_backs_off_when_throttled(chat_env, monkeypatch):
+    """Test throttled items are retried and the concurrency limit drops"""
+    from botocore.exceptions import ClientError
+
+    monkeypatch.setattr(handler, 'BATCH_THROTTLE_BACKOFF_SECONDS', 0.001)
+    throttles = {'remaining': 3}
+    lock = threading.Lock()
+    generate = chat_env.generate_response
+
+    def throttling_generate(messages, system_prompt=None, **kwargs):
+        with lock:
+            throttled = throttles['remaining'] > 0
+            throttles['remaining'] -= 1
+        if throttled:
+            raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'slow down'}}, 'InvokeModel')
+        return generate(messages, system_prompt, **kwargs)
+
+    monkeypatch.setattr(chat_env, 'generate_response', throttling_generate)
+
+    _, body = post_batch({'items': [{'message': str(i)} for i in range(4)], 'concurrency': 4})
+
+    assert [r['status'] for r in body['results']] == ['ok'] * 4
+    assert body['summary']['throttles'] == 3
+    assert body['summary']['final_concurrency'] < 4
+
+
+def test_batch_item_timeout(chat_env, monkeypatch):
+    """Test a slow item times out on its own while the others succeed"""
+    release = threading.Event()
+    generate = chat_env.generate_response
+
+    def slow_generate(messages, system_prompt=None, **kwargs):
+        if messages[-1]['content'] == 'slow':
+            release.wait(timeout=5)
+        return generate(messages, system_prompt, **kwargs)
+
+    monkeypatch.setattr(chat_env, 'generate_response', slow_generate)
+
+    try:
+        _, body = post_batch({'items': [{'message': 'fast'}, {'message': 'slow'}], 'item_timeout_seconds': 0.2})
+    finally:
+        release.set()
+
+    assert [r['status'] for r in body['results']] == ['ok', 'error']
+    assert body['results'][1]['code'] == 'timeout'
+
+
+def test_batch_deadline_covers_queued_items(chat_env, monkeypatch):
+    """Test items still running or waiting for a slot at the batch deadline are reported as timed out"""
+    monkeypatch.setattr(handler, 'BATCH_DEADLINE_SECONDS', 0.3)
+    release = threading.Event()
+    calls = []
+    generate = chat_env.generate_response
+
+    def slow_generate(messages, system_prompt=None, **kwargs):
+        calls.append(messages[-1]['content'])
+        release.wait(timeout=5)
+        return generate(messages, system_prompt, **kwargs)
+
+    monkeypatch.setattr(chat_env, 'generate_response', slow_generate)
+
+    try:
+        _, body = post_batch({'items': [{'message': 'running'}, {'message': 'queued'}], 'concurrency': 1})
+    finally:
+        release.set()
+
+    assert [r['code'] for r in body['results']] == ['timeout', 'timeout']
+    assert calls == ['running']
+
+
+def test_list_conversations_route(chat_env):
+    """Test GET /conversations pages a user's conversations and validates parameters"""
+    for message in ('one', 'two'):
+        post_chat({'message': message, 'user_id': 'user-7'})
+
+    def get(params):
+        response = handler.lambda_handler(
+            {'httpMethod': 'GET', 'path': '/conversations', 'queryStringParameters': params}, None)
+        return response['statusCode'], json.loads(response['body'])
+
+    status, page = get({'user_id': 'user-7', 'limit': '1'})
+    assert status == 200 and len(page['conversations']) == 1
+    status, rest = get({'user_id': 'user-7', 'cursor': page['next_cursor']})
+    assert status == 200 and len(rest['conversations']) == 1 and rest['next_cursor'] is None
+
+    assert get({'user_id': 'user-7', 'limit': '0'})[0] == 400
+    assert get({'user_id': 'user-8', 'cursor': page['next_cursor']})[0] == 400
+    assert get(None)[0] == 400
+
+
+def test_get_conversation_window_and_etag(chat_env, monkeypatch):
+    """Test GET /conversations/{id} applies since/limit/fields and answers 304 without reading messages"""
+    first = post_chat({'message': 'one', 'user_id': 'user-7'})[1]
+    post_chat({'message': 'two', 'user_id': 'user-7', 'conversation_id': first['conversation_id']})
+
+    def get(params=None, headers=None):
+        return handler.lambda_handler({
+            'httpMethod': 'GET',
+            'path': f"/conversations/{first['conversation_id']}",
+            'pathParameters': {'conversation_id': first['conversation_id']},
+            'queryStringParameters': params,
+            'headers': headers,
+        }, None)
+
+    response = get({'since': '1', 'limit': '2', 'fields': 'content,role'})
+    body = json.loads(response['body'])
+    assert response['statusCode'] == 200 and body['has_more'] is True and body['message_count'] == 4
+    assert body['messages'] == [{'seq': 2, 'role': 'assistant', 'content': 'echo: one'},
+                                {'seq': 3, 'role': 'user', 'content': 'two'}]
+
+    etag = response['headers']['ETag']
+    monkeypatch.setattr(handler.conversation_manager, 'get_messages', None)
+    not_modified = get({'since': '1', 'limit': '2', 'fields': 'role,content'}, {'if-none-match': f'W/{etag}'})
+    assert not_modified['statusCode'] == 304 and not_modified['body'] == ''
+
+    assert get({'since': 'yesterday'})['statusCode'] == 400
+    assert get({'fields': 'content,secret'})['statusCode'] == 400
+
+
+def test_chat_over_limit_returns_429(chat_env, monkeypatch):
+    """Test a caller over the request limit gets 429 with Retry-After before any work is done"""
+    monkeypatch.setattr(handler, 'rate_limiter', RateLimiter(requests_per_minute=2, input_tokens_per_minute=0))
+
+    assert [post_chat({'message': 'hi', 'user_id': 'user-7'})[0] for _ in range(2)] == [200, 200]
+    response = handler.lambda_handler(
+        {'httpMethod': 'POST', 'path': '/chat', 'body': json.dumps({'message': 'hi', 'user_id': 'user-7'})}, None)
+
+    assert response['statusCode'] == 429 and response['headers']['Retry-After'] == '30'
+    assert json.loads(response['body'])['error'] == handler.ERROR_RATE_LIMIT
+    assert len(chat_env.requests) == 2
+    assert post_chat({'message': 'hi', 'user_id': 'user-8'})[0] == 200
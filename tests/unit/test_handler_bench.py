@@ -0,0 +1,28 @@
+"""
+Smoke tests for the offline handler benchmark
+"""
+from benchmarks.handler_bench import compare, percentiles, run_sweep
+
+NO_LATENCY = {'dynamodb': 0, 'kms': 0, 'bedrock-runtime': 0, 'secretsmanager': 0}
+
+
+def test_percentiles_nearest_rank():
+    """Test percentiles use nearest rank over the sorted samples"""
+    stats = percentiles([float(v) for v in range(1, 101)])
+
+    assert (stats['p50'], stats['p95'], stats['p99'], stats['max']) == (50.0, 95.0, 99.0, 100.0)
+
+
+def test_sweep_reports_stages_and_call_counts():
+    """Test a tiny sweep drives both handlers and reports per-stage percentiles and call counts"""
+    sweep = {'history_length': [4], 'message_size': [100], 'encryption': ['envelope'], 'concurrency': [2]}
+    report = run_sweep(sweep, requests=3, latency_ms=NO_LATENCY)
+
+    chat, authorizer = report['scenarios']
+    assert chat['errors'] == 0 and authorizer['errors'] == 0
+    assert {'invocation', 'context', 'model', 'commit'} <= set(chat['stages_ms'])
+    assert chat['calls']['bedrock-runtime']['invoke_model'] == 3
+    assert chat['calls']['dynamodb']['transact_write_items'] == 3
+    assert authorizer['calls']['secretsmanager']['get_secret_value'] == 1
+    assert authorizer['warm_invocation_us']['count'] == 1
+    assert compare(report, report) and not any(line.startswith('!') for line in compare(report, report))
@@ -0,0 +1,175 @@
+"""
+Unit tests for document ingestion
+"""
+import io
+import os
+import json
+from array import array
+import numpy as np
+import pytest
+from src.ingestion.chunking import TextChunker, iter_chunks, iter_text
+from src.ingestion.embeddings import FakeEmbedder
+from src.ingestion.pipeline import DocumentIngestor
+from src.ingestion.storage import LocalObjectStore
+from src.shared.vector_index import VectorIndex
+
+
+def paragraph(label, words=60):
+    return ' '.join(f"{label}{i}" for i in range(words)) + '.\n\n'
+
+
+def write(root, key, text):
+    path = os.path.join(root, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+    # Make sure the ETag moves even within one mtime tick
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def load_index(root):
+    store = LocalObjectStore(root)
+    name = store.get_bytes('index/LATEST').decode()
+    manifest = json.loads(store.get_bytes(f'index/{name}/manifest.json'))
+    chunks = [json.loads(line) for line in store.get_bytes(f'index/{name}/chunks.jsonl').splitlines()]
+    vectors = array('f', store.get_bytes(f'index/{name}/vectors.f32'))
+    return manifest, chunks, vectors
+
+
+def test_chunker_overlaps_and_covers_text():
+    """Test chunks stay within the size, overlap, and reassemble to the original text"""
+    text = ''.join(paragraph(c) for c in 'abcdefgh')
+    chunker = TextChunker(chunk_size=500, overlap=50)
+    chunks = chunker.feed(text[:700]) + chunker.feed(text[700:]) + chunker.finish()
+
+    assert len(chunks) > 3
+    assert all(len(c.text) <= 500 for c in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.start == previous.start + len(previous.text) - 50
+        assert previous.text[-50:] == chunk.text[:50]
+    assert chunks[-1].start + len(chunks[-1].text) == len(text)
+
+
+def test_chunker_rejects_large_overlap():
+    """Test overlap must stay below half the chunk size"""
+    with pytest.raises(ValueError):
+        TextChunker(chunk_size=100, overlap=50)
+
+
+def test_html_extraction_skips_scripts():
+    """Test HTML text is extracted without tags, scripts or styles"""
+    html = b'<html><style>p{}</style><p>Hello &amp; welcome</p><script>var x;</script><p>Bye</p></html>'
+    text = ''.join(iter_text(io.BytesIO(html), 'page.html', read_size=7))
+
+    assert 'Hello & welcome' in text
+    assert 'Bye' in text
+    assert 'var x' not in text and 'p{}' not in text
+
+
+def test_large_document_is_streamed():
+    """Test a document is read in bounded blocks while chunks are produced"""
+    class CountingStream(io.BytesIO):
+        largest = 0
+
+        def read(self, size=-1):
+            data = super().read(size)
+            CountingStream.largest = max(CountingStream.largest, len(data))
+            return data
+
+    data = ''.join(paragraph(f"w{i}-") for i in range(200)).encode()
+    chunks = list(iter_chunks(CountingStream(data), 'big.txt', chunk_size=1000, overlap=100, read_size=4096))
+
+    assert CountingStream.largest == 4096
+    assert len(chunks) > len(data) // 1000
+
+
+def test_fake_embedder_matches_bedrock_output():
+    """Test the fake embedder returns a float32 matrix of unit rows, like BedrockEmbedder"""
+    embedder = FakeEmbedder(dimensions=40)
+
+    vectors = embedder.embed(['a', 'b', 'a'])
+
+    assert isinstance(vectors, np.ndarray) and vectors.dtype == np.float32 and vectors.shape == (3, 40)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0) and np.array_equal(vectors[0], vectors[2])
+    assert embedder.embed([]).shape == (0, 40)
+
+
+def test_incremental_ingestion_reembeds_only_changes(tmp_path):
+    """Test unchanged documents are skipped and only new chunks are embedded"""
+    root = str(tmp_path)
+    write(root, 'a.md', ''.join(paragraph(c) for c in 'abcdef'))
+    write(root, 'b.txt', paragraph('b'))
+    write(root, 'c.txt', paragraph('c'))
+    write(root, 'image.png', 'not text')
+    embedder = FakeEmbedder(dimensions=8)
+
+    def ingest():
+        return DocumentIngestor(LocalObjectStore(root), embedder, chunk_size=600, overlap=60, batch_size=4).run()
+
+    first = ingest()
+    manifest, chunks, vectors = load_index(root)
+    assert first['version'] == 'v000001' and first['documents_added'] == 3
+    assert first['documents_skipped'] == 1
+    assert len(vectors) == manifest['count'] * 8 == len(chunks) * 8
+    assert embedder.texts_embedded == first['chunks_embedded'] == len(chunks)
+
+    # Nothing changed: no embedding and no new version
+    second = ingest()
+    assert second['published'] is False and second['version'] == 'v000001'
+    assert embedder.texts_embedded == first['chunks_embedded']
+
+    # Append to a.md, rewrite b.txt, delete c.txt
+    write(root, 'a.md', ''.join(paragraph(c) for c in 'abcdef') + paragraph('g'))
+    write(root, 'b.txt', paragraph('z'))
+    os.remove(os.path.join(root, 'c.txt'))
+    embedded_before = embedder.texts_embedded
+
+    third = ingest()
+    manifest, chunks, vectors = load_index(root)
+    assert third['version'] == 'v000002'
+    assert third['documents_changed'] == 2 and third['documents_deleted'] == 1
+    assert third['chunks_reused'] > 0
+    assert embedder.texts_embedded - embedded_before == third['chunks_embedded'] < len(chunks)
+    assert sorted(manifest['documents']) == ['a.md', 'b.txt']
+    assert {c['doc'] for c in chunks} == {'a.md', 'b.txt'}
+
+    # Rows line up with the vectors they were embedded from
+    for row, chunk in enumerate(chunks):
+        expected = array('f', embedder._vector(chunk['text']))
+        assert vectors[row * 8:(row + 1) * 8] == expected
+
+    # The quantized search index finds a chunk by its own embedding
+    with VectorIndex(os.path.join(root, 'index', third['version'], manifest['search_index']['file'])) as index:
+        rows, _ = index.search(embedder._vector(chunks[3]['text']), k=1)
+        assert index.chunk_ids(rows) == [chunks[3]['id']]
+
+
+def test_new_etag_on_unchanged_content_is_recorded(tmp_path):
+    """Test a re-uploaded document is hashed once, then skipped by its new ETag"""
+    root = str(tmp_path)
+    write(root, 'a.txt', paragraph('a'))
+    ingest = DocumentIngestor(LocalObjectStore(root), FakeEmbedder(dimensions=8)).run
+    ingest()
+
+    write(root, 'a.txt', paragraph('a'))
+    second = ingest()
+    third = ingest()
+
+    assert second['published'] is False and second['documents_retagged'] == 1
+    assert second['bytes_read'] > 0
+    assert third['documents_retagged'] == 0 and third['bytes_read'] == 0
+    assert load_index(root)[0]['version'] == 'v000001'
+
+
+def test_model_change_rebuilds_index(tmp_path):
+    """Test changing embedding dimensions re-embeds every chunk"""
+    root = str(tmp_path)
+    write(root, 'a.txt', paragraph('a'))
+    DocumentIngestor(LocalObjectStore(root), FakeEmbedder(dimensions=8)).run()
+
+    stats = DocumentIngestor(LocalObjectStore(root), FakeEmbedder(dimensions=4)).run()
+
+    assert stats['full_rebuild'] is True
+    assert stats['version'] == 'v000002'
+    assert stats['chunks_reused'] == 0
@@ -0,0 +1,87 @@
+"""
+Unit tests for request metrics and EMF output
+"""
+import time
+import pytest
+from src.shared import metrics
+from src.shared.concurrency import get_executor
+
+
+@pytest.fixture
+def records():
+    emitted = []
+    metrics.set_sink(emitted.append)
+    yield emitted
+    metrics.set_sink(None)
+
+
+def test_spans_and_counters_become_emf_metrics(records):
+    """Test spans and counters of a request are emitted as one EMF record"""
+    request_metrics = metrics.start_request('/chat', sample_rate=1.0)
+    with metrics.span('dynamodb'):
+        pass
+    metrics.count('KMSCalls')
+    metrics.count('KMSCalls')
+    metrics.count('BytesEncrypted', 42, 'Bytes')
+    metrics.finish_request(request_metrics)
+
+    (record,) = records
+    definition = record['_aws']['CloudWatchMetrics'][0]
+    units = {m['Name']: m['Unit'] for m in definition['Metrics']}
+    assert definition['Dimensions'] == [['Service', 'Route']]
+    assert record['Route'] == '/chat'
+    assert record['KMSCalls'] == 2 and record['BytesEncrypted'] == 42
+    assert units['dynamodbMs'] == 'Milliseconds' and units['BytesEncrypted'] == 'Bytes'
+    assert 'ColdStart' in record and 'totalMs' in record
+
+
+def test_sampling_skips_emission_but_keeps_timings(records, monkeypatch):
+    """Test an unsampled request still times stages but emits nothing"""
+    monkeypatch.setattr(metrics, '_cold_start', False)
+    request_metrics = metrics.start_request('/chat', sample_rate=0.0)
+    with metrics.span('bedrock'):
+        pass
+    metrics.finish_request(request_metrics)
+
+    assert records == []
+    assert 'bedrock' in request_metrics.as_dict()
+
+
+def test_cold_start_is_flagged_once(records, monkeypatch):
+    """Test only the first request of a container carries ColdStart=1 and it is always sampled"""
+    monkeypatch.setattr(metrics, '_cold_start', True)
+    for _ in range(2):
+        metrics.finish_request(metrics.start_request('/chat', sample_rate=0.0))
+
+    assert [r['ColdStart'] for r in records] == [1]
+
+
+def test_background_work_is_attributed_to_the_request(records):
+    """Test counters recorded on a shared pool thread land in the submitting request"""
+    request_metrics = metrics.start_request('/chat', sample_rate=1.0)
+    get_executor('metrics-test', 2).submit(metrics.count, 'DynamoDBCalls', 3).result()
+    metrics.finish_request(request_metrics)
+
+    assert records[0]['DynamoDBCalls'] == 3
+
+
+def test_no_op_outside_a_request():
+    """Test spans and counters are ignored when no request is active"""
+    with metrics.span('kms'):
+        metrics.count('KMSCalls')
+
+    assert metrics.current() is None
+
+
+def test_span_overhead_is_negligible():
+    """Test a span plus a counter costs far less than a millisecond"""
+    request_metrics = metrics.start_request('/chat', sample_rate=0.0)
+    iterations = 10000
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with metrics.span('dynamodb'):
+            metrics.count('DynamoDBCalls')
+    per_call_ms = (time.perf_counter() - start) * 1000 / iterations
+    metrics.finish_request(request_metrics)
+
+    assert per_call_ms < 0.05
@@ -0,0 +1,141 @@
+"""
+Unit tests for Bedrock provider adapters
+"""
+import pytest
+from src.chatbot.providers import (
+    AnthropicAdapter,
+    AmazonNovaAdapter,
+    CohereAdapter,
+    MetaLlamaAdapter,
+    MistralAdapter,
+    ProviderAdapter,
+    get_adapter,
+    prompt_cache_min_tokens,
+    provider_from_model_id,
+    register_adapter,
+)
+
+MESSAGES = [
+    {'role': 'user', 'content': 'Hi'},
+    {'role': 'assistant', 'content': 'Hello!'},
+    {'role': 'user', 'content': 'How are you?'}
+]
+
+
+@pytest.mark.parametrize('model_id,adapter_type', [
+    ('anthropic.claude-3-haiku-20240307-v1:0', AnthropicAdapter),
+    ('us.anthropic.claude-3-5-sonnet-20240620-v1:0', AnthropicAdapter),
+    ('amazon.nova-lite-v1:0', AmazonNovaAdapter),
+    ('eu.amazon.nova-pro-v1:0', AmazonNovaAdapter),
+    ('meta.llama3-8b-instruct-v1:0', MetaLlamaAdapter),
+    ('mistral.mistral-7b-instruct-v0:2', MistralAdapter),
+    ('cohere.command-r-v1:0', CohereAdapter),
+    ('arn:aws:bedrock:us-east-1::foundation-model/meta.llama3-70b-instruct-v1:0', MetaLlamaAdapter),
+    ('unknown.model-v1', AnthropicAdapter),
+])
+def test_get_adapter_resolves_provider(model_id, adapter_type):
+    """Test model ids and inference profiles resolve to the right adapter"""
+    assert isinstance(get_adapter(model_id), adapter_type)
+
+
+def test_anthropic_request_passes_messages_through():
+    """Test Claude requests reuse the message list without rebuilding it"""
+    body = AnthropicAdapter().build_request(MESSAGES, 'Be brief.', 100, 0.5)
+
+    assert body['messages'] is MESSAGES
+    assert body['system'] == 'Be brief.'
+
+
+def test_anthropic_cache_breakpoints_follow_prefix_size():
+    """Test cache_control marks the system prompt and history only once they reach the minimum"""
+    system_prompt = 'x' * 4200
+    history = [dict(m) for m in MESSAGES]
+    history[1] = {'role': 'assistant', 'content': [{'type': 'text', 'text': 'y' * 400}]}
+
+    body = AnthropicAdapter().build_request(history, system_prompt, 100, 0.5, cache_min_tokens=1024)
+
+    assert body['system'] == [{'type': 'text', 'text': system_prompt, 'cache_control': {'type': 'ephemeral'}}]
+    assert body['messages'][1]['content'] == [
+        {'type': 'text', 'text': 'y' * 400, 'cache_control': {'type': 'ephemeral'}}
+    ]
+    assert body['messages'][0] is history[0] and body['messages'][2] is history[2]
+    assert 'cache_control' not in history[1]['content'][0]
+
+    short = AnthropicAdapter().build_request(MESSAGES, 'Be brief.', 100, 0.5, cache_min_tokens=1024)
+    assert short['messages'] is MESSAGES and short['system'] == 'Be brief.'
+
+    history_only = AnthropicAdapter().build_request(history, 'Be brief.', 100, 0.5, cache_min_tokens=100)
+    assert history_only['system'] == 'Be brief.'
+    assert history_only['messages'][1]['content'][-1]['cache_control'] == {'type': 'ephemeral'}
+
+
+def test_prompt_cache_min_tokens_by_model():
+    """Test the minimum cacheable prefix is looked up from the model id"""
+    assert prompt_cache_min_tokens('anthropic.claude-3-haiku-20240307-v1:0') == 2048
+    assert prompt_cache_min_tokens('us.anthropic.claude-3-7-sonnet-20250219-v1:0') == 1024
+
+
+def test_anthropic_usage_includes_cache_tokens():
+    """Test cache reads and writes are normalized in full and streamed responses"""
+    adapter = AnthropicAdapter()
+    usage = {'input_tokens': 5, 'output_tokens': 2, 'cache_read_input_tokens': 2048, 'cache_creation_input_tokens': 30}
+
+    _, _, parsed = adapter.parse_response({'content': [{'text': 'Hi'}], 'stop_reason': 'end_turn', 'usage': usage})
+    _, _, started = adapter.parse_stream_chunk({'type': 'message_start', 'message': {'usage': usage}})
+    metrics = adapter.invocation_metrics_usage({'amazon-bedrock-invocationMetrics': {
+        'inputTokenCount': 5, 'outputTokenCount': 2, 'cacheReadInputTokenCount': 2048, 'cacheWriteInputTokenCount': 30
+    }})
+
+    assert parsed == {'input_tokens': 5, 'output_tokens': 2, 'cache_read_input_tokens': 2048, 'cache_write_input_tokens': 30}
+    assert started == {'input_tokens': 5, 'cache_read_input_tokens': 2048, 'cache_write_input_tokens': 30}
+    assert metrics == parsed
+
+
+def test_nova_request_wraps_content_blocks():
+    """Test Nova requests use content blocks and inferenceConfig"""
+    body = AmazonNovaAdapter().build_request(MESSAGES, 'Be brief.', 100, 0.5)
+
+    assert body['messages'][0] == {'role': 'user', 'content': [{'text': 'Hi'}]}
+    assert body['system'] == [{'text': 'Be brief.'}]
+    assert body['inferenceConfig'] == {'maxTokens': 100, 'temperature': 0.5}
+
+
+def test_text_completion_providers_render_prompts():
+    """Test Llama and Mistral prompts contain every turn and end ready for the assistant"""
+    llama = MetaLlamaAdapter().build_request(MESSAGES, 'Be brief.', 100, 0.5)
+    mistral = MistralAdapter().build_request(MESSAGES, 'Be brief.', 100, 0.5)
+
+    assert llama['prompt'].endswith('<|start_header_id|>assistant<|end_header_id|>\n\n')
+    assert llama['max_gen_len'] == 100
+    assert mistral['prompt'] == '<s>[INST] Be brief.\n\nHi [/INST]Hello!</s>[INST] How are you? [/INST]'
+
+
+def test_cohere_request_splits_history():
+    """Test Cohere requests send the last message separately from chat_history"""
+    body = CohereAdapter().build_request(MESSAGES, 'Be brief.', 100, 0.5)
+
+    assert body['message'] == 'How are you?'
+    assert body['chat_history'][1] == {'role': 'CHATBOT', 'message': 'Hello!'}
+    assert body['preamble'] == 'Be brief.'
+
+
+def test_parse_responses_normalize_usage():
+    """Test full responses are normalized to text, stop reason and usage"""
+    assert AmazonNovaAdapter().parse_response({
+        'output': {'message': {'content': [{'text': 'Hi'}]}},
+        'stopReason': 'end_turn',
+        'usage': {'inputTokens': 3, 'outputTokens': 1}
+    }) == ('Hi', 'end_turn', {'input_tokens': 3, 'output_tokens': 1})
+
+    assert MetaLlamaAdapter().parse_response({
+        'generation': 'Hi', 'stop_reason': 'stop', 'prompt_token_count': 3, 'generation_token_count': 1
+    }) == ('Hi', 'stop', {'input_tokens': 3, 'output_tokens': 1})
+
+
+def test_register_adapter_adds_provider():
+    """Test a newly registered provider is picked up by get_adapter"""
+    provider_adapter = ProviderAdapter()
+    register_adapter('ai21', provider_adapter)
+
+    assert provider_from_model_id('ai21.jamba-instruct-v1:0') == 'ai21'
+    assert get_adapter('ai21.jamba-instruct-v1:0') is provider_adapter
@@ -0,0 +1,65 @@
+"""
+Unit tests for the token-bucket rate limiter
+"""
+import boto3
+from src.shared.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_refuses_until_refilled():
+    """Test a caller gets a minute's burst, then is refused with the time until the next token"""
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=3, input_tokens_per_minute=0, clock=clock)
+
+    assert all(limiter.acquire('alice').allowed for _ in range(3))
+    refused = limiter.acquire('alice')
+    assert not refused.allowed and refused.bucket == 'requests'
+    assert refused.retry_after == 20.0 and refused.retry_after_header == '20'
+    assert limiter.acquire('bob').allowed
+
+    clock.now = 20.0
+    assert limiter.acquire('alice').allowed
+
+
+def test_input_tokens_are_billed_after_the_call():
+    """Test charged usage puts the token bucket in debt and blocks until it is repaid"""
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=100, input_tokens_per_minute=600, clock=clock)
+
+    assert limiter.acquire('alice', input_tokens=10).allowed
+    limiter.charge('alice', 890)
+
+    refused = limiter.acquire('alice', input_tokens=10)
+    assert not refused.allowed and refused.bucket == 'input_tokens'
+    assert refused.retry_after == 31.0
+
+    clock.now = 31.0
+    assert limiter.acquire('alice', input_tokens=10).allowed
+
+
+def test_containers_share_usage_through_counters(dynamodb_tables):
+    """Test usage recorded by one container is debited from another's bucket on sync"""
+    boto3.resource('dynamodb').create_table(
+        TableName='PAI-RateLimits',
+        BillingMode='PAY_PER_REQUEST',
+        AttributeDefinitions=[{'AttributeName': 'limit_key', 'AttributeType': 'S'}],
+        KeySchema=[{'AttributeName': 'limit_key', 'KeyType': 'HASH'}]
+    )
+
+    def container():
+        return RateLimiter(5, 0, table_name='PAI-RateLimits', sync_interval_seconds=0, clock=FakeClock())
+
+    first, second = container(), container()
+    assert all(first.acquire('alice').allowed for _ in range(3))
+
+    admitted = sum(second.acquire('alice').allowed for _ in range(5))
+
+    assert admitted == 2
+    assert first.acquire('bob').allowed
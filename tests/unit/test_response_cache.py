@@ -0,0 +1,104 @@
+"""
+Unit tests for the Bedrock response cache
+"""
+import io
+import json
+import boto3
+import pytest
+from moto import mock_aws
+from src.chatbot import bedrock_client
+from src.chatbot.bedrock_client import BedrockClient
+from src.chatbot.response_cache import ResponseCache, make_cache_key
+from src.shared.aws_clients import reset_clients
+
+
+class CountingRuntime:
+    """bedrock-runtime stand-in returning a fixed Claude response"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke_model(self, **kwargs):
+        self.calls += 1
+        body = {
+            'content': [{'type': 'text', 'text': f'answer {self.calls}'}],
+            'stop_reason': 'end_turn',
+            'usage': {'input_tokens': 10, 'output_tokens': 2}
+        }
+        return {'body': io.BytesIO(json.dumps(body).encode())}
+
+
+@pytest.fixture
+def runtime(monkeypatch):
+    stub = CountingRuntime()
+    monkeypatch.setattr(bedrock_client, 'get_bedrock_runtime', lambda: stub)
+    return stub
+
+
+MESSAGES = [{'role': 'user', 'content': 'What is 2 + 2?'}]
+
+
+def test_cache_key_depends_on_every_input():
+    """Test any change in the request changes the key"""
+    base = make_cache_key('m', 'sys', MESSAGES, 100, 0.0)
+
+    assert base == make_cache_key('m', 'sys', [dict(MESSAGES[0])], 100, 0.0)
+    assert base != make_cache_key('m', 'other', MESSAGES, 100, 0.0)
+    assert base != make_cache_key('m', 'sys', MESSAGES, 101, 0.0)
+    assert base != make_cache_key('m', 'sys', MESSAGES, 100, 0.5)
+
+
+def test_identical_deterministic_requests_hit_memory(runtime):
+    """Test a repeated temperature-0 request is served from memory"""
+    client = BedrockClient('anthropic.claude-3-haiku', response_cache=ResponseCache())
+
+    first = client.generate_response(MESSAGES, system_prompt='sys', temperature=0.0)
+    second = client.generate_response(MESSAGES, system_prompt='sys', temperature=0.0)
+
+    assert runtime.calls == 1
+    assert second['message'] == first['message']
+    assert first['usage']['response_cache'] == {'hit': False, 'tier': None, 'hits': 0, 'misses': 1}
+    assert second['usage']['response_cache'] == {'hit': True, 'tier': 'memory', 'hits': 1, 'misses': 1}
+
+
+def test_sampled_requests_skip_cache_unless_forced(runtime):
+    """Test temperature > 0 bypasses the cache unless force_cache is set"""
+    client = BedrockClient('anthropic.claude-3-haiku', response_cache=ResponseCache())
+
+    client.generate_response(MESSAGES, temperature=1.0)
+    unforced = client.generate_response(MESSAGES, temperature=1.0)
+    client.generate_response(MESSAGES, temperature=1.0, force_cache=True)
+    client.generate_response(MESSAGES, temperature=1.0, force_cache=True)
+
+    assert 'response_cache' not in unforced['usage']
+    assert runtime.calls == 3
+
+
+def test_shared_tier_serves_other_containers(runtime, fake_kms):
+    """Test a response cached by one container is found in DynamoDB by another"""
+    from src.shared.encryption import EncryptionManager
+
+    with mock_aws():
+        reset_clients()
+        resource = boto3.resource('dynamodb')
+        resource.create_table(
+            TableName='PAI-ResponseCache',
+            BillingMode='PAY_PER_REQUEST',
+            AttributeDefinitions=[{'AttributeName': 'cache_key', 'AttributeType': 'S'}],
+            KeySchema=[{'AttributeName': 'cache_key', 'KeyType': 'HASH'}]
+        )
+        encryption_manager = EncryptionManager('key-id')
+
+        warm = BedrockClient('anthropic.claude-3-haiku',
+                             response_cache=ResponseCache(table_name='PAI-ResponseCache',
+                                                          encryption_manager=encryption_manager))
+        cold = BedrockClient('anthropic.claude-3-haiku',
+                             response_cache=ResponseCache(table_name='PAI-ResponseCache',
+                                                          encryption_manager=encryption_manager))
+
+        warm.generate_response(MESSAGES, temperature=0.0)
+        response = cold.generate_response(MESSAGES, temperature=0.0)
+
+        assert runtime.calls == 1
+        assert response['usage']['response_cache']['tier'] == 'dynamodb'
+    reset_clients()
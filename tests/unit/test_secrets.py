@@ -0,0 +1,92 @@
+"""
+Unit tests for the cached Secrets Manager value
+"""
+import json
+import time
+import threading
+import pytest
+from src.shared.aws_clients import set_client, reset_clients
+from src.shared.secrets import CachedSecret
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakySecretsManager:
+    def __init__(self):
+        self.value = 'v1'
+        self.fail = False
+        self.calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError('throttled')
+        return {'SecretString': json.dumps({'value': self.value})}
+
+
+@pytest.fixture
+def secrets_manager():
+    stub = FlakySecretsManager()
+    set_client('secretsmanager', stub)
+    yield stub
+    reset_clients()
+
+
+def make_secret(clock):
+    return CachedSecret('secret', parse=lambda s: s['value'], ttl_seconds=100,
+                        refresh_fraction=0.8, max_stale_seconds=1000, clock=clock)
+
+
+def test_value_is_cached_until_expiry(secrets_manager):
+    """Test the secret is fetched once per TTL and parsed on fetch"""
+    clock = FakeClock()
+    secret = make_secret(clock)
+
+    assert secret.get() == 'v1' and secret.get() == 'v1'
+    secrets_manager.value = 'v2'
+    clock.now = 100.0
+
+    assert secret.get() == 'v2'
+    assert secrets_manager.calls == 2 and secret.version == 2
+
+
+def test_refresh_point_returns_current_value_and_refreshes_in_background(secrets_manager):
+    """Test a value past the refresh point is served while a background fetch replaces it"""
+    clock = FakeClock()
+    secret = make_secret(clock)
+    secret.get()
+    secrets_manager.value = 'v2'
+    secrets_manager.gate.clear()
+    clock.now = 90.0
+
+    assert secret.get() == 'v1'
+    secrets_manager.gate.set()
+    deadline = time.monotonic() + 5
+    while secret.version < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert secret.get() == 'v2'
+
+
+def test_stale_value_served_when_fetch_fails(secrets_manager):
+    """Test a failed fetch serves the stale value, retries sparingly, and raises once too stale"""
+    clock = FakeClock()
+    secret = make_secret(clock)
+    secret.get()
+    secrets_manager.fail = True
+    clock.now = 150.0
+
+    assert secret.get() == 'v1' and secret.get() == 'v1'
+    assert secrets_manager.calls == 2
+
+    clock.now = 1000.0
+    with pytest.raises(RuntimeError):
+        secret.get()
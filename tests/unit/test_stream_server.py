@@ -0,0 +1,96 @@
+"""
+Unit tests for the streaming chat server
+"""
+import json
+import threading
+import http.client
+import pytest
+from src.authorizer.handler import hash_token
+from src.chatbot import handler, stream_server
+from src.chatbot.conversation_manager import ConversationManager
+
+API_KEY = 'test-key'
+
+
+class GatedBedrockClient:
+    """Streams the first word, then waits for the test before finishing the reply"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+
+    def stream_response(self, messages, system_prompt=None, **kwargs):
+        words = f"echo: {messages[-1]['content']}".split(' ')
+        yield {'type': 'delta', 'text': words[0]}
+        self.gate.wait(timeout=5)
+        for word in words[1:]:
+            yield {'type': 'delta', 'text': ' ' + word}
+        yield {'type': 'done', 'message': ''.join([words[0]] + [' ' + w for w in words[1:]]),
+               'stop_reason': 'end_turn', 'usage': {'input_tokens': 1, 'output_tokens': 2}, 'model': 'stub'}
+
+
+@pytest.fixture
+def server(dynamodb_tables, monkeypatch):
+    bedrock = GatedBedrockClient()
+    monkeypatch.setattr(handler, 'bedrock_client', bedrock)
+    monkeypatch.setattr(handler, 'conversation_manager', ConversationManager())
+    monkeypatch.setattr(handler, 'encryption_manager', None)
+    monkeypatch.setattr(stream_server, 'lookup_principal',
+                        lambda token_hash: {'principal': 'tester', 'context': {}} if token_hash == hash_token(API_KEY) else None)
+
+    httpd = stream_server.make_server('127.0.0.1', 0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd, bedrock
+    bedrock.gate.set()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post(httpd, body, api_key=API_KEY):
+    connection = http.client.HTTPConnection('127.0.0.1', httpd.server_address[1], timeout=5)
+    headers = {'Content-Type': 'application/json'}
+    if api_key:
+        headers['Authorization'] = f'Bearer {api_key}'
+    connection.request('POST', '/chat/stream', json.dumps(body), headers)
+    return connection.getresponse()
+
+
+def read_event(response):
+    lines = []
+    while True:
+        line = response.readline().decode('utf-8').rstrip('\n')
+        if not line:
+            return lines
+        lines.append(line)
+
+
+def test_first_delta_arrives_before_the_reply_finishes(server):
+    """Test events are flushed as produced and the assembled reply is stored at the end"""
+    httpd, bedrock = server
+    response = post(httpd, {'message': 'Hi'})
+
+    assert response.status == 200 and response.getheader('Content-Type') == 'text/event-stream'
+    assert read_event(response) == ['event: delta', 'data: {"text":"echo:"}']
+
+    bedrock.gate.set()
+    events = []
+    while True:
+        event = read_event(response)
+        if not event:
+            break
+        events.append(event)
+
+    assert [e[0] for e in events] == ['event: delta', 'event: done']
+    done = json.loads(events[-1][1][len('data: '):])
+    history = handler.conversation_manager.get_conversation_history(done['conversation_id'])
+    assert [m['content'] for m in history] == ['Hi', 'echo: Hi']
+
+
+def test_requests_are_authenticated_and_validated(server):
+    """Test a missing or unknown API key is a 401 and a missing message a 400"""
+    httpd, _ = server
+
+    assert post(httpd, {'message': 'Hi'}, api_key=None).status == 401
+    assert post(httpd, {'message': 'Hi'}, api_key='wrong').status == 401
+    response = post(httpd, {'user_id': 'u1'})
+    assert response.status == 400 and 'message' in json.loads(response.read())['error']
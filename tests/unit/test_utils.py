@@ -1,8 +1,19 @@
 """
 Unit tests for shared utilities
 """
+import json
+import logging
 import pytest
-from src.shared.utils import create_response, create_error_response, validate_required_fields
+from decimal import Decimal
+from src.shared import utils
+from src.shared.utils import (
+    create_response,
+    create_error_response,
+    validate_required_fields,
+    json_dumps,
+    json_loads,
+    log_request,
+)
 
 
 def test_create_response():
@@ -20,7 +31,7 @@ def test_create_error_response():
     response = create_error_response(400, "Bad request")
 
     assert response["statusCode"] == 400
-    assert '"error": "Bad request"' in response["body"]
+    assert json.loads(response["body"]) == {"error": "Bad request"}
 
 
 def test_validate_required_fields_success():
@@ -40,3 +51,68 @@ def test_validate_required_fields_missing():
     assert is_valid is False
     assert "Missing required fields" in error_msg
     assert "field2" in error_msg
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def json_backend(request, monkeypatch):
+    if request.param == 'orjson':
+        if utils.orjson is None:
+            pytest.skip('orjson is not installed')
+    else:
+        monkeypatch.setattr(utils, 'orjson', None)
+    return request.param
+
+
+def test_json_round_trip_encodes_decimals(json_backend):
+    """Test DynamoDB Decimals serialize as numbers and output is compact UTF-8"""
+    text = json_dumps({'count': Decimal('3'), 'score': Decimal('0.25'), 'text': 'héllo', 1: [Decimal('7')]})
+
+    assert text == '{"count":3,"score":0.25,"text":"héllo","1":[7]}'
+    assert json_loads(text) == {'count': 3, 'score': 0.25, 'text': 'héllo', '1': [7]}
+    assert json_loads(text.encode('utf-8'))['count'] == 3
+
+
+def test_json_dumps_reads_dict_subclasses_through_their_methods(json_backend):
+    """Test dict subclasses serialize what their methods return, not their raw storage"""
+    class Lazy(dict):
+        def items(self):
+            return [('content', 'decrypted')]
+
+        def __iter__(self):
+            return iter(['content'])
+
+        def __getitem__(self, key):
+            return 'decrypted'
+
+    assert json_loads(json_dumps([Lazy(content='ciphertext')])) == [{'content': 'decrypted'}]
+
+
+def test_json_loads_raises_json_decode_error(json_backend):
+    """Test invalid JSON raises json.JSONDecodeError with either backend"""
+    with pytest.raises(json.JSONDecodeError):
+        json_loads('{not json')
+
+
+def test_log_request_omits_content_and_caps_size(caplog):
+    """Test request logs carry sizes instead of message text and stay under the cap"""
+    event = {'httpMethod': 'POST', 'path': '/chat', 'body': '{}'}
+    body = {'message': 'secret prompt', 'user_id': 'u1', 'notes': 'x' * 500, 'items': [1, 2]}
+
+    with caplog.at_level(logging.INFO):
+        assert log_request(event, body, 1.0, 'req-1')
+        assert log_request(event, {f'field_{i}_' + 'y' * 100: 1 for i in range(50)}, 1.0)
+
+    first, second = (json.loads(r.getMessage()) for r in caplog.records)
+    assert first['body'] == {'message': '<13 chars>', 'user_id': 'u1', 'notes': '<500 chars>', 'items': '<2 items>'}
+    assert first['request_id'] == 'req-1' and 'secret prompt' not in caplog.text
+    assert second['truncated'] and second['body'] == '<50 keys>'
+    assert all(len(r.getMessage()) <= utils.REQUEST_LOG_MAX_BYTES for r in caplog.records)
+
+
+def test_log_request_is_sampled(monkeypatch):
+    """Test only the sampled fraction of requests is logged"""
+    monkeypatch.setattr(utils.random, 'random', lambda: 0.5)
+
+    assert not log_request({}, {}, 0.0)
+    assert not log_request({}, {}, 0.25)
+    assert log_request({}, {}, 0.75)
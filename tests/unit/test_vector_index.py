@@ -0,0 +1,78 @@
+"""
+Unit tests for the quantized vector index
+"""
+import numpy as np
+import pytest
+from benchmarks.vector_index_bench import exact_top_k, recall, run_benchmark, synthetic_embeddings
+from src.shared.vector_index import VectorIndex, build_index
+
+
+@pytest.fixture
+def vectors():
+    return synthetic_embeddings(2000, 32) * np.linspace(0.5, 2.0, 2000, dtype=np.float32)[:, None]
+
+
+@pytest.mark.parametrize('block_rows', [128, None])
+def test_round_trip_and_recall(tmp_path, vectors, block_rows):
+    """Test a built index reopens with its ids and ranks close to exact search"""
+    path = str(tmp_path / 'index.pvi')
+    ids = [f"doc.md#{row}" for row in range(len(vectors))]
+    build_index(path, vectors, ids, 'int8', block_rows=300)
+
+    with VectorIndex(path, block_rows=block_rows) as index:
+        assert (len(index), index.dimensions, index.dtype) == (2000, 32, 'int8')
+        assert index.chunk_ids([0, 1999]) == ['doc.md#0', 'doc.md#1999']
+        np.testing.assert_allclose(index.norms, np.linalg.norm(vectors, axis=1), rtol=1e-5)
+
+        rows, scores = index.search(vectors[7], k=5)
+        assert rows[0] == 7 and scores[0] == pytest.approx(1.0, abs=0.01)
+        assert list(scores) == sorted(scores, reverse=True)
+
+        queries = vectors[:50] + 0.2
+        found, _ = index.search(queries, k=10)
+        unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        unit_queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        assert found.shape == (50, 10)
+        assert recall(found, exact_top_k(unit, unit_queries, 10)) >= 0.9
+
+
+def test_dot_metric_uses_original_norms(tmp_path):
+    """Test dot-product search accounts for the stored norms"""
+    path = str(tmp_path / 'index.pvi')
+    vectors = np.array([[1, 0], [3, 0], [0, 1]], dtype=np.float32)
+    build_index(path, vectors, ['a', 'b', 'c'], 'int8')
+
+    with VectorIndex(path) as index:
+        rows, scores = index.search(np.array([1.0, 0.0]), k=5, metric='dot')
+        assert list(rows) == [1, 0, 2]
+        np.testing.assert_allclose(scores, [3.0, 1.0, 0.0], atol=1e-2)
+
+        cosine_rows, _ = index.search(np.array([1.0, 0.0]), k=2)
+        assert set(cosine_rows) == {0, 1}
+
+
+def test_rejects_mismatched_queries(tmp_path, vectors):
+    """Test queries with the wrong dimensions are rejected"""
+    path = str(tmp_path / 'index.pvi')
+    build_index(path, vectors[:10], [str(i) for i in range(10)])
+
+    with VectorIndex(path) as index, pytest.raises(ValueError):
+        index.search(np.ones(8), k=3)
+
+
+def test_rejects_unsupported_dtype(tmp_path, vectors):
+    """Test only int8 indexes can be built"""
+    with pytest.raises(ValueError):
+        build_index(str(tmp_path / 'index.pvi'), vectors[:10], [str(i) for i in range(10)], 'float16')
+
+
+def test_benchmark_reports_recall_and_latency():
+    """Test the benchmark compares quantized indexes with exact search"""
+    report = run_benchmark(count=3000, dimensions=32, queries=20, k=5, block_rows=[64, 256])
+
+    names = [(result['name'], result.get('block_rows')) for result in report['results']]
+    assert names == [('exact-float32', None), ('int8', 64), ('int8', 256)]
+    int8 = report['results'][1]
+    assert int8['recall'] >= 0.9
+    assert int8['bytes'] < report['results'][0]['bytes'] / 2
+    assert int8['latency_ms']['count'] == 20